@@ -0,0 +1,367 @@
+import base64
+import json
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Optional, List, Dict, Any, Tuple
+
+# Tamanho máximo de página do histórico de visualizações
+MAX_PAGE_SIZE = 200
+
+# Tamanho máximo de página das exportações (/api/export)
+MAX_EXPORT_PAGE_SIZE = 5000
+
+# Colunas pelas quais a listagem de propostas (/admin) pode ser ordenada; cada
+# uma tem um índice (coluna, id) no schema. Nulos contam como o menor valor.
+ORDENACOES_PROPOSTAS = (
+    "created_at", "ultima_visualizacao", "total_visualizacoes", "investimento", "cliente_nome"
+)
+
+# Colunas devolvidas pela listagem (sem os JSONB da proposta)
+COLUNAS_LISTA_PROPOSTAS = (
+    "id", "numero_proposta", "cliente_nome", "cliente_cidade", "investimento",
+    "created_at", "total_visualizacoes", "primeira_visualizacao", "ultima_visualizacao"
+)
+
+_ORDENACOES_DATA = ("created_at", "ultima_visualizacao")
+
+
+class StorageBackend(ABC):
+    """
+    Interface de persistência usada por `Database`.
+
+    Todas as implementações devolvem os mesmos formatos:
+    - proposta: dict com as colunas de `propostas`, `id` como str e
+      `dados_sistema`/`dados_payback` já decodificados
+    - visualização: dict com as colunas de `visualizacoes`
+    """
+
+    async def connect(self) -> None:
+        """Abre conexões/pools (chamado no startup da aplicação)"""
+
+    async def ping(self) -> None:
+        """Consulta mínima ao banco (readiness); levanta exceção se ele não responder"""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Libera conexões (chamado no shutdown da aplicação)"""
+
+    @abstractmethod
+    async def salvar_proposta(
+        self,
+        cliente: Dict[str, str],
+        dados_sistema: Dict[str, Any],
+        dados_payback: List[Dict[str, Any]],
+        chave_idempotencia: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Salva proposta e retorna {id, numero_proposta, criada}.
+
+        O número vem da sequência do banco (gerar_numero_proposta). Se já existe
+        proposta com a mesma `chave_idempotencia`, nada é gravado e a existente
+        é devolvida com criada=False.
+        """
+
+    @abstractmethod
+    async def salvar_propostas(self, propostas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Salva várias propostas num único INSERT, retornando {id, numero_proposta, criada}
+        na ordem da entrada. Cada item tem os argumentos de salvar_proposta, com
+        `chave_idempotencia` obrigatória (é por ela que as linhas são casadas).
+        """
+
+    @abstractmethod
+    async def buscar_por_chaves(self, chaves: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Propostas já gravadas com essas chaves de idempotência: {chave: {id, numero_proposta}}"""
+
+    @abstractmethod
+    async def buscar_proposta(self, proposta_id: str) -> Optional[Dict[str, Any]]:
+        """Busca proposta pelo ID (None se não encontrada)"""
+
+    @abstractmethod
+    async def registrar_visualizacao(
+        self,
+        proposta_id: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> None:
+        """Registra uma visualização (não levanta exceção em caso de falha)"""
+
+    @abstractmethod
+    async def registrar_visualizacoes(self, visualizacoes: List[Dict[str, Any]]) -> None:
+        """Registra várias visualizações num único INSERT"""
+
+    @abstractmethod
+    async def registrar_visualizacoes_suprimidas(self, eventos: List[Dict[str, Any]]) -> None:
+        """
+        Soma aos contadores da proposta as aberturas filtradas antes de gravar
+        (eventos {proposta_id, motivo: "repetida" | "bot"}; ver agregar_suprimidas)
+        """
+
+    @abstractmethod
+    async def reservar_visualizacoes_sem_geo(self, limite: int = 500, validade: int = 300) -> List[Dict[str, Any]]:
+        """
+        Reserva visualizações com IP ainda sem país/cidade ({id, ip_address}):
+        workers de outros processos não recebem as mesmas linhas até a reserva
+        expirar (`validade` segundos) ou o lote ser gravado
+        """
+
+    @abstractmethod
+    async def atualizar_geo_visualizacoes(self, linhas: List[Dict[str, Any]]) -> None:
+        """Grava país e cidade de várias visualizações ({id, pais, cidade}) num único UPDATE"""
+
+    @abstractmethod
+    async def visualizacoes_por_local(self, proposta_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Visualizações da proposta por país e por cidade (formato de `montar_locais`)"""
+
+    @abstractmethod
+    async def listar_visualizacoes(self, proposta_id: str) -> List[Dict[str, Any]]:
+        """Lista as visualizações de uma proposta (mais recente primeiro)"""
+
+    @abstractmethod
+    async def contar_visualizacoes(self, proposta_id: str) -> int:
+        """Conta as visualizações de uma proposta"""
+
+    @abstractmethod
+    async def estatisticas_visualizacoes(self, proposta_id: str) -> Dict[str, Any]:
+        """
+        Agregados calculados no banco: total_visualizacoes,
+        primeira_visualizacao e ultima_visualizacao
+        """
+
+    @abstractmethod
+    async def listar_visualizacoes_pagina(
+        self,
+        proposta_id: str,
+        limite: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Página do histórico (mais recente primeiro) com paginação keyset.
+
+        Returns:
+            (visualizações, cursor da próxima página ou None se acabou)
+        """
+
+    @abstractmethod
+    async def listar_visualizacoes_periodo(
+        self,
+        de: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        limite: int = 1000,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Página das visualizações de todas as propostas em [de, ate), em ordem
+        (visualizado_em, id) crescente, para exportação. Paginação keyset como em
+        listar_visualizacoes_pagina (limite até MAX_EXPORT_PAGE_SIZE).
+        """
+
+    @abstractmethod
+    async def listar_propostas(
+        self,
+        ordem: str = "created_at",
+        crescente: bool = False,
+        busca: Optional[str] = None,
+        visualizadas: Optional[bool] = None,
+        criada_de: Optional[datetime] = None,
+        criada_ate: Optional[datetime] = None,
+        limite: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Página da listagem de propostas (COLUNAS_LISTA_PROPOSTAS) com os contadores
+        de visualização, ordenada por `ordem` (ORDENACOES_PROPOSTAS) + id.
+
+        Filtros: `busca` no nome do cliente ou número da proposta, `visualizadas`
+        (True = já abertas, False = nunca abertas) e intervalo de criação
+        [criada_de, criada_ate). Paginação keyset como em listar_visualizacoes_pagina.
+        """
+
+    @abstractmethod
+    async def listar_propostas_completas(
+        self,
+        apos_id: Optional[str] = None,
+        limite: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        Propostas completas (mesmo formato de buscar_proposta) em ordem de id,
+        a partir da seguinte a `apos_id`: percorre a tabela inteira em páginas
+        (passando o id da última linha) sem OFFSET.
+        """
+
+    @abstractmethod
+    async def registrar_engajamentos(self, eventos: List[Dict[str, Any]]) -> None:
+        """
+        Grava um lote de eventos de engajamento e atualiza os resumos por
+        proposta (função registrar_engajamentos do schema)
+        """
+
+    @abstractmethod
+    async def resumo_engajamento(self, proposta_id: str) -> Dict[str, Any]:
+        """
+        Resumo de engajamento da proposta (formato de `montar_resumo_engajamento`)
+        """
+
+
+def agregar_suprimidas(eventos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Agrupa os eventos suprimidos por proposta: [{proposta_id, repetidas, bots}]"""
+    contagens: Dict[str, Dict[str, Any]] = {}
+    for evento in eventos:
+        contagem = contagens.setdefault(
+            evento["proposta_id"], {"proposta_id": evento["proposta_id"], "repetidas": 0, "bots": 0}
+        )
+        contagem["bots" if evento["motivo"] == "bot" else "repetidas"] += 1
+    return list(contagens.values())
+
+
+def montar_locais(linhas: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Converte as contagens por (pais, cidade) em {"paises": [{pais, total}],
+    "cidades": [{cidade, pais, total}]}, do maior total para o menor
+    """
+    paises: Dict[str, int] = {}
+    cidades = []
+    for linha in linhas:
+        total = int(linha["total"])
+        paises[linha["pais"]] = paises.get(linha["pais"], 0) + total
+        if linha.get("cidade"):
+            cidades.append({"cidade": linha["cidade"], "pais": linha["pais"], "total": total})
+    return {
+        "paises": sorted(
+            ({"pais": pais, "total": total} for pais, total in paises.items()),
+            key=lambda p: (-p["total"], p["pais"])
+        ),
+        "cidades": sorted(cidades, key=lambda c: (-c["total"], c["cidade"]))
+    }
+
+
+def montar_resumo_engajamento(
+    resumo: Optional[Dict[str, Any]],
+    secoes: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Converte as linhas de engajamento_resumo/engajamento_secoes no formato da API.
+
+    Médias de tempo e rolagem consideram só os eventos de saída (um por visita
+    que terminou); os máximos consideram todos os eventos.
+    """
+    resumo = resumo or {}
+    saidas = resumo.get("saidas") or 0
+    return {
+        "eventos": resumo.get("eventos") or 0,
+        "saidas": saidas,
+        "tempo_medio": round(resumo.get("tempo_total", 0) / saidas, 1) if saidas else None,
+        "tempo_max": resumo.get("tempo_max") or 0,
+        "scroll_medio": round(resumo.get("scroll_total", 0) / saidas, 1) if saidas else None,
+        "scroll_max": resumo.get("scroll_max") or 0,
+        "ultimo_evento": resumo.get("ultimo_evento"),
+        "secoes": {linha["secao"]: linha["alcances"] for linha in secoes}
+    }
+
+
+def decodificar_json(valor: Any) -> Any:
+    """
+    Decodifica colunas JSONB.
+
+    Propostas antigas foram gravadas com o JSON serializado como string dentro
+    do JSONB, então pode ser preciso decodificar duas vezes.
+    """
+    while isinstance(valor, str):
+        valor = json.loads(valor)
+    return valor
+
+
+def codificar_cursor(visualizado_em: Any, visualizacao_id: int) -> str:
+    """Cursor opaco com a chave (visualizado_em, id) da última linha da página"""
+    if isinstance(visualizado_em, datetime):
+        visualizado_em = visualizado_em.isoformat()
+    bruto = json.dumps([visualizado_em, visualizacao_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[str, int]:
+    """Decodifica o cursor; levanta ValueError se for inválido"""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        visualizado_em, visualizacao_id = json.loads(bruto)
+        datetime.fromisoformat(visualizado_em)
+        return visualizado_em, int(visualizacao_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def resultado_lote(
+    propostas: List[Dict[str, Any]],
+    inseridas: Dict[str, Dict[str, Any]],
+    existentes: Dict[str, Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Monta o retorno de salvar_propostas na ordem da entrada, a partir das linhas
+    inseridas e das já existentes (por chave). Chave repetida no próprio lote
+    aponta para a primeira ocorrência.
+    """
+    resultados, vistas = [], set()
+    for p in propostas:
+        chave = p["chave_idempotencia"]
+        if chave in inseridas and chave not in vistas:
+            resultados.append({**inseridas[chave], "criada": True})
+        else:
+            linha = inseridas.get(chave) or existentes[chave]
+            resultados.append({**linha, "criada": False})
+        vistas.add(chave)
+    return resultados
+
+
+def codificar_cursor_proposta(ordem: str, valor: Any, proposta_id: str) -> str:
+    """Cursor opaco da listagem de propostas: ordenação, valor da coluna e id da última linha"""
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    elif isinstance(valor, Decimal):
+        valor = float(valor)
+    bruto = json.dumps([ordem, valor, str(proposta_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor_proposta(cursor: str, ordem: str) -> Tuple[Any, str]:
+    """
+    Decodifica o cursor da listagem, convertendo o valor para o tipo da coluna.
+    Levanta ValueError se for inválido ou de outra ordenação.
+    """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ordem_cursor, valor, proposta_id = json.loads(bruto)
+        if ordem_cursor != ordem:
+            raise ValueError
+        if valor is not None:
+            if ordem in _ORDENACOES_DATA:
+                valor = datetime.fromisoformat(valor)
+            elif ordem == "investimento":
+                valor = Decimal(str(float(valor)))
+            elif ordem == "total_visualizacoes":
+                valor = int(valor)
+            else:
+                valor = str(valor)
+        return valor, str(uuid.UUID(proposta_id))
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def paginar(
+    linhas: List[Dict[str, Any]],
+    limite: int,
+    cursor: Optional[Callable[[Dict[str, Any]], str]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Recebe até limite+1 linhas e separa a página do cursor da próxima.
+
+    `cursor` gera o cursor a partir da última linha (padrão: histórico de visualizações).
+    """
+    if len(linhas) <= limite:
+        return linhas, None
+    pagina = linhas[:limite]
+    ultima = pagina[-1]
+    if cursor is not None:
+        return pagina, cursor(ultima)
+    return pagina, codificar_cursor(ultima["visualizado_em"], ultima["id"])
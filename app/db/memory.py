@@ -0,0 +1,271 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Tuple
+
+from app.db.base import (
+    COLUNAS_LISTA_PROPOSTAS, MAX_EXPORT_PAGE_SIZE, MAX_PAGE_SIZE, ORDENACOES_PROPOSTAS, StorageBackend, agregar_suprimidas,
+    codificar_cursor_proposta, decodificar_cursor, decodificar_cursor_proposta, montar_locais,
+    montar_resumo_engajamento, paginar, resultado_lote
+)
+
+
+class MemoryBackend(StorageBackend):
+    """
+    Backend em memória para os benchmarks e o teste de contrato dos backends.
+
+    Mesmos formatos de retorno dos backends reais, sem I/O: o tempo medido é
+    só o da aplicação (extração, renderização, serialização, middlewares).
+    """
+
+    def __init__(self):
+        self.propostas: Dict[str, Dict[str, Any]] = {}
+        self.visualizacoes: List[Dict[str, Any]] = []
+        self.engajamentos: List[Dict[str, Any]] = []
+        self.chaves: Dict[str, str] = {}
+        self.sequencia = 0
+
+    async def close(self) -> None:
+        pass
+
+    async def salvar_proposta(
+        self,
+        cliente: Dict[str, str],
+        dados_sistema: Dict[str, Any],
+        dados_payback: List[Dict[str, Any]],
+        chave_idempotencia: Optional[str] = None
+    ) -> Dict[str, Any]:
+        if chave_idempotencia in self.chaves:
+            return {**(await self.buscar_por_chaves([chave_idempotencia]))[chave_idempotencia], "criada": False}
+
+        proposta_id = str(uuid.uuid4())
+        agora = datetime.now(timezone.utc)
+        self.sequencia += 1
+        numero_proposta = f"{agora:%d%m%y}-{self.sequencia:05d}/{agora.year}"
+        self.propostas[proposta_id] = {
+            "id": proposta_id,
+            "numero_proposta": numero_proposta,
+            "cliente_nome": cliente["nome"],
+            "cliente_cpf_cnpj": cliente["cpf_cnpj"],
+            "cliente_endereco": cliente["endereco"],
+            "cliente_cidade": cliente["cidade"],
+            "cliente_telefone": cliente["telefone"],
+            "dados_sistema": dados_sistema,
+            "dados_payback": dados_payback,
+            "investimento": float(dados_sistema.get("investimento", 0)),
+            "created_at": agora,
+            "total_visualizacoes": 0,
+            "primeira_visualizacao": None,
+            "ultima_visualizacao": None,
+            "visualizacoes_repetidas": 0,
+            "visualizacoes_bots": 0,
+            "chave_idempotencia": chave_idempotencia
+        }
+        if chave_idempotencia is not None:
+            self.chaves[chave_idempotencia] = proposta_id
+        return {"id": proposta_id, "numero_proposta": numero_proposta, "criada": True}
+
+    async def salvar_propostas(self, propostas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        existentes = await self.buscar_por_chaves([p["chave_idempotencia"] for p in propostas])
+        inseridas = {}
+        for p in propostas:
+            if p["chave_idempotencia"] not in existentes and p["chave_idempotencia"] not in inseridas:
+                salva = await self.salvar_proposta(**p)
+                inseridas[p["chave_idempotencia"]] = {"id": salva["id"], "numero_proposta": salva["numero_proposta"]}
+        return resultado_lote(propostas, inseridas, existentes)
+
+    async def buscar_por_chaves(self, chaves: List[str]) -> Dict[str, Dict[str, Any]]:
+        return {
+            chave: {"id": self.chaves[chave], "numero_proposta": self.propostas[self.chaves[chave]]["numero_proposta"]}
+            for chave in chaves if chave in self.chaves
+        }
+
+    async def buscar_proposta(self, proposta_id: str) -> Optional[Dict[str, Any]]:
+        return self.propostas.get(proposta_id)
+
+    async def registrar_visualizacao(
+        self,
+        proposta_id: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> None:
+        await self.registrar_visualizacoes([
+            {"proposta_id": proposta_id, "ip_address": ip_address, "user_agent": user_agent}
+        ])
+
+    async def registrar_visualizacoes(self, visualizacoes: List[Dict[str, Any]]) -> None:
+        for v in visualizacoes:
+            visualizado_em = v.get("visualizado_em")
+            visualizado_em = datetime.fromisoformat(visualizado_em) if visualizado_em else datetime.now(timezone.utc)
+            self.visualizacoes.append({
+                "id": len(self.visualizacoes) + 1,
+                "proposta_id": v["proposta_id"],
+                "ip_address": v.get("ip_address"),
+                "user_agent": v.get("user_agent"),
+                "visualizado_em": visualizado_em,
+                "pais": None,
+                "cidade": None
+            })
+
+            # Contadores da proposta, como o trigger trg_visualizacoes_contadores
+            proposta = self.propostas.get(v["proposta_id"])
+            if proposta is not None:
+                proposta["total_visualizacoes"] += 1
+                primeira, ultima = proposta["primeira_visualizacao"], proposta["ultima_visualizacao"]
+                proposta["primeira_visualizacao"] = min(primeira, visualizado_em) if primeira else visualizado_em
+                proposta["ultima_visualizacao"] = max(ultima, visualizado_em) if ultima else visualizado_em
+
+    async def registrar_visualizacoes_suprimidas(self, eventos: List[Dict[str, Any]]) -> None:
+        for contagem in agregar_suprimidas(eventos):
+            proposta = self.propostas.get(contagem["proposta_id"])
+            if proposta is not None:
+                proposta["visualizacoes_repetidas"] += contagem["repetidas"]
+                proposta["visualizacoes_bots"] += contagem["bots"]
+
+    async def reservar_visualizacoes_sem_geo(self, limite: int = 500, validade: int = 300) -> List[Dict[str, Any]]:
+        agora = datetime.now(timezone.utc)
+        pendentes = [
+            v for v in self.visualizacoes
+            if v["pais"] is None and v["ip_address"] is not None
+            and (v.get("geo_reservada_em") is None or (agora - v["geo_reservada_em"]).total_seconds() > validade)
+        ][:limite]
+        for v in pendentes:
+            v["geo_reservada_em"] = agora
+        return [{"id": v["id"], "ip_address": v["ip_address"]} for v in pendentes]
+
+    async def atualizar_geo_visualizacoes(self, linhas: List[Dict[str, Any]]) -> None:
+        # ids são sequenciais a partir de 1 (posição na lista)
+        for linha in linhas:
+            visualizacao = self.visualizacoes[linha["id"] - 1]
+            visualizacao["pais"] = linha["pais"]
+            visualizacao["cidade"] = linha["cidade"]
+
+    async def visualizacoes_por_local(self, proposta_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        contagens: Dict[Tuple[str, str], int] = {}
+        for v in self._da_proposta(proposta_id):
+            if v["pais"]:
+                chave = (v["pais"], v["cidade"])
+                contagens[chave] = contagens.get(chave, 0) + 1
+        return montar_locais([{"pais": p, "cidade": c, "total": n} for (p, c), n in contagens.items()])
+
+    def _da_proposta(self, proposta_id: str) -> List[Dict[str, Any]]:
+        linhas = [v for v in self.visualizacoes if v["proposta_id"] == proposta_id]
+        linhas.sort(key=lambda v: (v["visualizado_em"], v["id"]), reverse=True)
+        return linhas
+
+    async def listar_visualizacoes(self, proposta_id: str) -> List[Dict[str, Any]]:
+        return self._da_proposta(proposta_id)
+
+    async def contar_visualizacoes(self, proposta_id: str) -> int:
+        return len(self._da_proposta(proposta_id))
+
+    async def estatisticas_visualizacoes(self, proposta_id: str) -> Dict[str, Any]:
+        linhas = self._da_proposta(proposta_id)
+        return {
+            "total_visualizacoes": len(linhas),
+            "primeira_visualizacao": linhas[-1]["visualizado_em"] if linhas else None,
+            "ultima_visualizacao": linhas[0]["visualizado_em"] if linhas else None
+        }
+
+    async def listar_visualizacoes_pagina(
+        self,
+        proposta_id: str,
+        limite: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        limite = max(1, min(limite, MAX_PAGE_SIZE))
+        linhas = self._da_proposta(proposta_id)
+        if cursor:
+            visualizado_em, ultimo_id = decodificar_cursor(cursor)
+            chave = (datetime.fromisoformat(visualizado_em), ultimo_id)
+            linhas = [v for v in linhas if (v["visualizado_em"], v["id"]) < chave]
+        return paginar(linhas[:limite + 1], limite)
+
+    async def listar_visualizacoes_periodo(
+        self,
+        de: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        limite: int = 1000,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        limite = max(1, min(limite, MAX_EXPORT_PAGE_SIZE))
+        linhas = [
+            v for v in self.visualizacoes
+            if (de is None or v["visualizado_em"] >= de) and (ate is None or v["visualizado_em"] < ate)
+        ]
+        if cursor:
+            visualizado_em, ultimo_id = decodificar_cursor(cursor)
+            chave = (datetime.fromisoformat(visualizado_em), ultimo_id)
+            linhas = [v for v in linhas if (v["visualizado_em"], v["id"]) > chave]
+        linhas.sort(key=lambda v: (v["visualizado_em"], v["id"]))
+        return paginar(linhas[:limite + 1], limite)
+
+    async def listar_propostas(
+        self,
+        ordem: str = "created_at",
+        crescente: bool = False,
+        busca: Optional[str] = None,
+        visualizadas: Optional[bool] = None,
+        criada_de: Optional[datetime] = None,
+        criada_ate: Optional[datetime] = None,
+        limite: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        if ordem not in ORDENACOES_PROPOSTAS:
+            raise ValueError(f"Ordenação inválida: {ordem}")
+        limite = max(1, min(limite, MAX_PAGE_SIZE))
+
+        def chave(p):
+            # Nulos como o menor valor, id como desempate
+            valor = p[ordem]
+            return (valor is not None, valor if valor is not None else 0, p["id"])
+
+        linhas = list(self.propostas.values())
+        if busca:
+            termo = busca.lower()
+            linhas = [p for p in linhas if termo in p["cliente_nome"].lower() or termo in p["numero_proposta"].lower()]
+        if visualizadas is not None:
+            linhas = [p for p in linhas if (p["total_visualizacoes"] > 0) == visualizadas]
+        if criada_de:
+            linhas = [p for p in linhas if p["created_at"] >= criada_de]
+        if criada_ate:
+            linhas = [p for p in linhas if p["created_at"] < criada_ate]
+        if cursor:
+            valor, ultimo_id = decodificar_cursor_proposta(cursor, ordem)
+            limite_chave = chave({ordem: valor, "id": ultimo_id})
+            if crescente:
+                linhas = [p for p in linhas if chave(p) > limite_chave]
+            else:
+                linhas = [p for p in linhas if chave(p) < limite_chave]
+
+        linhas.sort(key=chave, reverse=not crescente)
+        pagina = [{coluna: p[coluna] for coluna in COLUNAS_LISTA_PROPOSTAS} for p in linhas[:limite + 1]]
+        return paginar(pagina, limite, lambda u: codificar_cursor_proposta(ordem, u[ordem], u["id"]))
+
+    async def listar_propostas_completas(
+        self,
+        apos_id: Optional[str] = None,
+        limite: int = 500
+    ) -> List[Dict[str, Any]]:
+        ids = sorted(i for i in self.propostas if apos_id is None or i > apos_id)
+        return [self.propostas[i] for i in ids[:limite]]
+
+    async def registrar_engajamentos(self, eventos: List[Dict[str, Any]]) -> None:
+        self.engajamentos.extend(e for e in eventos if e["proposta_id"] in self.propostas)
+
+    async def resumo_engajamento(self, proposta_id: str) -> Dict[str, Any]:
+        eventos = [e for e in self.engajamentos if e["proposta_id"] == proposta_id]
+        saidas = [e for e in eventos if e["tipo"] == "exit"]
+        secoes: Dict[str, int] = {}
+        for e in eventos:
+            for secao in e["secoes"]:
+                secoes[secao] = secoes.get(secao, 0) + 1
+        resumo = {
+            "eventos": len(eventos),
+            "saidas": len(saidas),
+            "tempo_total": sum(e["tempo_pagina"] for e in saidas),
+            "tempo_max": max((e["tempo_pagina"] for e in eventos), default=0),
+            "scroll_total": sum(e["scroll_max"] for e in saidas),
+            "scroll_max": max((e["scroll_max"] for e in eventos), default=0),
+            "ultimo_evento": max((e["registrado_em"] for e in eventos), default=None)
+        }
+        return montar_resumo_engajamento(resumo, [{"secao": s, "alcances": n} for s, n in secoes.items()])
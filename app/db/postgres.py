@@ -0,0 +1,561 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+
+import asyncpg
+
+from app.db.base import (
+    COLUNAS_LISTA_PROPOSTAS, MAX_EXPORT_PAGE_SIZE, MAX_PAGE_SIZE, ORDENACOES_PROPOSTAS, StorageBackend, agregar_suprimidas,
+    codificar_cursor_proposta, decodificar_cursor, decodificar_cursor_proposta, decodificar_json, montar_locais,
+    montar_resumo_engajamento, paginar, resultado_lote
+)
+
+# As consultas usam parâmetros posicionais; o asyncpg prepara cada uma na
+# primeira execução e reaproveita o statement preparado por conexão.
+SQL_INSERIR_PROPOSTA = """
+    INSERT INTO propostas (
+        cliente_nome, cliente_cpf_cnpj, cliente_endereco, cliente_cidade,
+        cliente_telefone, dados_sistema, dados_payback, investimento, chave_idempotencia
+    ) VALUES ($1, $2, $3, $4, $5, $6::jsonb, $7::jsonb, $8, $9)
+    ON CONFLICT (chave_idempotencia) DO NOTHING
+    RETURNING id, numero_proposta
+"""
+
+SQL_INSERIR_PROPOSTAS = """
+    INSERT INTO propostas (
+        cliente_nome, cliente_cpf_cnpj, cliente_endereco, cliente_cidade,
+        cliente_telefone, dados_sistema, dados_payback, investimento, chave_idempotencia
+    )
+    SELECT nome, doc, ende, cid, tel, ds::jsonb, dp::jsonb, inv, chave
+    FROM unnest(
+        $1::text[], $2::text[], $3::text[], $4::text[], $5::text[],
+        $6::text[], $7::text[], $8::float8[], $9::text[]
+    ) AS t(nome, doc, ende, cid, tel, ds, dp, inv, chave)
+    ON CONFLICT (chave_idempotencia) DO NOTHING
+    RETURNING id, numero_proposta, chave_idempotencia
+"""
+
+SQL_BUSCAR_POR_CHAVES = """
+    SELECT id, numero_proposta, chave_idempotencia FROM propostas
+    WHERE chave_idempotencia = ANY($1::text[])
+"""
+
+SQL_BUSCAR_PROPOSTA = "SELECT * FROM propostas WHERE id = $1::uuid"
+
+# Varredura da tabela em ordem de id (keyset pela chave primária)
+SQL_PROPOSTAS_COMPLETAS_INICIO = "SELECT * FROM propostas ORDER BY id LIMIT $1"
+SQL_PROPOSTAS_COMPLETAS_APOS = "SELECT * FROM propostas WHERE id > $1::uuid ORDER BY id LIMIT $2"
+
+SQL_INSERIR_VISUALIZACAO = """
+    INSERT INTO visualizacoes (proposta_id, ip_address, user_agent)
+    VALUES ($1::uuid, $2, $3)
+"""
+
+SQL_INSERIR_VISUALIZACOES = """
+    INSERT INTO visualizacoes (proposta_id, ip_address, user_agent, visualizado_em)
+    SELECT p, i, u, COALESCE(v, NOW())
+    FROM unnest($1::uuid[], $2::text[], $3::text[], $4::timestamptz[]) AS t(p, i, u, v)
+"""
+
+SQL_RESERVAR_SEM_GEO = "SELECT * FROM reservar_visualizacoes_sem_geo($1, $2)"
+
+SQL_ATUALIZAR_GEO = """
+    UPDATE visualizacoes v SET pais = l.pais, cidade = l.cidade
+    FROM unnest($1::int[], $2::text[], $3::text[]) AS l(id, pais, cidade)
+    WHERE v.id = l.id
+"""
+
+SQL_VISUALIZACOES_POR_LOCAL = "SELECT * FROM get_visualizacoes_por_local($1::uuid)"
+
+SQL_LISTAR_VISUALIZACOES = """
+    SELECT * FROM visualizacoes
+    WHERE proposta_id = $1::uuid
+    ORDER BY visualizado_em DESC
+"""
+
+SQL_CONTAR_VISUALIZACOES = "SELECT count(*) FROM visualizacoes WHERE proposta_id = $1::uuid"
+
+SQL_ESTATISTICAS = "SELECT * FROM get_proposta_stats($1::uuid)"
+
+SQL_PAGINA_VISUALIZACOES = """
+    SELECT * FROM visualizacoes
+    WHERE proposta_id = $1::uuid
+    ORDER BY visualizado_em DESC, id DESC
+    LIMIT $2
+"""
+
+SQL_PAGINA_VISUALIZACOES_CURSOR = """
+    SELECT * FROM visualizacoes
+    WHERE proposta_id = $1::uuid
+      AND (visualizado_em, id) < ($3::timestamptz, $4::int)
+    ORDER BY visualizado_em DESC, id DESC
+    LIMIT $2
+"""
+
+SQL_REGISTRAR_SUPRIMIDAS = "SELECT registrar_visualizacoes_suprimidas($1::jsonb)"
+
+SQL_REGISTRAR_ENGAJAMENTOS = "SELECT registrar_engajamentos($1::jsonb)"
+
+SQL_RESUMO_ENGAJAMENTO = "SELECT * FROM engajamento_resumo WHERE proposta_id = $1::uuid"
+
+SQL_SECOES_ENGAJAMENTO = """
+    SELECT secao, alcances FROM engajamento_secoes
+    WHERE proposta_id = $1::uuid
+"""
+
+
+def _sql_listar_propostas(
+    ordem: str,
+    crescente: bool,
+    busca: Optional[str],
+    visualizadas: Optional[bool],
+    criada_de: Optional[datetime],
+    criada_ate: Optional[datetime],
+    limite: int,
+    cursor: Optional[Tuple[Any, str]]
+) -> Tuple[str, list]:
+    """
+    Monta o SELECT da listagem de propostas. `ordem` já foi validada contra
+    ORDENACOES_PROPOSTAS (é o único trecho interpolado; o resto vai por parâmetro).
+    """
+    condicoes, params = [], []
+
+    def param(valor: Any) -> str:
+        params.append(valor)
+        return f"${len(params)}"
+
+    if busca:
+        termo = param("%" + busca.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        condicoes.append(f"(cliente_nome ILIKE {termo} OR numero_proposta ILIKE {termo})")
+    if visualizadas is not None:
+        condicoes.append("total_visualizacoes > 0" if visualizadas else "total_visualizacoes = 0")
+    if criada_de:
+        condicoes.append(f"created_at >= {param(criada_de)}")
+    if criada_ate:
+        condicoes.append(f"created_at < {param(criada_ate)}")
+
+    # Keyset: linhas depois de (valor, id) na ordem pedida, com nulos como o menor valor
+    if cursor:
+        valor, ultimo_id = cursor
+        id_ = param(ultimo_id) + "::uuid"
+        if crescente:
+            if valor is None:
+                condicoes.append(f"(({ordem} IS NULL AND id > {id_}) OR {ordem} IS NOT NULL)")
+            else:
+                v = param(valor)
+                condicoes.append(f"({ordem} > {v} OR ({ordem} = {v} AND id > {id_}))")
+        else:
+            if valor is None:
+                condicoes.append(f"({ordem} IS NULL AND id < {id_})")
+            else:
+                v = param(valor)
+                condicoes.append(f"({ordem} < {v} OR ({ordem} = {v} AND id < {id_}) OR {ordem} IS NULL)")
+
+    direcao = "ASC NULLS FIRST" if crescente else "DESC NULLS LAST"
+    sql = f"SELECT {', '.join(COLUNAS_LISTA_PROPOSTAS)} FROM propostas"
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    sql += f" ORDER BY {ordem} {direcao}, id {'ASC' if crescente else 'DESC'} LIMIT {param(limite)}"
+    return sql, params
+
+
+def _sql_visualizacoes_periodo(
+    de: Optional[datetime],
+    ate: Optional[datetime],
+    limite: int,
+    cursor: Optional[Tuple[datetime, int]]
+) -> Tuple[str, list]:
+    """Monta o SELECT da exportação de visualizações (keyset crescente em (visualizado_em, id))"""
+    condicoes, params = ["visualizado_em IS NOT NULL"], []
+
+    def param(valor: Any) -> str:
+        params.append(valor)
+        return f"${len(params)}"
+
+    if de:
+        condicoes.append(f"visualizado_em >= {param(de)}")
+    if ate:
+        condicoes.append(f"visualizado_em < {param(ate)}")
+    if cursor:
+        visualizado_em, ultimo_id = cursor
+        condicoes.append(f"(visualizado_em, id) > ({param(visualizado_em)}::timestamptz, {param(ultimo_id)}::int)")
+
+    sql = (
+        "SELECT * FROM visualizacoes WHERE " + " AND ".join(condicoes)
+        + f" ORDER BY visualizado_em, id LIMIT {param(limite)}"
+    )
+    return sql, params
+
+
+def _para_datetime(valor: Any) -> Optional[datetime]:
+    if valor is None or isinstance(valor, datetime):
+        return valor
+    return datetime.fromisoformat(valor)
+
+
+class PostgresBackend(StorageBackend):
+    def __init__(self, dsn: str = None):
+        """
+        Conexão direta com o PostgreSQL (pool assíncrono do asyncpg).
+
+        Usa as mesmas tabelas do database_schema.sql. Configuração:
+        DATABASE_URL, DB_POOL_MIN, DB_POOL_MAX e DB_TIMEOUT.
+        """
+        self.dsn = dsn or os.getenv("DATABASE_URL")
+        if not self.dsn:
+            raise ValueError("DATABASE_URL deve estar definido no .env para DB_BACKEND=postgres")
+
+        self.min_size = int(os.getenv("DB_POOL_MIN", 2))
+        self.max_size = int(os.getenv("DB_POOL_MAX", 20))
+        self.timeout = float(os.getenv("DB_TIMEOUT", 10))
+        self.pool: Optional[asyncpg.Pool] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self) -> None:
+        await self._get_pool()
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        if self.pool is None:
+            async with self._lock:
+                if self.pool is None:
+                    self.pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        command_timeout=self.timeout
+                    )
+        return self.pool
+
+    async def ping(self) -> None:
+        pool = await self._get_pool()
+        await pool.fetchval("SELECT 1")
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @staticmethod
+    def _parametros_proposta(
+        cliente: Dict[str, str],
+        dados_sistema: Dict[str, Any],
+        dados_payback: List[Dict[str, Any]],
+        chave_idempotencia: Optional[str] = None
+    ) -> tuple:
+        return (
+            cliente['nome'],
+            cliente['cpf_cnpj'],
+            cliente['endereco'],
+            cliente['cidade'],
+            cliente['telefone'],
+            json.dumps(dados_sistema),
+            json.dumps(dados_payback),
+            float(dados_sistema.get('investimento', 0)),
+            chave_idempotencia
+        )
+
+    @staticmethod
+    def _proposta_dict(row: asyncpg.Record) -> Dict[str, Any]:
+        proposta = dict(row)
+        proposta['id'] = str(proposta['id'])
+        proposta['dados_sistema'] = decodificar_json(proposta['dados_sistema'])
+        proposta['dados_payback'] = decodificar_json(proposta['dados_payback'])
+        if proposta.get('investimento') is not None:
+            proposta['investimento'] = float(proposta['investimento'])
+        return proposta
+
+    @staticmethod
+    def _visualizacao_dict(row: asyncpg.Record) -> Dict[str, Any]:
+        visualizacao = dict(row)
+        visualizacao['proposta_id'] = str(visualizacao['proposta_id'])
+        return visualizacao
+
+    async def salvar_proposta(
+        self,
+        cliente: Dict[str, str],
+        dados_sistema: Dict[str, Any],
+        dados_payback: List[Dict[str, Any]],
+        chave_idempotencia: Optional[str] = None
+    ) -> Dict[str, Any]:
+        try:
+            pool = await self._get_pool()
+            row = await pool.fetchrow(
+                SQL_INSERIR_PROPOSTA,
+                *self._parametros_proposta(cliente, dados_sistema, dados_payback, chave_idempotencia)
+            )
+            if row is not None:
+                return {"id": str(row['id']), "numero_proposta": row['numero_proposta'], "criada": True}
+
+            # Conflito na chave: requisição repetida, devolve a proposta já gravada
+            existente = (await self.buscar_por_chaves([chave_idempotencia]))[chave_idempotencia]
+            return {**existente, "criada": False}
+
+        except Exception as e:
+            raise Exception(f"Erro ao salvar proposta: {str(e)}")
+
+    async def salvar_propostas(self, propostas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not propostas:
+            return []
+
+        try:
+            # Um único INSERT com arrays por coluna (uma ida ao banco por lote)
+            linhas = [self._parametros_proposta(**p) for p in propostas]
+            colunas = [list(coluna) for coluna in zip(*linhas)]
+
+            pool = await self._get_pool()
+            rows = await pool.fetch(SQL_INSERIR_PROPOSTAS, *colunas)
+
+            # RETURNING não garante ordem nem traz as linhas em conflito: casa pela chave
+            inseridas = {
+                row['chave_idempotencia']: {"id": str(row['id']), "numero_proposta": row['numero_proposta']}
+                for row in rows
+            }
+            faltando = [p['chave_idempotencia'] for p in propostas if p['chave_idempotencia'] not in inseridas]
+            existentes = await self.buscar_por_chaves(faltando) if faltando else {}
+            return resultado_lote(propostas, inseridas, existentes)
+
+        except Exception as e:
+            raise Exception(f"Erro ao salvar lote de propostas: {str(e)}")
+
+    async def buscar_por_chaves(self, chaves: List[str]) -> Dict[str, Dict[str, Any]]:
+        try:
+            pool = await self._get_pool()
+            rows = await pool.fetch(SQL_BUSCAR_POR_CHAVES, list(set(chaves)))
+            return {
+                row['chave_idempotencia']: {"id": str(row['id']), "numero_proposta": row['numero_proposta']}
+                for row in rows
+            }
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar propostas por chave: {str(e)}")
+
+    async def buscar_proposta(self, proposta_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            pool = await self._get_pool()
+            row = await pool.fetchrow(SQL_BUSCAR_PROPOSTA, proposta_id)
+            return self._proposta_dict(row) if row else None
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar proposta: {str(e)}")
+
+    async def registrar_visualizacao(
+        self,
+        proposta_id: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> None:
+        try:
+            pool = await self._get_pool()
+            await pool.execute(SQL_INSERIR_VISUALIZACAO, proposta_id, ip_address, user_agent)
+
+        except Exception as e:
+            # Não falhar se não conseguir registrar visualização
+            print(f"Aviso: Não foi possível registrar visualização: {str(e)}")
+
+    async def registrar_visualizacoes(self, visualizacoes: List[Dict[str, Any]]) -> None:
+        if not visualizacoes:
+            return
+
+        try:
+            pool = await self._get_pool()
+            await pool.execute(
+                SQL_INSERIR_VISUALIZACOES,
+                [v["proposta_id"] for v in visualizacoes],
+                [v.get("ip_address") for v in visualizacoes],
+                [v.get("user_agent") for v in visualizacoes],
+                [_para_datetime(v.get("visualizado_em")) for v in visualizacoes]
+            )
+
+        except Exception as e:
+            raise Exception(f"Erro ao registrar visualizações: {str(e)}")
+
+    async def registrar_visualizacoes_suprimidas(self, eventos: List[Dict[str, Any]]) -> None:
+        if not eventos:
+            return
+
+        try:
+            pool = await self._get_pool()
+            await pool.execute(SQL_REGISTRAR_SUPRIMIDAS, json.dumps(agregar_suprimidas(eventos)))
+
+        except Exception as e:
+            raise Exception(f"Erro ao registrar visualizações suprimidas: {str(e)}")
+
+    async def reservar_visualizacoes_sem_geo(self, limite: int = 500, validade: int = 300) -> List[Dict[str, Any]]:
+        try:
+            pool = await self._get_pool()
+            rows = await pool.fetch(SQL_RESERVAR_SEM_GEO, limite, validade)
+            return [dict(row) for row in rows]
+
+        except Exception as e:
+            raise Exception(f"Erro ao reservar visualizações sem localização: {str(e)}")
+
+    async def atualizar_geo_visualizacoes(self, linhas: List[Dict[str, Any]]) -> None:
+        if not linhas:
+            return
+
+        try:
+            pool = await self._get_pool()
+            await pool.execute(
+                SQL_ATUALIZAR_GEO,
+                [linha["id"] for linha in linhas],
+                [linha["pais"] for linha in linhas],
+                [linha["cidade"] for linha in linhas]
+            )
+
+        except Exception as e:
+            raise Exception(f"Erro ao atualizar localização das visualizações: {str(e)}")
+
+    async def visualizacoes_por_local(self, proposta_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            pool = await self._get_pool()
+            rows = await pool.fetch(SQL_VISUALIZACOES_POR_LOCAL, proposta_id)
+            return montar_locais([dict(row) for row in rows])
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar visualizações por local: {str(e)}")
+
+    async def listar_visualizacoes(self, proposta_id: str) -> List[Dict[str, Any]]:
+        try:
+            pool = await self._get_pool()
+            rows = await pool.fetch(SQL_LISTAR_VISUALIZACOES, proposta_id)
+            return [self._visualizacao_dict(row) for row in rows]
+
+        except Exception as e:
+            raise Exception(f"Erro ao listar visualizações: {str(e)}")
+
+    async def contar_visualizacoes(self, proposta_id: str) -> int:
+        try:
+            pool = await self._get_pool()
+            return await pool.fetchval(SQL_CONTAR_VISUALIZACOES, proposta_id)
+
+        except Exception as e:
+            return 0
+
+    async def estatisticas_visualizacoes(self, proposta_id: str) -> Dict[str, Any]:
+        try:
+            pool = await self._get_pool()
+            row = await pool.fetchrow(SQL_ESTATISTICAS, proposta_id)
+            return dict(row)
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar estatísticas: {str(e)}")
+
+    async def listar_visualizacoes_pagina(
+        self,
+        proposta_id: str,
+        limite: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        limite = max(1, min(limite, MAX_PAGE_SIZE))
+        if cursor:
+            visualizado_em, ultimo_id = decodificar_cursor(cursor)
+
+        try:
+            pool = await self._get_pool()
+            if cursor:
+                rows = await pool.fetch(
+                    SQL_PAGINA_VISUALIZACOES_CURSOR, proposta_id, limite + 1,
+                    _para_datetime(visualizado_em), ultimo_id
+                )
+            else:
+                rows = await pool.fetch(SQL_PAGINA_VISUALIZACOES, proposta_id, limite + 1)
+            return paginar([self._visualizacao_dict(row) for row in rows], limite)
+
+        except Exception as e:
+            raise Exception(f"Erro ao listar visualizações: {str(e)}")
+
+    async def listar_visualizacoes_periodo(
+        self,
+        de: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        limite: int = 1000,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        limite = max(1, min(limite, MAX_EXPORT_PAGE_SIZE))
+        chave = None
+        if cursor:
+            visualizado_em, ultimo_id = decodificar_cursor(cursor)
+            chave = (_para_datetime(visualizado_em), ultimo_id)
+        sql, params = _sql_visualizacoes_periodo(de, ate, limite + 1, chave)
+
+        try:
+            pool = await self._get_pool()
+            rows = await pool.fetch(sql, *params)
+            return paginar([self._visualizacao_dict(row) for row in rows], limite)
+
+        except Exception as e:
+            raise Exception(f"Erro ao exportar visualizações: {str(e)}")
+
+    async def listar_propostas(
+        self,
+        ordem: str = "created_at",
+        crescente: bool = False,
+        busca: Optional[str] = None,
+        visualizadas: Optional[bool] = None,
+        criada_de: Optional[datetime] = None,
+        criada_ate: Optional[datetime] = None,
+        limite: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        if ordem not in ORDENACOES_PROPOSTAS:
+            raise ValueError(f"Ordenação inválida: {ordem}")
+        limite = max(1, min(limite, MAX_PAGE_SIZE))
+        chave = decodificar_cursor_proposta(cursor, ordem) if cursor else None
+        sql, params = _sql_listar_propostas(
+            ordem, crescente, busca, visualizadas, criada_de, criada_ate, limite + 1, chave
+        )
+
+        try:
+            pool = await self._get_pool()
+            rows = await pool.fetch(sql, *params)
+            linhas = []
+            for row in rows:
+                linha = dict(row)
+                linha['id'] = str(linha['id'])
+                if linha.get('investimento') is not None:
+                    linha['investimento'] = float(linha['investimento'])
+                linhas.append(linha)
+            return paginar(linhas, limite, lambda u: codificar_cursor_proposta(ordem, u[ordem], u['id']))
+
+        except Exception as e:
+            raise Exception(f"Erro ao listar propostas: {str(e)}")
+
+    async def listar_propostas_completas(
+        self,
+        apos_id: Optional[str] = None,
+        limite: int = 500
+    ) -> List[Dict[str, Any]]:
+        try:
+            pool = await self._get_pool()
+            if apos_id is None:
+                rows = await pool.fetch(SQL_PROPOSTAS_COMPLETAS_INICIO, limite)
+            else:
+                rows = await pool.fetch(SQL_PROPOSTAS_COMPLETAS_APOS, apos_id, limite)
+            return [self._proposta_dict(row) for row in rows]
+
+        except Exception as e:
+            raise Exception(f"Erro ao listar propostas: {str(e)}")
+
+    async def registrar_engajamentos(self, eventos: List[Dict[str, Any]]) -> None:
+        if not eventos:
+            return
+
+        try:
+            # Insert dos eventos + upsert dos resumos numa única chamada (ver schema)
+            pool = await self._get_pool()
+            await pool.execute(SQL_REGISTRAR_ENGAJAMENTOS, json.dumps(eventos, default=str))
+
+        except Exception as e:
+            raise Exception(f"Erro ao registrar engajamentos: {str(e)}")
+
+    async def resumo_engajamento(self, proposta_id: str) -> Dict[str, Any]:
+        try:
+            pool = await self._get_pool()
+            resumo = await pool.fetchrow(SQL_RESUMO_ENGAJAMENTO, proposta_id)
+            secoes = await pool.fetch(SQL_SECOES_ENGAJAMENTO, proposta_id)
+            return montar_resumo_engajamento(dict(resumo) if resumo else None, [dict(s) for s in secoes])
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar engajamento: {str(e)}")
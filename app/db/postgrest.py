@@ -0,0 +1,712 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+
+import httpx
+
+from app.db.base import (
+    COLUNAS_LISTA_PROPOSTAS, MAX_EXPORT_PAGE_SIZE, MAX_PAGE_SIZE, ORDENACOES_PROPOSTAS, StorageBackend, agregar_suprimidas,
+    codificar_cursor_proposta, decodificar_cursor, decodificar_cursor_proposta, decodificar_json, montar_locais,
+    montar_resumo_engajamento, paginar, resultado_lote
+)
+
+
+# max-rows padrão do Supabase: respostas maiores são cortadas em silêncio
+# (a página, com a linha extra do keyset, tem que caber)
+MAX_ROWS = 1000
+
+
+def _literal(valor: Any) -> str:
+    """Valor entre aspas para os filtros lógicos do PostgREST (vírgulas e parênteses não quebram a expressão)"""
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    texto = str(valor).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{texto}"'
+
+
+def _filtro_listar_propostas(
+    ordem: str,
+    crescente: bool,
+    busca: Optional[str],
+    visualizadas: Optional[bool],
+    criada_de: Optional[datetime],
+    criada_ate: Optional[datetime],
+    cursor: Optional[Tuple[Any, str]]
+) -> Optional[str]:
+    """Monta o filtro `and=(...)` da listagem de propostas (mesma lógica de _sql_listar_propostas)"""
+    condicoes = []
+
+    if busca:
+        # No ilike do PostgREST o curinga é *; os curingas do SQL ficam escapados
+        termo = _literal("*" + busca.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "*")
+        condicoes.append(f"or(cliente_nome.ilike.{termo},numero_proposta.ilike.{termo})")
+    if visualizadas is not None:
+        condicoes.append("total_visualizacoes.gt.0" if visualizadas else "total_visualizacoes.eq.0")
+    if criada_de:
+        condicoes.append(f"created_at.gte.{_literal(criada_de)}")
+    if criada_ate:
+        condicoes.append(f"created_at.lt.{_literal(criada_ate)}")
+
+    # Keyset: linhas depois de (valor, id) na ordem pedida, com nulos como o menor valor
+    if cursor:
+        valor, ultimo_id = cursor
+        if crescente:
+            if valor is None:
+                condicoes.append(f"or(and({ordem}.is.null,id.gt.{ultimo_id}),{ordem}.not.is.null)")
+            else:
+                v = _literal(valor)
+                condicoes.append(f"or({ordem}.gt.{v},and({ordem}.eq.{v},id.gt.{ultimo_id}))")
+        else:
+            if valor is None:
+                condicoes.append(f"and({ordem}.is.null,id.lt.{ultimo_id})")
+            else:
+                v = _literal(valor)
+                condicoes.append(f"or({ordem}.lt.{v},and({ordem}.eq.{v},id.lt.{ultimo_id}),{ordem}.is.null)")
+
+    return f"({','.join(condicoes)})" if condicoes else None
+
+
+class PostgRESTBackend(StorageBackend):
+    def __init__(self):
+        """
+        Configura o cliente HTTP assíncrono para a API REST (PostgREST) do Supabase.
+
+        O cliente mantém um pool de conexões keep-alive reaproveitado entre
+        requisições, e um semáforo limita quantas chamadas ficam em voo ao mesmo tempo.
+        Ele só é criado em connect() (ou na primeira chamada): montar o contexto
+        TLS custa dezenas de ms e fica fora da importação da aplicação.
+        """
+        supabase_url = os.getenv("SUPABASE_URL")
+        supabase_key = os.getenv("SUPABASE_KEY")
+
+        if not supabase_url or not supabase_key:
+            raise ValueError("SUPABASE_URL e SUPABASE_KEY devem estar definidos no .env")
+
+        self._base_url = f"{supabase_url.rstrip('/')}/rest/v1"
+        self._key = supabase_key
+        self.client: Optional[httpx.AsyncClient] = None
+        self._semaforo = asyncio.Semaphore(int(os.getenv("DB_MAX_CONCURRENCY", 50)))
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None:
+            timeout = httpx.Timeout(
+                float(os.getenv("DB_TIMEOUT", 10)),
+                connect=float(os.getenv("DB_CONNECT_TIMEOUT", 5))
+            )
+            limits = httpx.Limits(
+                max_connections=int(os.getenv("DB_MAX_CONNECTIONS", 100)),
+                max_keepalive_connections=int(os.getenv("DB_MAX_KEEPALIVE", 20)),
+                keepalive_expiry=float(os.getenv("DB_KEEPALIVE_EXPIRY", 30))
+            )
+            self.client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers={
+                    "apikey": self._key,
+                    "Authorization": f"Bearer {self._key}",
+                    "Content-Type": "application/json"
+                },
+                timeout=timeout,
+                limits=limits
+            )
+        return self.client
+
+    async def connect(self) -> None:
+        self._get_client()
+
+    async def ping(self) -> None:
+        """Menor consulta possível (também abre a primeira conexão TLS do pool)"""
+        await self._request("GET", "/propostas", params={"select": "id", "limit": 1})
+
+    async def close(self) -> None:
+        """Fecha o pool de conexões (chamado no shutdown da aplicação)"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Executa uma chamada ao PostgREST respeitando o limite de concorrência"""
+        client = self._get_client()
+        async with self._semaforo:
+            response = await client.request(method, path, **kwargs)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _linha_proposta(
+        cliente: Dict[str, str],
+        dados_sistema: Dict[str, Any],
+        dados_payback: List[Dict[str, Any]],
+        chave_idempotencia: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Monta a linha da tabela `propostas` (numero_proposta vem do default do banco)"""
+        return {
+            "cliente_nome": cliente['nome'],
+            "cliente_cpf_cnpj": cliente['cpf_cnpj'],
+            "cliente_endereco": cliente['endereco'],
+            "cliente_cidade": cliente['cidade'],
+            "cliente_telefone": cliente['telefone'],
+            "dados_sistema": dados_sistema,
+            "dados_payback": dados_payback,
+            "investimento": float(dados_sistema.get('investimento', 0)),
+            "chave_idempotencia": chave_idempotencia
+        }
+
+    async def _inserir_propostas(self, linhas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """INSERT que ignora chaves de idempotência já gravadas (ON CONFLICT DO NOTHING)"""
+        response = await self._request(
+            "POST",
+            "/propostas",
+            params={"select": "id,numero_proposta,chave_idempotencia", "on_conflict": "chave_idempotencia"},
+            headers={"Prefer": "return=representation,resolution=ignore-duplicates"},
+            json=linhas
+        )
+        return response.json()
+
+    async def salvar_proposta(
+        self,
+        cliente: Dict[str, str],
+        dados_sistema: Dict[str, Any],
+        dados_payback: List[Dict[str, Any]],
+        chave_idempotencia: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Salva proposta no banco
+
+        Args:
+            cliente: Dicionário com dados do cliente
+            dados_sistema: Dados extraídos do sistema fotovoltaico
+            dados_payback: Lista com dados de payback por ano
+            chave_idempotencia: Hash que identifica a requisição (retentativas
+                com a mesma chave devolvem a proposta já gravada)
+
+        Returns:
+            Dict com id (UUID), numero_proposta e criada (False se já existia)
+        """
+        try:
+            linhas = await self._inserir_propostas(
+                [self._linha_proposta(cliente, dados_sistema, dados_payback, chave_idempotencia)]
+            )
+            if linhas:
+                return {"id": linhas[0]['id'], "numero_proposta": linhas[0]['numero_proposta'], "criada": True}
+
+            # Conflito na chave: requisição repetida, devolve a proposta já gravada
+            existente = (await self.buscar_por_chaves([chave_idempotencia]))[chave_idempotencia]
+            return {**existente, "criada": False}
+
+        except Exception as e:
+            raise Exception(f"Erro ao salvar proposta: {str(e)}")
+
+    async def salvar_propostas(self, propostas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Salva várias propostas num único INSERT
+
+        Args:
+            propostas: Lista de dicts com cliente, dados_sistema, dados_payback
+                e chave_idempotencia (mesmos argumentos de salvar_proposta)
+
+        Returns:
+            Lista de {id, numero_proposta, criada} na mesma ordem da entrada
+        """
+        if not propostas:
+            return []
+
+        try:
+            linhas = await self._inserir_propostas([self._linha_proposta(**p) for p in propostas])
+
+            inseridas = {
+                linha['chave_idempotencia']: {"id": linha['id'], "numero_proposta": linha['numero_proposta']}
+                for linha in linhas
+            }
+            faltando = [p['chave_idempotencia'] for p in propostas if p['chave_idempotencia'] not in inseridas]
+            existentes = await self.buscar_por_chaves(faltando) if faltando else {}
+            return resultado_lote(propostas, inseridas, existentes)
+
+        except Exception as e:
+            raise Exception(f"Erro ao salvar lote de propostas: {str(e)}")
+
+    async def buscar_por_chaves(self, chaves: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca propostas pelas chaves de idempotência
+
+        Args:
+            chaves: Chaves (hashes hexadecimais)
+
+        Returns:
+            Dict {chave: {id, numero_proposta}} só com as que existem
+        """
+        try:
+            response = await self._request(
+                "GET",
+                "/propostas",
+                params={
+                    "select": "id,numero_proposta,chave_idempotencia",
+                    "chave_idempotencia": f"in.({','.join(sorted(set(chaves)))})"
+                }
+            )
+            return {
+                linha['chave_idempotencia']: {"id": linha['id'], "numero_proposta": linha['numero_proposta']}
+                for linha in response.json()
+            }
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar propostas por chave: {str(e)}")
+
+    async def buscar_proposta(self, proposta_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca proposta pelo ID
+
+        Args:
+            proposta_id: UUID da proposta
+
+        Returns:
+            Dict com dados da proposta ou None se não encontrada
+        """
+        try:
+            response = await self._request(
+                "GET",
+                "/propostas",
+                params={"select": "*", "id": f"eq.{proposta_id}"}
+            )
+            data = response.json()
+
+            if data:
+                proposta = data[0]
+                # Converter JSON strings de volta para dicts
+                proposta['dados_sistema'] = decodificar_json(proposta['dados_sistema'])
+                proposta['dados_payback'] = decodificar_json(proposta['dados_payback'])
+                return proposta
+
+            return None
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar proposta: {str(e)}")
+
+    async def registrar_visualizacao(
+        self,
+        proposta_id: str,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> None:
+        """
+        Registra uma visualização da proposta
+
+        Args:
+            proposta_id: UUID da proposta
+            ip_address: IP do visitante
+            user_agent: User agent do navegador
+        """
+        try:
+            await self._request(
+                "POST",
+                "/visualizacoes",
+                headers={"Prefer": "return=minimal"},
+                json={
+                    "proposta_id": proposta_id,
+                    "ip_address": ip_address,
+                    "user_agent": user_agent
+                }
+            )
+
+        except Exception as e:
+            # Não falhar se não conseguir registrar visualização
+            print(f"Aviso: Não foi possível registrar visualização: {str(e)}")
+
+    async def registrar_visualizacoes(self, visualizacoes: List[Dict[str, Any]]) -> None:
+        """
+        Registra várias visualizações num único INSERT (usado pela fila write-behind)
+
+        Args:
+            visualizacoes: Lista de dicts com proposta_id, ip_address, user_agent
+                e visualizado_em
+        """
+        if not visualizacoes:
+            return
+
+        try:
+            await self._request(
+                "POST",
+                "/visualizacoes",
+                headers={"Prefer": "return=minimal"},
+                json=visualizacoes
+            )
+
+        except Exception as e:
+            raise Exception(f"Erro ao registrar visualizações: {str(e)}")
+
+    async def registrar_visualizacoes_suprimidas(self, eventos: List[Dict[str, Any]]) -> None:
+        """
+        Soma as aberturas repetidas e de robôs aos contadores das propostas
+        (RPC registrar_visualizacoes_suprimidas, uma linha por proposta)
+
+        Args:
+            eventos: Lista de dicts com proposta_id e motivo ("repetida" ou "bot")
+        """
+        if not eventos:
+            return
+
+        try:
+            await self._request(
+                "POST",
+                "/rpc/registrar_visualizacoes_suprimidas",
+                json={"p_contagens": agregar_suprimidas(eventos)}
+            )
+
+        except Exception as e:
+            raise Exception(f"Erro ao registrar visualizações suprimidas: {str(e)}")
+
+    async def reservar_visualizacoes_sem_geo(self, limite: int = 500, validade: int = 300) -> List[Dict[str, Any]]:
+        """
+        Reserva visualizações com IP que ainda não passaram pela geolocalização
+        (RPC reservar_visualizacoes_sem_geo: outros workers não recebem as mesmas)
+
+        Args:
+            limite: Tamanho do lote
+            validade: Segundos até a reserva expirar (worker que caiu no meio do lote)
+
+        Returns:
+            Lista de dicts com id e ip_address
+        """
+        try:
+            response = await self._request(
+                "POST",
+                "/rpc/reservar_visualizacoes_sem_geo",
+                json={"p_limite": limite, "p_validade": validade}
+            )
+            return response.json()
+
+        except Exception as e:
+            raise Exception(f"Erro ao reservar visualizações sem localização: {str(e)}")
+
+    async def atualizar_geo_visualizacoes(self, linhas: List[Dict[str, Any]]) -> None:
+        """
+        Grava país e cidade de um lote de visualizações (RPC atualizar_geo_visualizacoes)
+
+        Args:
+            linhas: Lista de dicts com id, pais e cidade
+        """
+        if not linhas:
+            return
+
+        try:
+            await self._request(
+                "POST",
+                "/rpc/atualizar_geo_visualizacoes",
+                json={"p_linhas": linhas}
+            )
+
+        except Exception as e:
+            raise Exception(f"Erro ao atualizar localização das visualizações: {str(e)}")
+
+    async def visualizacoes_por_local(self, proposta_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Visualizações de uma proposta por país e cidade (RPC get_visualizacoes_por_local)
+
+        Args:
+            proposta_id: UUID da proposta
+
+        Returns:
+            Dict com paises e cidades (ver montar_locais)
+        """
+        try:
+            response = await self._request(
+                "POST",
+                "/rpc/get_visualizacoes_por_local",
+                json={"p_proposta_id": proposta_id}
+            )
+            return montar_locais(response.json())
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar visualizações por local: {str(e)}")
+
+    async def listar_visualizacoes(self, proposta_id: str) -> List[Dict[str, Any]]:
+        """
+        Lista todas as visualizações de uma proposta
+
+        Args:
+            proposta_id: UUID da proposta
+
+        Returns:
+            Lista de visualizações ordenadas por data (mais recente primeiro)
+        """
+        try:
+            response = await self._request(
+                "GET",
+                "/visualizacoes",
+                params={
+                    "select": "*",
+                    "proposta_id": f"eq.{proposta_id}",
+                    "order": "visualizado_em.desc"
+                }
+            )
+
+            return response.json()
+
+        except Exception as e:
+            raise Exception(f"Erro ao listar visualizações: {str(e)}")
+
+    async def contar_visualizacoes(self, proposta_id: str) -> int:
+        """
+        Conta total de visualizações de uma proposta
+
+        Args:
+            proposta_id: UUID da proposta
+
+        Returns:
+            int: Total de visualizações
+        """
+        try:
+            # O total vem no header Content-Range (ex: "0-0/42" ou "*/0")
+            response = await self._request(
+                "GET",
+                "/visualizacoes",
+                params={"select": "id", "proposta_id": f"eq.{proposta_id}", "limit": 1},
+                headers={"Prefer": "count=exact"}
+            )
+
+            content_range = response.headers.get("content-range", "")
+            total = content_range.rsplit("/", 1)[-1]
+            return int(total) if total.isdigit() else 0
+
+        except Exception as e:
+            return 0
+
+    async def estatisticas_visualizacoes(self, proposta_id: str) -> Dict[str, Any]:
+        """
+        Estatísticas de visualização calculadas no banco (RPC get_proposta_stats)
+
+        Args:
+            proposta_id: UUID da proposta
+
+        Returns:
+            Dict com total_visualizacoes, primeira_visualizacao e ultima_visualizacao
+        """
+        try:
+            response = await self._request(
+                "POST",
+                "/rpc/get_proposta_stats",
+                json={"p_proposta_id": proposta_id}
+            )
+            data = response.json()
+
+            if data:
+                return data[0]
+            return {"total_visualizacoes": 0, "primeira_visualizacao": None, "ultima_visualizacao": None}
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar estatísticas: {str(e)}")
+
+    async def listar_visualizacoes_pagina(
+        self,
+        proposta_id: str,
+        limite: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Lista uma página de visualizações (mais recente primeiro)
+
+        Args:
+            proposta_id: UUID da proposta
+            limite: Tamanho da página (máximo MAX_PAGE_SIZE)
+            cursor: Cursor retornado pela página anterior
+
+        Returns:
+            (visualizações, cursor da próxima página ou None)
+        """
+        limite = max(1, min(limite, MAX_PAGE_SIZE))
+        params = {
+            "select": "*",
+            "proposta_id": f"eq.{proposta_id}",
+            "order": "visualizado_em.desc,id.desc",
+            "limit": limite + 1
+        }
+        if cursor:
+            visualizado_em, ultimo_id = decodificar_cursor(cursor)
+            params["or"] = (
+                f'(visualizado_em.lt."{visualizado_em}",'
+                f'and(visualizado_em.eq."{visualizado_em}",id.lt.{ultimo_id}))'
+            )
+
+        try:
+            response = await self._request("GET", "/visualizacoes", params=params)
+            return paginar(response.json(), limite)
+
+        except Exception as e:
+            raise Exception(f"Erro ao listar visualizações: {str(e)}")
+
+    async def listar_visualizacoes_periodo(
+        self,
+        de: Optional[datetime] = None,
+        ate: Optional[datetime] = None,
+        limite: int = 1000,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Lista uma página das visualizações de todas as propostas (exportação)
+
+        Args:
+            de / ate: Intervalo de visualizado_em [de, até)
+            limite: Tamanho da página (máximo MAX_EXPORT_PAGE_SIZE, e abaixo do max-rows)
+            cursor: Cursor retornado pela página anterior
+
+        Returns:
+            (visualizações em ordem crescente, cursor da próxima página ou None)
+        """
+        limite = max(1, min(limite, MAX_EXPORT_PAGE_SIZE, MAX_ROWS - 1))
+        condicoes = ["visualizado_em.not.is.null"]
+        if de:
+            condicoes.append(f"visualizado_em.gte.{_literal(de)}")
+        if ate:
+            condicoes.append(f"visualizado_em.lt.{_literal(ate)}")
+        if cursor:
+            visualizado_em, ultimo_id = decodificar_cursor(cursor)
+            v = _literal(visualizado_em)
+            condicoes.append(f"or(visualizado_em.gt.{v},and(visualizado_em.eq.{v},id.gt.{ultimo_id}))")
+
+        params = {
+            "select": "*",
+            "and": f"({','.join(condicoes)})",
+            "order": "visualizado_em.asc,id.asc",
+            "limit": limite + 1
+        }
+
+        try:
+            response = await self._request("GET", "/visualizacoes", params=params)
+            return paginar(response.json(), limite)
+
+        except Exception as e:
+            raise Exception(f"Erro ao exportar visualizações: {str(e)}")
+
+    async def listar_propostas(
+        self,
+        ordem: str = "created_at",
+        crescente: bool = False,
+        busca: Optional[str] = None,
+        visualizadas: Optional[bool] = None,
+        criada_de: Optional[datetime] = None,
+        criada_ate: Optional[datetime] = None,
+        limite: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Lista uma página de propostas com os contadores de visualização
+
+        Args:
+            ordem: Coluna de ordenação (ORDENACOES_PROPOSTAS)
+            crescente: Ordem crescente (padrão: decrescente)
+            busca: Trecho do nome do cliente ou do número da proposta
+            visualizadas: True = já abertas, False = nunca abertas, None = todas
+            criada_de / criada_ate: Intervalo de criação [de, até)
+            limite: Tamanho da página (máximo MAX_PAGE_SIZE)
+            cursor: Cursor retornado pela página anterior
+
+        Returns:
+            (propostas, cursor da próxima página ou None)
+        """
+        if ordem not in ORDENACOES_PROPOSTAS:
+            raise ValueError(f"Ordenação inválida: {ordem}")
+        limite = max(1, min(limite, MAX_PAGE_SIZE))
+        chave = decodificar_cursor_proposta(cursor, ordem) if cursor else None
+
+        direcao = "asc.nullsfirst" if crescente else "desc.nullslast"
+        params = {
+            "select": ",".join(COLUNAS_LISTA_PROPOSTAS),
+            "order": f"{ordem}.{direcao},id.{'asc' if crescente else 'desc'}",
+            "limit": limite + 1
+        }
+        filtro = _filtro_listar_propostas(ordem, crescente, busca, visualizadas, criada_de, criada_ate, chave)
+        if filtro:
+            params["and"] = filtro
+
+        try:
+            response = await self._request("GET", "/propostas", params=params)
+            linhas = response.json()
+            for linha in linhas:
+                if linha.get('investimento') is not None:
+                    linha['investimento'] = float(linha['investimento'])
+            return paginar(linhas, limite, lambda u: codificar_cursor_proposta(ordem, u[ordem], u['id']))
+
+        except Exception as e:
+            raise Exception(f"Erro ao listar propostas: {str(e)}")
+
+    async def listar_propostas_completas(
+        self,
+        apos_id: Optional[str] = None,
+        limite: int = 500
+    ) -> List[Dict[str, Any]]:
+        """
+        Lista propostas completas em ordem de id (varredura da tabela em páginas)
+
+        Args:
+            apos_id: ID da última proposta da página anterior (None = início)
+            limite: Tamanho da página
+
+        Returns:
+            Lista de propostas no formato de buscar_proposta
+        """
+        params = {"select": "*", "order": "id.asc", "limit": limite}
+        if apos_id is not None:
+            params["id"] = f"gt.{apos_id}"
+
+        try:
+            response = await self._request("GET", "/propostas", params=params)
+            propostas = response.json()
+            for proposta in propostas:
+                proposta['dados_sistema'] = decodificar_json(proposta['dados_sistema'])
+                proposta['dados_payback'] = decodificar_json(proposta['dados_payback'])
+            return propostas
+
+        except Exception as e:
+            raise Exception(f"Erro ao listar propostas: {str(e)}")
+
+    async def registrar_engajamentos(self, eventos: List[Dict[str, Any]]) -> None:
+        """
+        Grava um lote de eventos de engajamento (RPC registrar_engajamentos, que
+        também atualiza engajamento_resumo e engajamento_secoes)
+
+        Args:
+            eventos: Lista de dicts com proposta_id, tipo, sessao, tempo_pagina,
+                scroll_max, secoes e registrado_em
+        """
+        if not eventos:
+            return
+
+        try:
+            await self._request(
+                "POST",
+                "/rpc/registrar_engajamentos",
+                json={"p_eventos": eventos}
+            )
+
+        except Exception as e:
+            raise Exception(f"Erro ao registrar engajamentos: {str(e)}")
+
+    async def resumo_engajamento(self, proposta_id: str) -> Dict[str, Any]:
+        """
+        Resumo de engajamento de uma proposta
+
+        Args:
+            proposta_id: UUID da proposta
+
+        Returns:
+            Dict com eventos, saidas, tempo_medio, tempo_max, scroll_medio,
+            scroll_max, ultimo_evento e secoes ({secao: alcances})
+        """
+        try:
+            resumo, secoes = await asyncio.gather(
+                self._request(
+                    "GET",
+                    "/engajamento_resumo",
+                    params={"select": "*", "proposta_id": f"eq.{proposta_id}"}
+                ),
+                self._request(
+                    "GET",
+                    "/engajamento_secoes",
+                    params={"select": "secao,alcances", "proposta_id": f"eq.{proposta_id}"}
+                )
+            )
+            linhas = resumo.json()
+            return montar_resumo_engajamento(linhas[0] if linhas else None, secoes.json())
+
+        except Exception as e:
+            raise Exception(f"Erro ao buscar engajamento: {str(e)}")
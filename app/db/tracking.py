@@ -0,0 +1,181 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.metrics import TRACKING_FALHAS
+
+
+class WriteBehindQueue:
+    """
+    Fila write-behind: recebe eventos no caminho da requisição sem esperar o banco
+    e grava em lote (por tamanho ou por intervalo) numa task em background.
+
+    - A memória é limitada por `max_size`; acima disso novos eventos são descartados
+      (contabilizados em `descartados`) para nunca travar a requisição.
+    - Se a gravação falhar, o lote é tentado de novo com espera exponencial
+      (`interval`, 2x, 4x... até `backoff_max`); depois de `max_tentativas`
+      falhas ele é abandonado (log + `abandonados`) e a fila segue, para um
+      lote ruim (constraint, permissão) não travar todos os eventos seguintes.
+    - `stop()` esvazia a fila antes de encerrar (deploy/restart não perde eventos).
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+        batch_size: int = 100,
+        interval: float = 1.0,
+        max_size: int = 10000,
+        nome: str = "fila",
+        max_tentativas: int = 5,
+        backoff_max: float = 30.0
+    ):
+        self._flush = flush
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_size = max_size
+        self.nome = nome
+        self.max_tentativas = max_tentativas
+        self.backoff_max = backoff_max
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        # Lote que falhou, aguardando a próxima tentativa (fora do buffer)
+        self._falho: Optional[List[Dict[str, Any]]] = None
+        self._tentativas = 0
+        self._proxima_tentativa = 0.0
+        self._evento = asyncio.Event()
+        self._task = None
+        self._fechando = False
+
+        # Contadores
+        self.enfileirados = 0
+        self.gravados = 0
+        self.descartados = 0
+        self.abandonados = 0
+        self.falhas = 0
+
+    def start(self) -> None:
+        """Inicia a task de gravação (chamar dentro do event loop)"""
+        if self._task is None:
+            self._fechando = False
+            self._task = asyncio.create_task(self._loop())
+
+    def put(self, evento: Dict[str, Any]) -> bool:
+        """
+        Enfileira um evento sem bloquear.
+
+        Returns:
+            bool: False se o evento foi descartado por falta de espaço
+        """
+        if len(self._buffer) >= self.max_size:
+            self._descartar(1)
+            self._evento.set()
+            return False
+
+        self._buffer.append(evento)
+        self.enfileirados += 1
+        if len(self._buffer) >= self.batch_size:
+            self._evento.set()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._buffer) + len(self._falho or ())
+
+    async def _loop(self) -> None:
+        while not self._fechando:
+            # Em backoff, só o stop() interrompe a espera (fila cheia não adianta a tentativa)
+            limite = time.monotonic() + self.interval
+            if self._falho is not None:
+                limite = max(limite, self._proxima_tentativa)
+            while not self._fechando:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._evento.wait(), timeout=restante)
+                except asyncio.TimeoutError:
+                    break
+                self._evento.clear()
+                if self._falho is None:
+                    break
+            self._evento.clear()
+            await self._gravar_pendentes()
+
+    async def _gravar_pendentes(self, forcar: bool = False) -> bool:
+        """
+        Grava tudo que está na fila em lotes, começando pelo lote que falhou (se
+        já passou o backoff, ou com `forcar`). Retorna False se algum lote falhou.
+        """
+        if self._falho is not None:
+            if not forcar and time.monotonic() < self._proxima_tentativa:
+                return False
+            lote, self._falho = self._falho, None
+            if not await self._gravar(lote):
+                return False
+
+        while self._buffer:
+            lote = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not await self._gravar(lote):
+                return False
+        return True
+
+    async def _gravar(self, lote: List[Dict[str, Any]]) -> bool:
+        try:
+            await self._flush(lote)
+        except Exception as e:
+            self.falhas += 1
+            self._tentativas += 1
+            TRACKING_FALHAS.labels(self.nome, "lote").inc()
+            print(f"Aviso: Falha ao gravar lote de {len(lote)} eventos ({self.nome}), "
+                  f"tentativa {self._tentativas}/{self.max_tentativas}: {str(e)}")
+
+            if self._tentativas >= self.max_tentativas:
+                print(f"Aviso: Lote de {len(lote)} eventos abandonado após {self._tentativas} tentativas ({self.nome})")
+                self.abandonados += len(lote)
+                TRACKING_FALHAS.labels(self.nome, "abandonado").inc(len(lote))
+                self._tentativas = 0
+                # Os próximos lotes seguem (o erro pode ser só deste lote)
+                return True
+
+            self._falho = lote
+            espera = min(self.interval * 2 ** (self._tentativas - 1), self.backoff_max)
+            self._proxima_tentativa = time.monotonic() + espera
+            return False
+
+        self.gravados += len(lote)
+        self._tentativas = 0
+        return True
+
+    async def stop(self, tentativas: int = 3) -> None:
+        """Encerra a task e grava os eventos pendentes (drain no shutdown)"""
+        self._fechando = True
+        self._evento.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+        for tentativa in range(tentativas):
+            if await self._gravar_pendentes(forcar=True):
+                return
+            await asyncio.sleep(0.5 * (tentativa + 1))
+
+        if len(self):
+            print(f"Aviso: {len(self)} eventos não gravados no shutdown ({self.nome})")
+            self._descartar(len(self))
+            self._buffer.clear()
+            self._falho = None
+
+    def _descartar(self, quantidade: int) -> None:
+        if quantidade:
+            self.descartados += quantidade
+            TRACKING_FALHAS.labels(self.nome, "descartado").inc(quantidade)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pendentes": len(self),
+            "enfileirados": self.enfileirados,
+            "gravados": self.gravados,
+            "descartados": self.descartados,
+            "abandonados": self.abandonados,
+            "falhas": self.falhas
+        }
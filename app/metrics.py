@@ -0,0 +1,163 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+from starlette.datastructures import MutableHeaders
+
+# Buckets em segundos: de consultas rápidas (1ms) a renderizações lentas
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REQUEST_LATENCY = Histogram(
+    "proposta_http_request_duration_seconds",
+    "Tempo total das requisições HTTP",
+    ["metodo", "rota", "status"],
+    buckets=BUCKETS
+)
+DB_LATENCY = Histogram(
+    "proposta_db_duration_seconds",
+    "Tempo das chamadas ao banco por método de Database",
+    ["metodo"],
+    buckets=BUCKETS
+)
+STAGE_LATENCY = Histogram(
+    "proposta_stage_duration_seconds",
+    "Tempo das etapas de processamento (extracao, payback, grafico, template)",
+    ["etapa"],
+    buckets=BUCKETS
+)
+TRACKING_FALHAS = Counter(
+    "proposta_tracking_falhas_total",
+    "Falhas ao gravar eventos de tracking (lote com erro, evento descartado ou abandonado)",
+    ["fila", "tipo"]
+)
+CACHE_REQUESTS = Counter(
+    "proposta_cache_requests_total",
+    "Consultas aos caches em memória (resultado: hit, miss ou coalescido)",
+    ["cache", "resultado"]
+)
+STARTUP_DURATION = Histogram(
+    "proposta_startup_duration_seconds",
+    "Tempo desde o início da importação da aplicação até cada marco do startup",
+    ["etapa"],
+    buckets=BUCKETS
+)
+
+# Tempos da requisição atual, enviados no header Server-Timing
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("server_timing", default=None)
+
+
+def registrar_tempo(nome: str, segundos: float) -> None:
+    """Soma o tempo de uma etapa ao Server-Timing da requisição atual (se houver)"""
+    timings = _timings.get()
+    if timings is not None:
+        timings[nome] = timings.get(nome, 0.0) + segundos
+
+
+@contextmanager
+def medir(etapa: str):
+    """Mede uma etapa de processamento (histograma + Server-Timing)"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        STAGE_LATENCY.labels(etapa).observe(duracao)
+        registrar_tempo(etapa, duracao)
+
+
+@contextmanager
+def medir_db(metodo: str):
+    """Mede uma chamada ao banco (histograma por método + Server-Timing "db")"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracao = time.perf_counter() - inicio
+        DB_LATENCY.labels(metodo).observe(duracao)
+        registrar_tempo("db", duracao)
+
+
+class Inicializacao:
+    """
+    Marcos do cold start do processo, contados desde o início da importação de
+    main.py: "importada", "pronta" (aquecimento do lifespan concluído) e
+    "primeira_requisicao" (primeira resposta enviada). Cada marco é registrado
+    uma vez (histograma + /ready).
+    """
+
+    def __init__(self, inicio: float = None):
+        self.inicio = inicio if inicio is not None else time.perf_counter()
+        self.marcos: Dict[str, float] = {}
+
+    def marcar(self, etapa: str) -> None:
+        if etapa not in self.marcos:
+            segundos = time.perf_counter() - self.inicio
+            self.marcos[etapa] = segundos
+            STARTUP_DURATION.labels(etapa).observe(segundos)
+
+    def stats(self) -> Dict[str, float]:
+        return {f"{etapa}_ms": round(segundos * 1000, 1) for etapa, segundos in self.marcos.items()}
+
+
+def metrics_response():
+    """
+    Corpo e content-type do endpoint /metrics (formato texto do Prometheus).
+
+    Com vários workers (gunicorn.conf.py define PROMETHEUS_MULTIPROC_DIR), soma
+    os valores de todos os processos em vez de só os do worker que atendeu.
+    """
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def _server_timing(timings: Dict[str, float], total: float) -> str:
+    partes = [f"{nome};dur={segundos * 1000:.1f}" for nome, segundos in timings.items()]
+    partes.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(partes)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede o tempo total de cada requisição (por rota e status)
+    e devolve os tempos das etapas no header Server-Timing. Com `inicializacao`,
+    marca também a primeira requisição atendida pelo processo.
+    """
+
+    def __init__(self, app, inicializacao: Optional[Inicializacao] = None):
+        self.app = app
+        self.inicializacao = inicializacao
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+        status = 500
+
+        async def enviar(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", _server_timing(timings, time.perf_counter() - inicio))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _timings.reset(token)
+            endpoint = scope.get("endpoint")
+            rota = getattr(endpoint, "__name__", type(endpoint).__name__) if endpoint else "desconhecida"
+            REQUEST_LATENCY.labels(scope["method"], rota, str(status)).observe(time.perf_counter() - inicio)
+            if self.inicializacao is not None:
+                self.inicializacao.marcar("primeira_requisicao")
@@ -1,6 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import Annotated, List, Optional, Dict, Any
 from datetime import datetime
+import hashlib
+import json
 
 class ClienteInput(BaseModel):
     """Dados do cliente"""
@@ -34,6 +36,18 @@ class PropostaInput(BaseModel):
     cliente: ClienteInput
     dados_completos: List[Dict[str, Any]] = Field(..., description="Array com todos os dados da planilha")
 
+    def hash_canonico(self) -> str:
+        """SHA-256 do JSON canônico (chaves ordenadas, sem espaços): mesmo conteúdo, mesmo hash"""
+        canonico = json.dumps(
+            self.model_dump(mode="json"), sort_keys=True, separators=(",", ":"), ensure_ascii=False
+        )
+        return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+class PropostaBatchInput(BaseModel):
+    """Entrada para criação de propostas em lote"""
+    propostas: List[PropostaInput] = Field(..., description="Lista de propostas a criar")
+    chunk_size: Optional[int] = Field(None, ge=1, le=1000, description="Propostas por INSERT (padrão: BATCH_CHUNK_SIZE)")
+
 class PropostaResponse(BaseModel):
     """Resposta após criar proposta"""
     status: str
@@ -58,11 +72,62 @@ class VisualizacaoResponse(BaseModel):
     visualizado_em: datetime
     ip_address: Optional[str]
     user_agent: Optional[str]
+    pais: Optional[str] = Field(None, description="País pelo IP (preenchido em background)")
+    cidade: Optional[str] = Field(None, description="Cidade pelo IP (preenchido em background)")
+
+class EngajamentoResponse(BaseModel):
+    """Resumo de engajamento (beacons enviados pela página)"""
+    eventos: int = 0
+    saidas: int = Field(0, description="Visitas encerradas (eventos de saída)")
+    tempo_medio: Optional[float] = Field(None, description="Tempo médio na página por visita (segundos)")
+    tempo_max: int = 0
+    scroll_medio: Optional[float] = Field(None, description="Rolagem máxima média por visita (%)")
+    scroll_max: int = 0
+    ultimo_evento: Optional[datetime] = None
+    secoes: Dict[str, int] = Field(default_factory=dict, description="Visitas que alcançaram cada seção")
 
 class EstatisticasResponse(BaseModel):
     """Estatísticas de visualizações de uma proposta"""
     proposta_id: str
-    total_visualizacoes: int
+    total_visualizacoes: int = Field(..., description="Visualizações únicas (gravadas no histórico)")
+    visualizacoes_brutas: int = Field(0, description="Todas as aberturas: únicas + repetidas + robôs")
+    visualizacoes_repetidas: int = Field(0, description="Reaberturas do mesmo IP e navegador dentro da janela")
+    visualizacoes_bots: int = Field(0, description="Aberturas por robôs (prévias de link, monitores)")
     primeira_visualizacao: Optional[datetime]
     ultima_visualizacao: Optional[datetime]
     historico: List[VisualizacaoResponse]
+    proximo_cursor: Optional[str] = Field(None, description="Cursor para a próxima página do histórico (None = fim)")
+    engajamento: Optional[EngajamentoResponse] = None
+
+# Valores aceitos em cada dimensão da simulação
+Taxa = Annotated[float, Field(ge=-0.5, le=1.0)]
+Juros = Annotated[float, Field(ge=0.0, le=1.0)]
+Degradacao = Annotated[float, Field(ge=0.0, le=0.2)]
+Escala = Annotated[float, Field(gt=0.0, le=10.0)]
+Prazo = Annotated[int, Field(ge=0, le=30)]
+
+class SimulacaoInput(BaseModel):
+    """Cenários de payback a simular (cada lista é uma dimensão; simula todas as combinações)"""
+    proposta_id: Optional[str] = Field(None, description="Proposta salva: usa o dados_sistema dela")
+    dados_sistema: Optional[Dict[str, Any]] = Field(
+        None, description="Sem proposta_id: investimento, geracao_mensal, conta_antes (conta_depois e consumo_atual opcionais)"
+    )
+    inflacao_tarifa: List[Taxa] = Field([0.05], min_length=1, max_length=100, description="Reajuste anual da tarifa (0.05 = 5%)")
+    degradacao: List[Degradacao] = Field([0.005], min_length=1, max_length=100, description="Perda anual de geração dos módulos")
+    escala: List[Escala] = Field([1.0], min_length=1, max_length=100, description="Tamanho do sistema (1.0 = proposto); escala geração e investimento")
+    taxa_juros: List[Juros] = Field([0.0], min_length=1, max_length=100, description="Juros anuais do financiamento")
+    prazo_anos: List[Prazo] = Field([0], min_length=1, max_length=31, description="Prazo do financiamento (0 = à vista)")
+    taxa_desconto: float = Field(0.0, ge=0.0, le=1.0, description="Taxa anual para o VPL")
+    incluir_series: bool = Field(False, description="Inclui o saldo acumulado ano a ano de cada cenário")
+
+class SimulacaoResponse(BaseModel):
+    """Resultado por cenário, em listas alinhadas (cenário i = np.unravel_index(i, tamanhos da grade))"""
+    cenarios: int
+    horizonte_anos: int
+    dimensoes: List[str]
+    grade: Dict[str, List[float]]
+    payback_anos: List[Optional[float]] = Field(..., description="Anos até o retorno (None = não retorna no horizonte)")
+    economia_total: List[Optional[float]]
+    saldo_final: List[Optional[float]]
+    vpl: List[Optional[float]]
+    saldo_acumulado: Optional[List[List[float]]] = Field(None, description="Ano 0 até horizonte_anos, por cenário")
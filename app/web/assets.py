@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+try:
+    from PIL import Image, features
+except ImportError:  # Pillow é opcional: sem ele os originais são servidos como estão
+    Image = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from app.web.compression import encodings_aceitos
+from app.web.template_service import PROJECT_ROOT
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), '..', 'assets')
+STATIC_URL = "/static"
+
+# Larguras geradas para o srcset (limitadas à largura do original)
+LARGURAS = (160, 320, 640, 960, 1280)
+# Largura máxima do fallback <img src> para navegadores sem WebP/AVIF
+LARGURA_FALLBACK = 1280
+
+EXTENSOES_IMAGEM = ('.png', '.jpg', '.jpeg')
+# Arquivos de texto que recebem versões pré-comprimidas (.gz/.br)
+EXTENSOES_COMPRIMIVEIS = ('.svg', '.css', '.js', '.json', '.txt')
+SUFIXOS = {"br": ".br", "gzip": ".gz"}
+
+# Nome com hash de conteúdo: logo-320w.0123456789.webp / logo.0123456789.png
+RE_HASH = re.compile(r'\.[0-9a-f]{10}\.[a-z0-9]+$')
+
+MANIFEST = 'manifest.json'
+VERSAO_PIPELINE = 1
+
+
+def _hash_arquivo(caminho: str) -> str:
+    with open(caminho, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _versao_manifest(manifest: Dict[str, Dict[str, Any]]) -> str:
+    """Hash curto do manifest: muda quando algum asset (URL ou srcset) muda"""
+    return hashlib.sha1(json.dumps(manifest, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class AssetPipeline:
+    """
+    Gera as versões otimizadas de app/assets no startup (ou no build do Docker).
+
+    Para cada imagem: variantes WebP/AVIF redimensionadas (srcset) e um PNG de
+    fallback reduzido, todos com hash do conteúdo no nome (cache imutável).
+    Os originais também são copiados, para as URLs antigas continuarem válidas.
+    O resultado é descrito em manifest.json; se as fontes não mudaram, o build é pulado.
+    """
+
+    def __init__(self, src_dir: str = ASSETS_DIR, out_dir: str = None):
+        self.src_dir = os.path.abspath(src_dir)
+        self.out_dir = out_dir or os.getenv("ASSETS_BUILD_DIR", os.path.join(PROJECT_ROOT, ".cache", "assets"))
+        self.manifest: Dict[str, Dict[str, Any]] = {}
+        self.versao = _versao_manifest(self.manifest)
+
+    def _fontes(self) -> Dict[str, str]:
+        return {
+            nome: _hash_arquivo(os.path.join(self.src_dir, nome))
+            for nome in sorted(os.listdir(self.src_dir))
+            if os.path.isfile(os.path.join(self.src_dir, nome))
+        }
+
+    def build(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        fontes = self._fontes()
+        caminho_manifest = os.path.join(self.out_dir, MANIFEST)
+
+        if not force and os.path.exists(caminho_manifest):
+            try:
+                with open(caminho_manifest) as f:
+                    salvo = json.load(f)
+                if salvo.get("versao") == VERSAO_PIPELINE and salvo.get("fontes") == fontes:
+                    self.manifest = salvo["assets"]
+                    self.versao = _versao_manifest(self.manifest)
+                    return self.manifest
+            except (OSError, ValueError):
+                pass
+
+        os.makedirs(self.out_dir, exist_ok=True)
+        manifest = {}
+        for nome, sha in fontes.items():
+            origem = os.path.join(self.src_dir, nome)
+            shutil.copy2(origem, os.path.join(self.out_dir, nome))
+            try:
+                manifest[nome] = self._processar(nome, origem, sha[:10])
+            except Exception as e:
+                print(f"Aviso: Falha ao otimizar asset {nome}: {str(e)}")
+                manifest[nome] = {"src": f"{STATIC_URL}/{nome}"}
+
+        with open(caminho_manifest, 'w') as f:
+            json.dump({"versao": VERSAO_PIPELINE, "fontes": fontes, "assets": manifest}, f, indent=2)
+
+        self.manifest = manifest
+        self.versao = _versao_manifest(manifest)
+        return manifest
+
+    def _processar(self, nome: str, origem: str, sha: str) -> Dict[str, Any]:
+        base, ext = os.path.splitext(nome)
+        ext = ext.lower()
+
+        if ext in EXTENSOES_COMPRIMIVEIS:
+            destino = f"{base}.{sha}{ext}"
+            shutil.copy2(origem, os.path.join(self.out_dir, destino))
+            self._precomprimir(os.path.join(self.out_dir, destino))
+            return {"src": f"{STATIC_URL}/{destino}"}
+
+        if ext not in EXTENSOES_IMAGEM or Image is None:
+            return {"src": f"{STATIC_URL}/{nome}"}
+
+        entrada: Dict[str, Any] = {}
+        with Image.open(origem) as img:
+            img.load()
+            largura, altura = img.size
+            entrada["width"], entrada["height"] = largura, altura
+
+            # Fallback PNG/JPEG reduzido e otimizado
+            fallback = self._redimensionar(img, min(largura, LARGURA_FALLBACK))
+            destino = f"{base}.{sha}{ext}"
+            formato = "PNG" if ext == ".png" else "JPEG"
+            fallback.save(os.path.join(self.out_dir, destino), formato, optimize=True)
+            entrada["src"] = f"{STATIC_URL}/{destino}"
+
+            larguras = [w for w in LARGURAS if w < largura] + [min(largura, LARGURAS[-1])]
+            formatos = [("webp", {"quality": 80, "method": 4})]
+            if features.check("avif"):
+                formatos.append(("avif", {"quality": 55, "speed": 8}))
+
+            for formato_saida, opcoes in formatos:
+                srcset = []
+                for w in sorted(set(larguras)):
+                    destino = f"{base}-{w}w.{sha}.{formato_saida}"
+                    self._redimensionar(img, w).save(os.path.join(self.out_dir, destino), formato_saida.upper(), **opcoes)
+                    srcset.append(f"{STATIC_URL}/{destino} {w}w")
+                entrada[formato_saida] = ", ".join(srcset)
+
+        return entrada
+
+    @staticmethod
+    def _redimensionar(img, largura: int):
+        if largura >= img.size[0]:
+            return img
+        altura = round(img.size[1] * largura / img.size[0])
+        return img.resize((largura, altura), Image.LANCZOS)
+
+    @staticmethod
+    def _precomprimir(caminho: str) -> None:
+        with open(caminho, 'rb') as f:
+            dados = f.read()
+        with open(caminho + '.gz', 'wb') as f:
+            f.write(gzip.compress(dados, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(caminho + '.br', 'wb') as f:
+                f.write(brotli.compress(dados, quality=11))
+
+    def get(self, nome: str) -> Dict[str, Any]:
+        """Entrada do manifest (sempre tem `src`; `webp`/`avif` são srcsets opcionais)"""
+        return self.manifest.get(nome) or {"src": f"{STATIC_URL}/{nome}"}
+
+    def url(self, nome: str) -> str:
+        return self.get(nome)["src"]
+
+
+class AssetStaticFiles(StaticFiles):
+    """
+    StaticFiles com cache imutável para arquivos com hash no nome e
+    envio de variantes pré-comprimidas (.br/.gz) quando o cliente aceita.
+    """
+
+    CACHE_IMUTAVEL = "public, max-age=31536000, immutable"
+    CACHE_PADRAO = "public, max-age=3600"
+
+    async def get_response(self, path: str, scope) -> Any:
+        response = None
+
+        comprimivel = path.endswith(EXTENSOES_COMPRIMIVEIS)
+        if comprimivel:
+            # Mesma negociação das respostas dinâmicas (q=0 recusa o encoding);
+            # sem a variante preferida no disco, tenta a próxima aceita
+            for encoding in encodings_aceitos(Headers(scope=scope).get("accept-encoding")):
+                try:
+                    response = await super().get_response(path + SUFIXOS[encoding], scope)
+                except HTTPException:
+                    continue
+                response.headers["content-encoding"] = encoding
+                response.headers["content-type"] = mimetypes.guess_type(path)[0] or "application/octet-stream"
+                break
+
+        if response is None:
+            response = await super().get_response(path, scope)
+        if comprimivel:
+            response.headers["vary"] = "Accept-Encoding"
+
+        if response.status_code in (200, 304):
+            response.headers["cache-control"] = self.CACHE_IMUTAVEL if RE_HASH.search(path) else self.CACHE_PADRAO
+        return response
@@ -0,0 +1,44 @@
+import base64
+import os
+import secrets
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+
+def _credencial(authorization: Optional[str]) -> Optional[str]:
+    """Token enviado como Bearer ou como senha do HTTP Basic (o usuário é ignorado)"""
+    if not authorization:
+        return None
+    esquema, _, valor = authorization.partition(" ")
+    esquema = esquema.lower()
+    if esquema == "bearer":
+        return valor.strip()
+    if esquema == "basic":
+        try:
+            _, _, senha = base64.b64decode(valor.strip()).decode("utf-8").partition(":")
+        except ValueError:
+            return None
+        return senha
+    return None
+
+
+def exigir_admin(request: Request) -> None:
+    """
+    Dependência das rotas administrativas (/admin e exportações), que listam
+    todas as propostas e os dados dos clientes.
+
+    Exige ADMIN_TOKEN, como Bearer ou como senha do HTTP Basic (o navegador
+    pede usuário e senha). Sem ADMIN_TOKEN configurado, as rotas ficam fechadas.
+    """
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        raise HTTPException(status_code=503, detail="Área administrativa desativada: defina ADMIN_TOKEN")
+
+    credencial = _credencial(request.headers.get("authorization"))
+    if credencial is None or not secrets.compare_digest(credencial.encode(), token.encode()):
+        raise HTTPException(
+            status_code=401,
+            detail="Credencial de administrador inválida",
+            headers={"WWW-Authenticate": 'Basic realm="admin", charset="UTF-8"'}
+        )
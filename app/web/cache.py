@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.metrics import CACHE_REQUESTS
+
+
+@dataclass
+class CachedRender:
+    """HTML renderizado de uma proposta, pronto para ser enviado"""
+    body: bytes
+    etag: str
+    criado_em: float
+    # Variantes comprimidas do corpo por encoding (br/gzip), geradas sob demanda
+    variantes: Dict[str, bytes] = field(default_factory=dict)
+
+
+def make_etag(body: bytes) -> str:
+    """Gera um ETag forte a partir do conteúdo"""
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Verifica se o header If-None-Match contém o ETag atual (ou *)"""
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato == etag:
+            return True
+    return False
+
+
+class RenderCache:
+    """
+    Cache LRU + TTL em memória para propostas renderizadas.
+
+    Requisições simultâneas para a mesma chave que não está no cache
+    aguardam uma única renderização em vez de cada uma renderizar de novo;
+    essas esperas contam como "coalescido", nem hit nem miss (pagaram a
+    latência do render).
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600, nome: str = "render"):
+        self.max_entries = max_entries
+        self.nome = nome
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CachedRender]" = OrderedDict()
+        self._em_andamento: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalescidos = 0
+
+    def get(self, key: Hashable) -> Optional[CachedRender]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.criado_em > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, body: bytes) -> CachedRender:
+        entry = CachedRender(body=body, etag=make_etag(body), criado_em=time.monotonic())
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def get_or_render(
+        self,
+        key: Hashable,
+        render: Callable[[], Awaitable[Optional[bytes]]]
+    ) -> Optional[CachedRender]:
+        """
+        Retorna a entrada do cache ou renderiza uma única vez.
+
+        Se `render` retornar None (ex: proposta não encontrada), nada é armazenado.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            self._contar("hit")
+            return entry
+
+        pendente = self._em_andamento.get(key)
+        if pendente is not None:
+            self._contar("coalescido")
+            return await asyncio.shield(pendente)
+
+        self._contar("miss")
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._em_andamento[key] = future
+        try:
+            body = await render()
+            entry = self.set(key, body) if body is not None else None
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita warning de exceção não recuperada quando ninguém mais aguarda
+            future.exception()
+            raise
+        finally:
+            del self._em_andamento[key]
+
+    def _contar(self, resultado: str) -> None:
+        if resultado == "hit":
+            self.hits += 1
+        elif resultado == "miss":
+            self.misses += 1
+        else:
+            self.coalescidos += 1
+        CACHE_REQUESTS.labels(self.nome, resultado).inc()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalescidos": self.coalescidos
+        }
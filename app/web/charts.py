@@ -0,0 +1,144 @@
+import math
+from typing import List, Optional, Sequence
+
+from markupsafe import Markup, escape
+
+from app.web.template_service import format_currency
+
+COLOR_RED = '#e74c3c'
+COLOR_GOLD = '#f1c40f'
+COLOR_TEXT = '#34495e'
+COLOR_GRID = '#e2e8f0'
+FONT_FAMILY = "'Outfit', sans-serif"
+
+
+def nice_ticks(minimo: float, maximo: float, quantidade: int = 6) -> List[float]:
+    """Divisões "redondas" do eixo Y (passos de 1, 2, 2,5 ou 5 x 10^n) incluindo o zero"""
+    minimo = min(minimo, 0.0)
+    maximo = max(maximo, 0.0)
+    if maximo == minimo:
+        maximo = minimo + 1
+
+    bruto = (maximo - minimo) / max(quantidade - 1, 1)
+    magnitude = 10 ** math.floor(math.log10(bruto))
+    for fator in (1, 2, 2.5, 5, 10):
+        passo = fator * magnitude
+        if passo >= bruto:
+            break
+
+    inicio = math.floor(minimo / passo) * passo
+    fim = math.ceil(maximo / passo) * passo
+    n = int(round((fim - inicio) / passo))
+    return [inicio + i * passo for i in range(n + 1)]
+
+
+def format_k(valor: float) -> str:
+    """Rótulo compacto do eixo (R$ -45k, R$ 1,2M)"""
+    if abs(valor) >= 1_000_000:
+        return f"R$ {valor / 1_000_000:g}M".replace(".", ",")
+    if abs(valor) >= 1000 or valor == 0:
+        return f"R$ {valor / 1000:g}k".replace(".", ",")
+    return f"R$ {valor:g}".replace(".", ",")
+
+
+class BarChart:
+    """
+    Gráfico de barras renderizado no servidor como SVG inline (sem JavaScript).
+
+    Barras negativas ficam em vermelho e positivas em dourado; cada barra tem um
+    <title> com o valor formatado, exibido como tooltip nativo pelo navegador.
+    """
+
+    def __init__(
+        self,
+        titulo: str = "",
+        serie: str = "",
+        largura: int = 900,
+        altura: int = 360,
+        cor_negativa: str = COLOR_RED,
+        cor_positiva: str = COLOR_GOLD,
+        max_rotulos_x: int = 13
+    ):
+        self.titulo = titulo
+        self.serie = serie
+        self.largura = largura
+        self.altura = altura
+        self.cor_negativa = cor_negativa
+        self.cor_positiva = cor_positiva
+        self.max_rotulos_x = max_rotulos_x
+
+    def render(self, labels: Sequence[str], values: Sequence[float], aria_label: Optional[str] = None) -> Markup:
+        w, h = self.largura, self.altura
+        margem_esq, margem_dir = 70, 10
+        margem_topo = 45 if self.titulo else 15
+        margem_base = 30
+        area_w = w - margem_esq - margem_dir
+        area_h = h - margem_topo - margem_base
+
+        ticks = nice_ticks(min(values, default=0.0), max(values, default=0.0))
+        y_min, y_max = ticks[0], ticks[-1]
+
+        def y(valor: float) -> float:
+            return margem_topo + (y_max - valor) / (y_max - y_min) * area_h
+
+        partes = [
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {w} {h}" width="100%" height="100%" '
+            f'role="img" aria-label="{escape(aria_label or self.titulo)}" '
+            f'font-family="{FONT_FAMILY}" preserveAspectRatio="xMidYMid meet">'
+        ]
+
+        if self.titulo:
+            partes.append(
+                f'<text x="{w / 2:.1f}" y="24" text-anchor="middle" font-size="18" '
+                f'font-weight="bold" fill="{COLOR_TEXT}">{escape(self.titulo)}</text>'
+            )
+
+        # Grade e rótulos do eixo Y
+        for tick in ticks:
+            ty = y(tick)
+            partes.append(
+                f'<line x1="{margem_esq}" x2="{w - margem_dir}" y1="{ty:.1f}" y2="{ty:.1f}" '
+                f'stroke="{COLOR_GRID}" stroke-dasharray="5 5"/>'
+            )
+            partes.append(
+                f'<text x="{margem_esq - 8}" y="{ty + 4:.1f}" text-anchor="end" font-size="12" '
+                f'fill="{COLOR_TEXT}">{escape(format_k(tick))}</text>'
+            )
+
+        # Barras
+        n = len(values)
+        if n:
+            slot = area_w / n
+            barra = slot * 0.8
+            zero = y(0.0)
+            passo_rotulo = max(1, math.ceil(n / self.max_rotulos_x))
+
+            for i, (label, valor) in enumerate(zip(labels, values)):
+                x = margem_esq + i * slot + (slot - barra) / 2
+                topo = min(y(valor), zero)
+                altura_barra = max(abs(y(valor) - zero), 0.5)
+                cor = self.cor_negativa if valor < 0 else self.cor_positiva
+                dica = f"{label}: {self.serie + ': ' if self.serie else ''}{format_currency(valor)}"
+                partes.append(
+                    f'<rect x="{x:.1f}" y="{topo:.1f}" width="{barra:.1f}" height="{altura_barra:.1f}" '
+                    f'rx="4" fill="{cor}"><title>{escape(dica)}</title></rect>'
+                )
+                if i % passo_rotulo == 0:
+                    partes.append(
+                        f'<text x="{x + barra / 2:.1f}" y="{h - 10}" text-anchor="middle" font-size="12" '
+                        f'fill="{COLOR_TEXT}">{escape(label)}</text>'
+                    )
+
+            partes.append(
+                f'<line x1="{margem_esq}" x2="{w - margem_dir}" y1="{zero:.1f}" y2="{zero:.1f}" '
+                f'stroke="{COLOR_TEXT}" stroke-width="1"/>'
+            )
+
+        partes.append('</svg>')
+        return Markup("".join(partes))
+
+
+payback_chart = BarChart(
+    titulo="Análise de Retorno (Payback) - Saldo Acumulado",
+    serie="Saldo Acumulado (R$)"
+)
@@ -0,0 +1,216 @@
+import gzip
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # sem brotli, apenas gzip é negociado
+    brotli = None
+
+from app.metrics import registrar_tempo
+from app.web.cache import CachedRender
+
+# Tipos comprimidos (HTML das propostas/admin e respostas JSON da API)
+TIPOS_COMPRIMIVEIS = ("text/html", "application/json")
+
+# Níveis para respostas comprimidas a cada requisição (rápidos) e para as
+# variantes guardadas no cache de render (comprimidas uma vez, enviadas muitas)
+NIVEIS_RAPIDOS = {"br": 4, "gzip": 6}
+NIVEIS_CACHE = {"br": 9, "gzip": 9}
+
+
+def encodings_aceitos(accept_encoding: Optional[str]) -> List[str]:
+    """br/gzip aceitos pelo cliente, do preferido ao menos preferido (sem os de q=0)"""
+    if not accept_encoding:
+        return []
+
+    aceitos = {}
+    for item in accept_encoding.split(","):
+        partes = item.strip().split(";")
+        nome = partes[0].strip().lower()
+        q = 1.0
+        for parametro in partes[1:]:
+            chave, _, valor = parametro.strip().partition("=")
+            if chave == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        aceitos[nome] = q
+
+    candidatos = ("br", "gzip") if brotli is not None else ("gzip",)
+    pesos = {encoding: aceitos.get(encoding, aceitos.get("*", 0.0)) for encoding in candidatos}
+    # sorted é estável: no empate, br antes de gzip
+    return sorted((encoding for encoding in candidatos if pesos[encoding] > 0), key=lambda e: -pesos[e])
+
+
+def escolher_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Escolhe br ou gzip conforme o Accept-Encoding do cliente (respeitando q=0)"""
+    aceitos = encodings_aceitos(accept_encoding)
+    return aceitos[0] if aceitos else None
+
+
+# Header interno: a rota já negociou o encoding (e o ETag de cada variante); o
+# CompressionMiddleware repassa a resposta como está e remove o header
+COMPRESSAO_NEGOCIADA = "x-compressao-negociada"
+
+
+def etag_variante(etag: str, encoding: Optional[str]) -> str:
+    """ETag da representação comprimida ("abc" -> "abc-br")"""
+    if not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+class CompressionBudget:
+    """
+    Limita o tempo de CPU gasto comprimindo respostas.
+
+    Em cada janela de `janela` segundos, no máximo `fracao` dela pode ser gasta
+    comprimindo; passado o limite, as respostas saem sem compressão até a
+    próxima janela (sob carga, a CPU vai para atender requisições).
+    """
+
+    def __init__(self, fracao: float = 0.5, janela: float = 1.0):
+        self.fracao = fracao
+        self.janela = janela
+        self._inicio = time.monotonic()
+        self._gasto = 0.0
+        self.comprimidas = 0
+        self.puladas = 0
+
+    def disponivel(self) -> bool:
+        agora = time.monotonic()
+        if agora - self._inicio >= self.janela:
+            self._inicio = agora
+            self._gasto = 0.0
+        if self._gasto < self.fracao * self.janela:
+            return True
+        self.puladas += 1
+        return False
+
+    def registrar(self, segundos: float) -> None:
+        self._gasto += segundos
+        self.comprimidas += 1
+
+
+class Compressor:
+    """Compressão gzip/brotli negociada, com tamanho mínimo e orçamento de CPU"""
+
+    def __init__(self, minimo: int = 1024, budget: CompressionBudget = None):
+        self.minimo = minimo
+        self.budget = budget or CompressionBudget()
+
+    def comprimir(self, body: bytes, encoding: str, niveis: Dict[str, int] = NIVEIS_RAPIDOS) -> bytes:
+        inicio = time.perf_counter()
+        if encoding == "br":
+            resultado = brotli.compress(body, quality=niveis["br"])
+        else:
+            resultado = gzip.compress(body, compresslevel=niveis["gzip"], mtime=0)
+        duracao = time.perf_counter() - inicio
+        self.budget.registrar(duracao)
+        registrar_tempo("compressao", duracao)
+        return resultado
+
+    def deve_comprimir(self, tamanho: int) -> bool:
+        return tamanho >= self.minimo and self.budget.disponivel()
+
+    def para_cache(self, entry: CachedRender, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Corpo a enviar para uma entrada do cache de render.
+
+        A variante comprimida é gerada uma única vez e guardada na própria
+        entrada; as próximas visualizações só reenviam os bytes prontos.
+        """
+        encoding = escolher_encoding(accept_encoding)
+        if encoding is None:
+            return entry.body, None
+
+        variante = entry.variantes.get(encoding)
+        if variante is not None:
+            return variante, encoding
+
+        if not self.deve_comprimir(len(entry.body)):
+            return entry.body, None
+
+        variante = self.comprimir(entry.body, encoding, NIVEIS_CACHE)
+        entry.variantes[encoding] = variante
+        return variante, encoding
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "minimo": self.minimo,
+            "cpu_budget": self.budget.fracao,
+            "comprimidas": self.budget.comprimidas,
+            "puladas_por_carga": self.budget.puladas,
+            "brotli": brotli is not None
+        }
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respostas HTML/JSON de corpo único.
+
+    Respostas já codificadas (ex: proposta servida do cache já comprimida) ou
+    cuja rota já escolheu a representação (COMPRESSAO_NEGOCIADA, mesmo sem
+    compressão), streaming (NDJSON do lote), menores que o mínimo ou fora do
+    orçamento de CPU passam sem alteração. Ao comprimir, o ETag vira o da
+    variante: bytes diferentes nunca compartilham o mesmo validador.
+    """
+
+    def __init__(self, app, compressor: Compressor):
+        self.app = app
+        self.compressor = compressor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = escolher_encoding(Headers(scope=scope).get("accept-encoding"))
+        inicio_resposta = None
+
+        async def enviar(message):
+            nonlocal inicio_resposta
+
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if COMPRESSAO_NEGOCIADA in headers or encoding is None:
+                    del headers[COMPRESSAO_NEGOCIADA]
+                    await send(message)
+                    return
+                inicio_resposta = message
+                return
+
+            if inicio_resposta is None:
+                await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                # Envio de arquivo (pathsend/zerocopy): o start segue sem alteração
+                start, inicio_resposta = inicio_resposta, None
+                await send(start)
+                await send(message)
+                return
+
+            start, inicio_resposta = inicio_resposta, None
+            headers = MutableHeaders(scope=start)
+            body = message.get("body", b"")
+            tipo = headers.get("content-type", "")
+
+            if tipo.startswith(TIPOS_COMPRIMIVEIS) and "content-encoding" not in headers:
+                headers.add_vary_header("Accept-Encoding")
+                if not message.get("more_body", False) and self.compressor.deve_comprimir(len(body)):
+                    body = self.compressor.comprimir(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    if "etag" in headers:
+                        headers["ETag"] = etag_variante(headers["etag"], encoding)
+                    message = {**message, "body": body}
+
+            await send(start)
+            await send(message)
+
+        await self.app(scope, receive, enviar)
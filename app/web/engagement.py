@@ -0,0 +1,63 @@
+import json
+import math
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Corpo máximo aceito de um beacon (o script da página envia ~100 bytes)
+MAX_BEACON_BYTES = 4096
+
+# Seções da proposta que o script observa (ids em proposta_template.html)
+SECOES = frozenset({"dados", "equipamentos", "financeiro", "prazos", "aceitar"})
+
+# Tempo na página acima disso é aba esquecida aberta, não leitura (segundos)
+TEMPO_MAXIMO = 6 * 3600
+
+
+def _inteiro(valor: Any, maximo: int) -> int:
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        return 0
+    return max(0, min(int(valor), maximo))
+
+
+def interpretar_beacon(proposta_id: str, tipo: str, corpo: bytes) -> Dict[str, Any]:
+    """
+    Converte o corpo de um beacon da página num evento para a fila de engajamento.
+
+    O navigator.sendBeacon envia text/plain, então o JSON é lido do corpo bruto,
+    sem depender do Content-Type. Aceita as chaves curtas do script da página
+    (sid, t, s, r) ou as longas (sessao, tempo_na_pagina, scroll, secoes).
+    Valores fora da faixa são limitados e seções desconhecidas, ignoradas.
+
+    Raises:
+        ValueError: ID da proposta ou corpo inválido
+    """
+    try:
+        proposta_id = str(uuid.UUID(proposta_id))
+    except ValueError:
+        raise ValueError("ID de proposta inválido")
+
+    dados: Dict[str, Any] = {}
+    if corpo.strip():
+        try:
+            dados = json.loads(corpo)
+        except ValueError:
+            raise ValueError("Corpo do beacon não é JSON válido")
+        if not isinstance(dados, dict):
+            raise ValueError("Corpo do beacon deve ser um objeto JSON")
+
+    secoes = dados.get("r", dados.get("secoes")) or []
+    if not isinstance(secoes, list):
+        secoes = []
+
+    sessao: Optional[Any] = dados.get("sid", dados.get("sessao"))
+
+    return {
+        "proposta_id": proposta_id,
+        "tipo": tipo,
+        "sessao": str(sessao)[:64] if sessao else None,
+        "tempo_pagina": _inteiro(dados.get("t", dados.get("tempo_na_pagina")), TEMPO_MAXIMO),
+        "scroll_max": _inteiro(dados.get("s", dados.get("scroll")), 100),
+        "secoes": sorted({s for s in secoes if isinstance(s, str) and s in SECOES}),
+        "registrado_em": datetime.now(timezone.utc).isoformat()
+    }
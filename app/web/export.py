@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.web.compression import NIVEIS_RAPIDOS, brotli
+
+# Busca uma página a partir do cursor: (linhas, cursor da próxima ou None)
+BuscarPagina = Callable[[Optional[str]], Awaitable[Tuple[List[Dict[str, Any]], Optional[str]]]]
+
+# (o Starlette acrescenta charset=utf-8 aos tipos text/*)
+FORMATOS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+COLUNAS_VISUALIZACOES = ("id", "proposta_id", "visualizado_em", "ip_address", "user_agent", "pais", "cidade")
+
+
+# Início de texto que o Excel/LibreOffice interpreta como fórmula
+INICIO_FORMULA = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _valor_csv(valor: Any) -> Any:
+    if valor is None:
+        return ""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        # Texto vindo do cliente (ex: user_agent) não pode virar fórmula na planilha
+        return "'" + valor
+    return valor
+
+
+def _csv(colunas: Sequence[str], linhas: List[Dict[str, Any]], cabecalho: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if cabecalho:
+        writer.writerow(colunas)
+    writer.writerows([_valor_csv(linha.get(coluna)) for coluna in colunas] for linha in linhas)
+    return buffer.getvalue()
+
+
+def _ndjson(colunas: Sequence[str], linhas: List[Dict[str, Any]]) -> str:
+    return "".join(
+        json.dumps({coluna: linha.get(coluna) for coluna in colunas}, ensure_ascii=False, default=str) + "\n"
+        for linha in linhas
+    )
+
+
+class _Compressor:
+    """Compressão incremental do corpo (cada página sai comprimida, sem juntar tudo)"""
+
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=NIVEIS_RAPIDOS["br"])
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(NIVEIS_RAPIDOS["gzip"], zlib.DEFLATED, 31)
+
+    def comprimir(self, dados: bytes) -> bytes:
+        if self._br is not None:
+            return self._br.process(dados) + self._br.flush()
+        return self._gzip.compress(dados) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finalizar(self) -> bytes:
+        if self._br is not None:
+            return self._br.finish()
+        return self._gzip.flush(zlib.Z_FINISH)
+
+
+async def exportar(
+    primeira: Tuple[List[Dict[str, Any]], Optional[str]],
+    buscar: BuscarPagina,
+    colunas: Sequence[str],
+    formato: str,
+    encoding: Optional[str] = None
+) -> AsyncIterator[bytes]:
+    """
+    Corpo da exportação, página a página (keyset): a próxima página só é buscada
+    depois que a anterior foi enviada, então a memória fica em uma página,
+    qualquer que seja o tamanho da tabela.
+
+    `primeira` é a primeira página, já buscada antes de a resposta começar (um
+    erro de banco ainda vira 500). Com `encoding` (br/gzip), comprime em fluxo.
+    """
+    compressor = _Compressor(encoding) if encoding else None
+    linhas, cursor = primeira
+    cabecalho = True
+
+    while True:
+        if formato == "csv":
+            texto = _csv(colunas, linhas, cabecalho)
+        else:
+            texto = _ndjson(colunas, linhas)
+        cabecalho = False
+
+        dados = texto.encode("utf-8")
+        if compressor is not None:
+            dados = compressor.comprimir(dados)
+        if dados:
+            yield dados
+
+        if not cursor:
+            break
+        try:
+            linhas, cursor = await buscar(cursor)
+        except Exception as e:
+            # A resposta já começou: interrompe o envio (o cliente vê a transferência incompleta)
+            print(f"Erro durante a exportação: {str(e)}")
+            raise
+
+    if compressor is not None:
+        yield compressor.finalizar()
@@ -0,0 +1,204 @@
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Colunas da planilha enviada pelo n8n
+COLUNA_PAYBACK = "Gráfico Payback"
+COLUNA_DADOS = "DADOS DA CONTA DE ENERGIA"
+COLUNA_VALOR = "col_7"
+
+# Rótulo da planilha -> campo de DadosSistema
+ROTULOS_SISTEMA = {
+    "Consumo Total Permitido (mês) kwh:": "consumo_atual",
+    "Quantidade de módulos": "num_modulos",
+    "Potência do sistema": "potencia_kwp",
+    "Potência do inversor": "potencia_inversor",
+    "Área total instalada": "area_total",
+    "Energia Média Gerada (mês)": "geracao_mensal",
+    "Energia Média Gerada (ano)": "geracao_anual",
+    "Valor da conta antes": "conta_antes",
+    "Valor da conta depois": "conta_depois",
+    "Preço do Sistema": "investimento",
+    "Padrão do Cliente": "tipo_fornecimento"
+}
+
+# Campos convertidos para número (os demais ficam como texto)
+CAMPOS_NUMERICOS = frozenset([
+    "num_modulos", "investimento", "conta_antes", "conta_depois", "area_total",
+    "geracao_mensal", "geracao_anual", "consumo_atual", "potencia_kwp"
+])
+CAMPOS_INTEIROS = frozenset(["num_modulos"])
+
+# Tabelas de tradução para o parse de moeda (uma passada em C em vez de vários replace)
+_SEM_ESPACOS = str.maketrans("", "", "  ")
+_DECIMAL_BR = str.maketrans({".": None, ",": "."})
+
+# Limite do cache de classificação de rótulos (proteção contra payloads arbitrários)
+_MAX_ROTULOS_CACHE = 1024
+
+
+def parse_numero(valor: Any) -> float:
+    """
+    Converte string de moeda/número (R$ 1.200,00, 1234.56, 3,5) para float.
+
+    Valores vazios viram 0.0; valores inválidos levantam ValueError.
+    """
+    if not valor:
+        return 0.0
+    # Caminho rápido: número puro ("-45000.00", "3.5") ou já numérico
+    try:
+        return float(valor)
+    except (ValueError, TypeError):
+        pass
+
+    s = str(valor).replace("R$", "").translate(_SEM_ESPACOS).strip()
+    # Com vírgula é formato BR (1.234,56): remove milhar e troca o decimal
+    if "," in s:
+        s = s.translate(_DECIMAL_BR)
+    return float(s)
+
+
+@dataclass(slots=True)
+class Diagnostico:
+    """Problema encontrado ao interpretar uma linha da planilha"""
+    linha: int
+    campo: str
+    valor: Any
+    erro: str
+
+
+@dataclass(slots=True)
+class LinhaPayback:
+    """Um ano da projeção de payback"""
+    ano: int
+    ano_real: int
+    amortizacao: float
+    economia_mensal: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ano": self.ano,
+            "ano_real": self.ano_real,
+            "amortizacao": self.amortizacao,
+            "economia_mensal": self.economia_mensal
+        }
+
+
+@dataclass(slots=True)
+class DadosSistema:
+    """Dados técnicos e financeiros do sistema (None = ausente na planilha)"""
+    consumo_atual: Optional[float] = None
+    num_modulos: Optional[int] = None
+    potencia_kwp: Optional[float] = None
+    potencia_inversor: Optional[str] = None
+    area_total: Optional[float] = None
+    geracao_mensal: Optional[float] = None
+    geracao_anual: Optional[float] = None
+    conta_antes: Optional[float] = None
+    conta_depois: Optional[float] = None
+    investimento: Optional[float] = None
+    tipo_fornecimento: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Dict apenas com os campos presentes (formato salvo no banco)"""
+        resultado = {}
+        for f in fields(self):
+            valor = getattr(self, f.name)
+            if valor is not None:
+                resultado[f.name] = valor
+        return resultado
+
+
+@dataclass(slots=True)
+class ResultadoExtracao:
+    sistema: DadosSistema
+    payback: List[LinhaPayback]
+    diagnosticos: List[Diagnostico] = field(default_factory=list)
+
+    def to_dicts(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Formato legado de HTMLGenerator._extract_data: (dados_sistema, dados_payback)"""
+        return self.sistema.to_dict(), [linha.to_dict() for linha in self.payback]
+
+
+class SpreadsheetExtractor:
+    """
+    Extrator da planilha do n8n compilado uma única vez.
+
+    Cada linha é classificada numa única passada. O rótulo de DADOS DA CONTA DE
+    ENERGIA é resolvido por lookup exato e, se não bater, pela busca por substring
+    (mesmo comportamento de antes), com o resultado memorizado por rótulo.
+    """
+
+    def __init__(self, rotulos: Dict[str, str] = None):
+        self.rotulos = dict(rotulos or ROTULOS_SISTEMA)
+        self._classificacao: Dict[str, Optional[str]] = dict(self.rotulos)
+
+    def _classificar(self, rotulo: str) -> Optional[str]:
+        try:
+            return self._classificacao[rotulo]
+        except KeyError:
+            pass
+
+        # Rótulo com texto extra (ex: "Potência do sistema (kWp)"): vale o último que casar
+        chave = None
+        for chave_planilha, chave_sistema in self.rotulos.items():
+            if chave_planilha in rotulo:
+                chave = chave_sistema
+
+        if len(self._classificacao) < _MAX_ROTULOS_CACHE:
+            self._classificacao[rotulo] = chave
+        return chave
+
+    def extract(self, dados_completos: List[Dict[str, Any]], ano_atual: int = None) -> ResultadoExtracao:
+        if ano_atual is None:
+            ano_atual = datetime.now().year
+
+        sistema = DadosSistema()
+        payback: List[LinhaPayback] = []
+        diagnosticos: List[Diagnostico] = []
+
+        for indice, item in enumerate(dados_completos):
+            # Linha da tabela de payback
+            ano_bruto = item.get(COLUNA_PAYBACK)
+            if ano_bruto is not None and item.get("col_2"):
+                try:
+                    valor_ano = int(ano_bruto)
+                    saldo = parse_numero(item["col_2"])
+                    economia = parse_numero(item["col_3"])
+                except KeyError:
+                    diagnosticos.append(Diagnostico(indice, "col_3", None, "coluna ausente"))
+                except (ValueError, TypeError) as e:
+                    diagnosticos.append(Diagnostico(indice, COLUNA_PAYBACK, ano_bruto, str(e)))
+                else:
+                    # Ano real (>= 2000) ou ano relativo (1, 2, 3...)
+                    if valor_ano >= 2000:
+                        payback.append(LinhaPayback(valor_ano - ano_atual + 1, valor_ano, saldo, economia))
+                    else:
+                        payback.append(LinhaPayback(valor_ano, ano_atual + valor_ano - 1, saldo, economia))
+
+            # Linha de dados do sistema e da conta
+            rotulo = item.get(COLUNA_DADOS)
+            if isinstance(rotulo, str):
+                chave = self._classificar(rotulo)
+                if chave is not None:
+                    self._atribuir(sistema, chave, item.get(COLUNA_VALOR), indice, diagnosticos)
+
+        return ResultadoExtracao(sistema, payback, diagnosticos)
+
+    @staticmethod
+    def _atribuir(sistema: DadosSistema, chave: str, valor: Any, indice: int, diagnosticos: List[Diagnostico]) -> None:
+        if chave in CAMPOS_NUMERICOS:
+            try:
+                numero = parse_numero(valor)
+                if chave in CAMPOS_INTEIROS:
+                    numero = int(numero)
+            except (ValueError, TypeError, OverflowError) as e:
+                diagnosticos.append(Diagnostico(indice, chave, valor, str(e)))
+                numero = 0 if chave in CAMPOS_INTEIROS else 0.0
+            setattr(sistema, chave, numero)
+        else:
+            setattr(sistema, chave, valor)
+
+
+# Instância padrão compartilhada (o cache de rótulos é reaproveitado entre requisições)
+extractor = SpreadsheetExtractor()
@@ -0,0 +1,157 @@
+import asyncio
+import ipaddress
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    import maxminddb
+except ImportError:  # sem maxminddb, as visualizações ficam sem país/cidade
+    maxminddb = None
+
+from app.web.template_service import PROJECT_ROOT
+
+# Resultado de um IP sem localização (privado, inválido ou fora da base):
+# string vazia marca a linha como já processada (NULL = pendente)
+SEM_LOCAL = {"pais": "", "cidade": ""}
+
+
+def _nome(registro: Optional[Dict[str, Any]]) -> str:
+    nomes = (registro or {}).get("names") or {}
+    return nomes.get("pt-BR") or nomes.get("en") or ""
+
+
+class GeoLocalizador:
+    """
+    Localização de IPs numa base local no formato MaxMind (GeoLite2-City.mmdb),
+    sem chamada de rede. As consultas recentes ficam num cache LRU (um mesmo
+    cliente costuma abrir a proposta várias vezes).
+
+    A cidade sai no formato do cadastro de clientes ("Bauru - SP").
+    """
+
+    def __init__(self, caminho: str, max_cache: int = 10000):
+        self.caminho = caminho
+        # MODE_MMAP: o arquivo é mapeado na memória e compartilhado entre workers
+        self._reader = maxminddb.open_database(caminho, maxminddb.MODE_MMAP)
+        self.localizar = lru_cache(maxsize=max_cache)(self._localizar)
+
+    def _localizar(self, ip: Optional[str]) -> Dict[str, str]:
+        try:
+            endereco = ipaddress.ip_address((ip or "").strip())
+        except ValueError:
+            return SEM_LOCAL
+        if not endereco.is_global:
+            return SEM_LOCAL
+
+        registro = self._reader.get(endereco)
+        if not registro:
+            return SEM_LOCAL
+
+        pais = _nome(registro.get("country") or registro.get("registered_country"))
+        cidade = _nome(registro.get("city"))
+        subdivisoes = registro.get("subdivisions") or []
+        uf = subdivisoes[0].get("iso_code") if subdivisoes else None
+        if cidade and uf:
+            cidade = f"{cidade} - {uf}"
+        # Tamanhos das colunas de visualizacoes
+        return {"pais": pais[:50], "cidade": cidade[:100]}
+
+    def close(self) -> None:
+        self._reader.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"base": os.path.basename(self.caminho), "cache": self.localizar.cache_info()._asdict()}
+
+
+def criar_localizador(caminho: str = None) -> Optional[GeoLocalizador]:
+    """Abre a base de GEOIP_DB (None, com aviso, se não houver base ou maxminddb)"""
+    caminho = caminho or os.getenv("GEOIP_DB", os.path.join(PROJECT_ROOT, "data", "GeoLite2-City.mmdb"))
+    if maxminddb is None:
+        print("Aviso: maxminddb não instalado, visualizações sem país/cidade")
+        return None
+    if not os.path.exists(caminho):
+        print(f"Aviso: Base de geolocalização não encontrada ({caminho}), visualizações sem país/cidade")
+        return None
+    return GeoLocalizador(caminho, max_cache=int(os.getenv("GEOIP_CACHE_SIZE", 10000)))
+
+
+class GeoWorker:
+    """
+    Preenche país e cidade das visualizações em background, em lotes.
+
+    A cada ciclo reserva até `lote` visualizações ainda sem localização, resolve
+    os IPs numa thread e grava tudo num único UPDATE. Lote cheio = ainda há
+    pendentes, roda de novo em seguida; senão espera `intervalo` segundos. O
+    caminho da requisição não é tocado: a visualização é gravada sem país e
+    enriquecida depois (o que também cobre o histórico antigo).
+
+    Cada processo da API roda um worker: a reserva no banco (FOR UPDATE SKIP
+    LOCKED) dá a cada um linhas diferentes.
+    """
+
+    def __init__(self, db, localizador: GeoLocalizador, lote: int = 500, intervalo: float = 5.0):
+        self.db = db
+        self.localizador = localizador
+        self.lote = lote
+        self.intervalo = intervalo
+
+        self._task = None
+        self._parar = asyncio.Event()
+
+        # Contadores
+        self.enriquecidas = 0
+        self.sem_local = 0
+        self.falhas = 0
+
+    def start(self) -> None:
+        """Inicia a task do worker (chamar dentro do event loop)"""
+        if self._task is None:
+            self._parar.clear()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        self._parar.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _loop(self) -> None:
+        while not self._parar.is_set():
+            try:
+                processadas = await self.processar_lote()
+            except Exception as e:
+                self.falhas += 1
+                print(f"Aviso: Falha ao geolocalizar visualizações: {str(e)}")
+                processadas = 0
+
+            if processadas < self.lote:
+                try:
+                    await asyncio.wait_for(self._parar.wait(), timeout=self.intervalo)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _resolver(self, pendentes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [{"id": v["id"], **self.localizador.localizar(v["ip_address"])} for v in pendentes]
+
+    async def processar_lote(self) -> int:
+        """Enriquece um lote de visualizações pendentes; retorna quantas processou"""
+        pendentes = await self.db.reservar_visualizacoes_sem_geo(self.lote)
+        if not pendentes:
+            return 0
+
+        linhas = await asyncio.to_thread(self._resolver, pendentes)
+        await self.db.atualizar_geo_visualizacoes(linhas)
+
+        sem_local = sum(1 for linha in linhas if not linha["pais"])
+        self.sem_local += sem_local
+        self.enriquecidas += len(linhas) - sem_local
+        return len(linhas)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.localizador.stats(),
+            "enriquecidas": self.enriquecidas,
+            "sem_local": self.sem_local,
+            "falhas": self.falhas
+        }
@@ -1,144 +1,57 @@
-import os
 from datetime import datetime
-from jinja2 import Environment, FileSystemLoader
+import hashlib
 import re
-import locale
 
-# Tenta definir o locale para PT-BR para formatação de moeda
-try:
-    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
-except:
-    try:
-        locale.setlocale(locale.LC_ALL, 'pt_BR')
-    except:
-        pass # fallback para o padrão se não conseguir
+from app.metrics import medir
+from app.web.charts import payback_chart
+from app.web.extractor import extractor, parse_numero
+from app.web.template_service import TemplateService
 
-class HTMLGenerator:
-    def __init__(self):
-        # Define onde estão os templates
-        self.template_dir = os.path.join(os.path.dirname(__file__), 'templates')
-        self.env = Environment(loader=FileSystemLoader(self.template_dir))
-        
-        # Adiciona o filtro personalizado de moeda ao ambiente Jinja2
-        self.env.filters['format_currency'] = self._format_currency_filter
-        self.env.filters['format_number'] = self._format_number_filter
+# Aumente quando mudar o HTML gerado fora do template (contexto, gráficos,
+# extração): invalida render cache, snapshots e PDFs
+VERSAO_GERADOR = 1
 
-    def _format_number_filter(self, value):
-        """Filtro Jinja2 para formatar número no padrão BR (1.234,56) sem símbolo"""
-        try:
-            val_float = float(value)
-            formatted = "{:,.2f}".format(val_float)
-            formatted = formatted.replace(",", "X").replace(".", ",").replace("X", ".")
-            return formatted
-        except (ValueError, TypeError):
-            return value
+
+class HTMLGenerator:
+    def __init__(self, templates: TemplateService = None):
+        # Ambiente Jinja2 compartilhado (compilado no startup)
+        self.templates = templates or TemplateService()
+        self.env = self.templates.env
+        self._versoes = {}
+
+    @property
+    def template_version(self):
+        """
+        Versão do HTML gerado, parte da chave do render cache, dos snapshots e
+        dos PDFs: hash do template, do manifest dos assets e de VERSAO_GERADOR.
+        """
+        chave = (self.templates.version('proposta_template.html'), self.templates.assets.versao)
+        versao = self._versoes.get(chave)
+        if versao is None:
+            conteudo = f"{chave[0]}:{chave[1]}:{VERSAO_GERADOR}".encode()
+            versao = hashlib.sha1(conteudo).hexdigest()[:12]
+            self._versoes = {chave: versao}
+        return versao
 
     def _clean_currency(self, value_str):
         """
         Converte string de moeda (R$ 1.200,00) para float (1200.00)
-        CORREÇÃO: Detecta se já é número e retorna direto
+        Valores inválidos viram 0.0
         """
-        if not value_str:
-            return 0.0
-        
-        # SE JÁ FOR NÚMERO (int ou float), RETORNA DIRETO
-        if isinstance(value_str, (int, float)):
-            return float(value_str)
-        
         try:
-            # Remove R$ e espaços
-            s = str(value_str).replace("R$", "").replace(" ", "").strip()
-            
-            # Se NÃO tem vírgula, já é formato americano (ex: 1234.56 ou 3.5)
-            if "," not in s:
-                return float(s)
-            
-            # Se TEM vírgula, é formato BR (ex: 1.234,56)
-            # Remove pontos de milhar e troca vírgula decimal por ponto
-            s = s.replace(".", "").replace(",", ".")
-            return float(s)
+            return parse_numero(value_str)
         except (ValueError, TypeError):
             return 0.0
-            
-    def _format_currency_filter(self, value):
-        """Filtro Jinja2 para formatar moeda no padrão BRL (R$ 1.234,56)"""
-        try:
-            val_float = float(value)
-            # Tenta usar o locale do sistema
-            try:
-                return locale.currency(val_float, grouping=True, symbol="R$ ")
-            except:
-                # Fallback manual se o locale falhar
-                formatted = "{:,.2f}".format(val_float)
-                formatted = formatted.replace(",", "X").replace(".", ",").replace("X", ".")
-                return f"R$ {formatted}"
-        except (ValueError, TypeError):
-             return value # Retorna o valor original se não for número
+
+    def extrair(self, dados_completos):
+        """Extrai a planilha para o resultado tipado (com diagnósticos de parse)"""
+        with medir("extracao"):
+            return extractor.extract(dados_completos)
 
     def _extract_data(self, dados_completos):
         """Extrai e limpa os dados do JSON bruto da planilha"""
-        dados_sistema = {}
-        dados_payback = []
-
-        ano_atual = datetime.now().year
-
-        for item in dados_completos:
-            # Extrair dados da Tabela de Payback
-            if "Gráfico Payback" in item and item.get("col_2"):
-                try:
-                    valor_ano = int(item["Gráfico Payback"])
-                    saldo = self._clean_currency(item["col_2"])
-                    economia = self._clean_currency(item["col_3"])
-                    
-                    # Detecta se é ano real (>= 2000) ou ano relativo (1, 2, 3...)
-                    if valor_ano >= 2000:
-                        ano_real = valor_ano
-                        ano_relativo = valor_ano - ano_atual + 1
-                    else:
-                        ano_relativo = valor_ano
-                        ano_real = ano_atual + ano_relativo - 1
-                    
-                    dados_payback.append({
-                        "ano": ano_relativo,
-                        "ano_real": ano_real,
-                        "amortizacao": saldo,
-                        "economia_mensal": economia
-                    })
-                except:
-                    continue
-
-            # Extrair dados gerais do Sistema e Conta
-            if "DADOS DA CONTA DE ENERGIA" in item:
-                campo = item["DADOS DA CONTA DE ENERGIA"]
-                valor = item.get("col_7")
-                
-                # Mapeamento dos campos da planilha para nossas variáveis
-                mapa = {
-                    "Consumo Total Permitido (mês) kwh:": "consumo_atual",
-                    "Quantidade de módulos": "num_modulos",
-                    "Potência do sistema": "potencia_kwp",
-                    "Potência do inversor": "potencia_inversor",
-                    "Área total instalada": "area_total",
-                    "Energia Média Gerada (mês)": "geracao_mensal",
-                    "Valor da conta antes": "conta_antes",
-                    "Preço do Sistema": "investimento",
-                    "Padrão do Cliente": "tipo_fornecimento"
-                }
-                
-                for chave_planilha, chave_sistema in mapa.items():
-                    if chave_planilha in campo:
-                        dados_sistema[chave_sistema] = valor
-
-        # Limpar números do sistema (converter para float/int)
-        for key in ['num_modulos', 'investimento', 'conta_antes', 'area_total', 'geracao_mensal', 'consumo_atual', 'potencia_kwp']:
-            if key in dados_sistema:
-                dados_sistema[key] = self._clean_currency(dados_sistema[key])
-        
-        # Tratamento especial para inteiros
-        if 'num_modulos' in dados_sistema:
-            dados_sistema['num_modulos'] = int(dados_sistema['num_modulos'])
-
-        return dados_sistema, dados_payback
+        with medir("extracao"):
+            return extractor.extract(dados_completos).to_dicts()
 
     def _calcular_payback_tempo(self, dados_payback):
         """Calcula anos e meses para o retorno do investimento"""
@@ -168,32 +81,34 @@ class HTMLGenerator:
         # Se nunca ficar positivo na série fornecida
         return len(dados_payback), 0
 
-    def render_proposal(self, json_entrada):
-        """Método principal chamado pela API"""
-        
-        # 1. Processar dados
-        dados_sistema, dados_payback = self._extract_data(json_entrada["dados_completos"])
-        anos, meses = self._calcular_payback_tempo(dados_payback)
+    def build_context(self, cliente, dados_sistema, dados_payback, numero_proposta=None, proposta_id=None):
+        """Monta o contexto do template a partir dos dados já extraídos"""
+        with medir("payback"):
+            anos, meses = self._calcular_payback_tempo(dados_payback)
         
         # Calcular economia total (último ano da tabela)
         economia_total = dados_payback[-1]["amortizacao"] if dados_payback else 0
 
-        # 2. Preparar dados para o Chart.js
-        # Usar o ano real (str) para os labels do eixo X
+        # Dados do gráfico de payback: ano real (str) no eixo X
         chart_labels = [str(d['ano_real']) for d in dados_payback]
         chart_values = [d['amortizacao'] for d in dados_payback]
+        # Renderizado aqui como SVG inline: vai junto no HTML (e no cache de render)
+        with medir("grafico"):
+            chart_svg = payback_chart.render(chart_labels, chart_values)
 
-        # 3. Limpar telefone para link do WhatsApp (apenas números)
-        telefone_raw = json_entrada["cliente"].get("telefone", "")
-        telefone_limpo = re.sub(r'\D', '', str(telefone_raw))
+        # Limpar telefone para link do WhatsApp (apenas números)
+        telefone_raw = cliente.get("telefone", "")
+        telefone_limpo = re.sub(r'\D', '', str(telefone_raw or ""))
         if not telefone_limpo.startswith('55') and telefone_limpo:
             telefone_limpo = '55' + telefone_limpo
 
-        # 4. Criar contexto para o Template
-        contexto = {
-            "numero_proposta": f"{datetime.now().strftime('%d%m%y')}/{datetime.now().year}",
+        if not numero_proposta:
+            numero_proposta = f"{datetime.now().strftime('%d%m%y')}/{datetime.now().year}"
+
+        return {
+            "numero_proposta": numero_proposta,
             "cliente": {
-                **json_entrada["cliente"],
+                **cliente,
                 "telefone_limpo": telefone_limpo
             },
             "dados_sistema": dados_sistema,
@@ -202,9 +117,53 @@ class HTMLGenerator:
             "payback_meses": meses,
             "economia_total": economia_total,
             "chart_labels": chart_labels,
-            "chart_values": chart_values
+            "chart_values": chart_values,
+            "chart_svg": chart_svg,
+            # Só propostas salvas têm ID: habilita o envio de engajamento na página
+            "proposta_id": proposta_id
         }
 
-        # 5. Renderizar HTML
-        template = self.env.get_template('proposta_template.html')
-        return template.render(contexto)
+    def stored_context(self, proposta):
+        """
+        Contexto do template a partir de uma proposta salva no banco.
+
+        Os dados já foram extraídos e normalizados em criar_proposta, então não
+        passam de novo pela extração da planilha.
+        """
+        cliente = {
+            "nome": proposta.get("cliente_nome"),
+            "cpf_cnpj": proposta.get("cliente_cpf_cnpj"),
+            "endereco": proposta.get("cliente_endereco"),
+            "cidade": proposta.get("cliente_cidade"),
+            "telefone": proposta.get("cliente_telefone")
+        }
+
+        # Propostas antigas podem não ter ano_real ou ter números como texto
+        ano_base = datetime.now().year
+        dados_payback = []
+        for item in proposta.get("dados_payback") or []:
+            ano = int(item["ano"])
+            dados_payback.append({
+                "ano": ano,
+                "ano_real": int(item.get("ano_real") or ano_base + ano - 1),
+                "amortizacao": self._clean_currency(item.get("amortizacao")),
+                "economia_mensal": self._clean_currency(item.get("economia_mensal"))
+            })
+
+        return self.build_context(
+            cliente,
+            proposta.get("dados_sistema") or {},
+            dados_payback,
+            numero_proposta=proposta.get("numero_proposta"),
+            proposta_id=proposta.get("id")
+        )
+
+    def render_stored(self, proposta):
+        """Renderiza uma proposta salva no banco (linha de `propostas`)"""
+        return self.templates.render('proposta_template.html', self.stored_context(proposta))
+
+    def render_proposal(self, json_entrada):
+        """Renderiza direto do JSON da planilha (preview, sem salvar)"""
+        dados_sistema, dados_payback = self._extract_data(json_entrada["dados_completos"])
+        contexto = self.build_context(json_entrada["cliente"], dados_sistema, dados_payback)
+        return self.templates.render('proposta_template.html', contexto)
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.metrics import medir
+from app.web.template_service import PROJECT_ROOT
+
+# Versão do layout do PDF (hash de pdf_layout.py): muda a chave do cache em disco
+with open(os.path.join(os.path.dirname(__file__), 'pdf_layout.py'), 'rb') as _f:
+    VERSAO_LAYOUT = hashlib.sha1(_f.read()).hexdigest()[:12]
+
+
+def _iniciar_worker() -> None:
+    """Inicializador dos processos do pool: carrega só o layout (e o reportlab)"""
+    import app.web.pdf_layout  # noqa: F401
+
+
+def _renderizar(contexto: Dict[str, Any], logo_path: Optional[str]) -> bytes:
+    """Executado no processo do pool: só ele importa o reportlab"""
+    from app.web.pdf_layout import renderizar_pdf
+    return renderizar_pdf(contexto, logo_path)
+
+
+class PDFService:
+    """
+    PDFs das propostas gerados num pool de processos limitado, com cache em disco.
+
+    - O arquivo é identificado por (id da proposta, versão do template, versão
+      do layout): propostas não mudam depois de criadas, então o PDF é gerado uma vez.
+    - Requisições simultâneas para o mesmo PDF aguardam uma única geração.
+    - O pool é criado na primeira geração (depois do fork dos workers do gunicorn)
+      e usa "spawn", evitando fork de um processo com event loop e threads.
+      Cada processo do pool importa só app.web.pdf_layout. O spawn também
+      reimporta o __main__ do pai: rode a aplicação pelo gunicorn/uvicorn (ou
+      `python main.py`, que passa para o uvicorn), nunca com o main.py como
+      __main__ de um processo que use este pool.
+    """
+
+    def __init__(self, cache_dir: str = None, max_workers: int = None, logo_path: str = None):
+        self.cache_dir = cache_dir or os.getenv("PDF_CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache", "pdf"))
+        self.max_workers = max_workers or int(os.getenv("PDF_WORKERS", 2))
+        self.logo_path = logo_path
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._em_andamento: Dict[str, asyncio.Future] = {}
+        self.gerados = 0
+
+    def caminho(self, proposta_id: str, template_version: str) -> str:
+        # O id vem da URL: só caracteres seguros no nome do arquivo
+        seguro = "".join(c for c in proposta_id if c.isalnum() or c == "-")
+        return os.path.join(self.cache_dir, f"{seguro}.{template_version}.{VERSAO_LAYOUT}.pdf")
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar_worker
+            )
+        return self._executor
+
+    async def obter(
+        self,
+        proposta_id: str,
+        template_version: str,
+        carregar_contexto: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[str]:
+        """
+        Caminho do PDF em disco, gerando se preciso.
+
+        Retorna None se `carregar_contexto` retornar None (proposta não encontrada).
+        """
+        caminho = self.caminho(proposta_id, template_version)
+        if os.path.exists(caminho):
+            return caminho
+
+        pendente = self._em_andamento.get(caminho)
+        if pendente is not None:
+            return await asyncio.shield(pendente)
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._em_andamento[caminho] = future
+        try:
+            resultado = await self._gerar(caminho, carregar_contexto)
+            future.set_result(resultado)
+            return resultado
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._em_andamento[caminho]
+
+    async def _gerar(self, caminho: str, carregar_contexto) -> Optional[str]:
+        contexto = await carregar_contexto()
+        if contexto is None:
+            return None
+
+        # O SVG da página não é usado no PDF (o gráfico é redesenhado)
+        contexto = {k: v for k, v in contexto.items() if k != "chart_svg"}
+
+        with medir("pdf"):
+            loop = asyncio.get_running_loop()
+            conteudo = await loop.run_in_executor(self._get_executor(), _renderizar, contexto, self.logo_path)
+
+        # Escrita atômica: outro worker pode estar lendo/gerando o mesmo arquivo
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+        self.gerados += 1
+        return caminho
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "em_andamento": len(self._em_andamento),
+            "gerados": self.gerados
+        }
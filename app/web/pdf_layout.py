@@ -0,0 +1,225 @@
+"""
+Layout do PDF da proposta (reportlab).
+
+Importado só pelos processos do pool de PDFService: o processo da aplicação
+não carrega o reportlab.
+"""
+import io
+import os
+from typing import Any, Dict, Optional
+from xml.sax.saxutils import escape
+
+from reportlab.graphics.shapes import Drawing, Line, Rect, String
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Image, KeepTogether, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from app.web.charts import COLOR_GOLD, COLOR_GRID, COLOR_RED, COLOR_TEXT, format_k, nice_ticks
+from app.web.template_service import format_currency, format_number
+
+AZUL = colors.HexColor('#0284C7')
+ESCURO = colors.HexColor('#2c3e50')
+CINZA = colors.HexColor('#64748B')
+VERDE = colors.HexColor('#16A34A')
+FUNDO = colors.HexColor('#F8FAFC')
+BORDA = colors.HexColor('#E2E8F0')
+
+LARGURA_UTIL = A4[0] - 3 * cm
+
+
+def _estilos() -> Dict[str, ParagraphStyle]:
+    base = getSampleStyleSheet()
+    return {
+        "titulo": ParagraphStyle("titulo", parent=base["Title"], fontSize=22, textColor=ESCURO, spaceAfter=4),
+        "sub": ParagraphStyle("sub", parent=base["Normal"], alignment=TA_CENTER, textColor=AZUL, fontSize=11),
+        "numero": ParagraphStyle("numero", parent=base["Normal"], alignment=TA_CENTER, textColor=CINZA, fontSize=10),
+        "secao": ParagraphStyle("secao", parent=base["Heading2"], textColor=ESCURO, spaceBefore=14, spaceAfter=8),
+        "texto": ParagraphStyle("texto", parent=base["Normal"], fontSize=9.5, leading=13, textColor=ESCURO),
+        "nota": ParagraphStyle("nota", parent=base["Normal"], fontSize=8, leading=10, textColor=CINZA),
+        "destaque": ParagraphStyle("destaque", parent=base["Normal"], alignment=TA_CENTER, fontSize=18,
+                                   leading=22, textColor=AZUL, fontName="Helvetica-Bold"),
+        "rotulo": ParagraphStyle("rotulo", parent=base["Normal"], alignment=TA_CENTER, fontSize=8, textColor=CINZA),
+    }
+
+
+def _grafico_payback(labels, values, largura: float = LARGURA_UTIL, altura: float = 7 * cm) -> Drawing:
+    """Mesmo gráfico de barras do SVG da página (app/web/charts.py), desenhado com reportlab"""
+    d = Drawing(largura, altura)
+    margem_esq, margem_base, margem_topo = 45, 18, 8
+    area_w = largura - margem_esq - 5
+    area_h = altura - margem_base - margem_topo
+
+    ticks = nice_ticks(min(values, default=0.0), max(values, default=0.0))
+    y_min, y_max = ticks[0], ticks[-1]
+
+    def y(valor):
+        return margem_base + (valor - y_min) / (y_max - y_min) * area_h
+
+    for tick in ticks:
+        d.add(Line(margem_esq, y(tick), largura - 5, y(tick), strokeColor=colors.HexColor(COLOR_GRID),
+                   strokeDashArray=[3, 3], strokeWidth=0.5))
+        d.add(String(margem_esq - 4, y(tick) - 3, format_k(tick), fontName="Helvetica", fontSize=7, textAnchor="end",
+                     fillColor=colors.HexColor(COLOR_TEXT)))
+
+    n = len(values)
+    if n:
+        slot = area_w / n
+        passo_rotulo = max(1, -(-n // 13))
+        for i, (label, valor) in enumerate(zip(labels, values)):
+            x = margem_esq + i * slot + slot * 0.1
+            base, topo = sorted((y(0.0), y(valor)))
+            cor = COLOR_RED if valor < 0 else COLOR_GOLD
+            d.add(Rect(x, base, slot * 0.8, max(topo - base, 0.5), fillColor=colors.HexColor(cor), strokeColor=None))
+            if i % passo_rotulo == 0:
+                d.add(String(x + slot * 0.4, 5, str(label), fontName="Helvetica", fontSize=7, textAnchor="middle",
+                             fillColor=colors.HexColor(COLOR_TEXT)))
+        d.add(Line(margem_esq, y(0.0), largura - 5, y(0.0), strokeColor=colors.HexColor(COLOR_TEXT), strokeWidth=0.7))
+    return d
+
+
+def _tabela(dados, larguras, cabecalho: bool = True, zebra: bool = True) -> Table:
+    tabela = Table(dados, colWidths=larguras, repeatRows=1 if cabecalho else 0)
+    estilo = [
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("TEXTCOLOR", (0, 0), (-1, -1), ESCURO),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), 5),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 5),
+        ("LINEBELOW", (0, 0), (-1, -1), 0.5, BORDA),
+    ]
+    if cabecalho:
+        estilo += [
+            ("BACKGROUND", (0, 0), (-1, 0), ESCURO),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ]
+    if zebra:
+        estilo.append(("ROWBACKGROUNDS", (0, 1 if cabecalho else 0), (-1, -1), [colors.white, FUNDO]))
+    tabela.setStyle(TableStyle(estilo))
+    return tabela
+
+
+def renderizar_pdf(contexto: Dict[str, Any], logo_path: Optional[str] = None) -> bytes:
+    """
+    Gera o PDF da proposta a partir do contexto de HTMLGenerator.build_context.
+
+    Roda nos processos do pool (função de módulo, argumentos serializáveis).
+    Usa só as fontes embutidas do PDF e arquivos locais: nada de rede.
+    """
+    e = _estilos()
+    cliente = contexto["cliente"]
+    sistema = contexto["dados_sistema"]
+    payback = contexto["dados_payback"]
+    historia = []
+
+    if logo_path and os.path.exists(logo_path):
+        largura, altura = ImageReader(logo_path).getSize()
+        historia.append(Image(logo_path, width=6 * cm, height=6 * cm * altura / largura))
+    historia += [
+        Paragraph("Energia Solar Fotovoltaica", e["sub"]),
+        Paragraph(escape(str(cliente.get("nome") or "")), e["titulo"]),
+        Paragraph(f"PROPOSTA {escape(str(contexto['numero_proposta']))}", e["numero"]),
+    ]
+
+    # Dados da proposta
+    historia.append(Paragraph("Dados da Proposta", e["secao"]))
+    historia.append(_tabela([
+        ["Cliente", "", "Perfil de Consumo", ""],
+        ["Nome", Paragraph(escape(str(cliente.get("nome") or "")), e["texto"]), "Concessionária", "CPFL"],
+        ["Cidade", cliente.get("cidade") or "", "Fornecimento", sistema.get("tipo_fornecimento") or ""],
+        ["Endereço", Paragraph(escape(str(cliente.get("endereco") or "")), e["texto"]),
+         "Consumo Médio", f"{format_number(sistema.get('consumo_atual'))} kWh"],
+        ["", "", "Valor Médio Conta", format_currency(sistema.get("conta_antes"))],
+    ], [2.2 * cm, 6 * cm, 3.5 * cm, LARGURA_UTIL - 11.7 * cm], zebra=False))
+    historia.append(Spacer(1, 10))
+
+    destaques = [
+        (str(sistema.get("num_modulos") or ""), "Módulos (un)"),
+        (f"{format_number(sistema.get('potencia_kwp'))} kWp", "Potência Total"),
+        (f"{format_number(sistema.get('area_total'))} m²", "Área Necessária"),
+        (f"{format_number(sistema.get('geracao_mensal'))} kWh", "Geração Mensal"),
+    ]
+    historia.append(_tabela(
+        [[Paragraph(escape(v), e["destaque"]) for v, _ in destaques], [Paragraph(r, e["rotulo"]) for _, r in destaques]],
+        [LARGURA_UTIL / 4] * 4, cabecalho=False, zebra=False
+    ))
+
+    # Itens inclusos e garantias
+    historia.append(Paragraph("Itens Inclusos &amp; Garantias", e["secao"]))
+    itens = [
+        f"{sistema.get('num_modulos') or ''} Módulos Fotovoltaicos 700W (RISEN / HONOR / SUNX)",
+        f"1 Inversor Solar {sistema.get('potencia_inversor') or ''}KW (DEYE / GROWATT / SOLIS)",
+        "Estrutura Completa para Montagem",
+        "Proteção e Cabeamento CA/CC",
+        "Homologação",
+        "Instalação e Mão de Obra",
+        "Monitoramento",
+        "Frete",
+    ]
+    historia += [Paragraph(f"• {item}", e["texto"]) for item in itens]
+    historia.append(Spacer(1, 6))
+    historia.append(Paragraph(
+        "<b>Inversores:</b> Garantia de 10 anos contra defeitos de fabricação.<br/>"
+        "<b>Módulos:</b> Garantia de 12 anos (produto) e 30 anos (eficiência de geração).", e["texto"]
+    ))
+
+    # Análise financeira
+    historia.append(Paragraph("Análise Financeira", e["secao"]))
+    historia.append(_tabela([
+        [Paragraph(format_currency(sistema.get("investimento")), e["destaque"]),
+         Paragraph(f"{contexto['payback_anos']} Anos e {contexto['payback_meses']} meses", e["destaque"]),
+         Paragraph(format_currency(contexto["economia_total"]), e["destaque"])],
+        [Paragraph("Investimento Total", e["rotulo"]),
+         Paragraph("Retorno (Payback) estimado", e["rotulo"]),
+         Paragraph(f"Economia acumulada em {len(payback)} anos", e["rotulo"])],
+    ], [LARGURA_UTIL / 3] * 3, cabecalho=False, zebra=False))
+    historia.append(Paragraph("*Valor sujeito a alterações após visita técnica", e["nota"]))
+    historia.append(Spacer(1, 8))
+    historia.append(KeepTogether([
+        Paragraph("Análise de Retorno (Payback) - Saldo Acumulado", e["texto"]),
+        _grafico_payback(contexto["chart_labels"], contexto["chart_values"]),
+    ]))
+
+    historia.append(Paragraph(f"Fluxo de Caixa e Economia (Próximos {len(payback)} anos)", e["secao"]))
+    linhas = [["Ano", "Economia Mensal (Média)", "Saldo Acumulado (Caixa)"]]
+    for item in payback:
+        linhas.append([str(item["ano_real"]), format_currency(item["economia_mensal"]), format_currency(item["amortizacao"])])
+    tabela = _tabela(linhas, [3 * cm, (LARGURA_UTIL - 3 * cm) / 2, (LARGURA_UTIL - 3 * cm) / 2])
+    for i, item in enumerate(payback, start=1):
+        tabela.setStyle([("TEXTCOLOR", (2, i), (2, i), colors.HexColor(COLOR_RED) if item["amortizacao"] < 0 else VERDE)])
+    historia.append(tabela)
+    historia.append(Paragraph("*Cálculos baseados em reajuste anual de 5% na tarifa.", e["nota"]))
+
+    # Prazos
+    historia.append(Paragraph("Prazos e Validade", e["secao"]))
+    historia.append(_tabela([
+        ["Validade da Proposta", "Entrega Equipamentos", "Instalação", "Início Funcionamento"],
+        ["10 Dias", "30 a 60 Dias", "7 a 15 Dias", "30 a 60 Dias"],
+    ], [LARGURA_UTIL / 4] * 4, zebra=False))
+    historia.append(Paragraph(
+        "* O prazo de início pode variar dependendo exclusivamente da liberação da concessionária "
+        "de energia local (CPFL).", e["nota"]
+    ))
+
+    historia.append(Spacer(1, 16))
+    historia.append(Paragraph(
+        "Para aceitar a proposta, fale conosco pelo WhatsApp (14) 99893-7738 "
+        f"informando o número {escape(str(contexto['numero_proposta']))}.", e["texto"]
+    ))
+    historia.append(Spacer(1, 6))
+    historia.append(Paragraph(
+        "LEVESOL LTDA - CNPJ 44.075.186/0001-11 - Av. Nossa Senhora de Fátima, 11-15, Bauru - SP", e["nota"]
+    ))
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4,
+        leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm,
+        title=f"Proposta {contexto['numero_proposta']} - LEVESOL", author="LEVESOL"
+    )
+    doc.build(historia)
+    return buffer.getvalue()
@@ -0,0 +1,176 @@
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Horizonte da projeção (vida útil usual dos módulos)
+HORIZONTE_ANOS = 25
+
+# Limites da grade de cenários (proteção contra requisições enormes)
+MAX_CENARIOS = 20000
+MAX_CENARIOS_SERIES = 2000
+
+# Ordem das dimensões da grade: o cenário i corresponde a np.unravel_index(i, formato)
+DIMENSOES = ("inflacao_tarifa", "degradacao", "escala", "taxa_juros", "prazo_anos")
+
+
+@dataclass(slots=True)
+class BaseSimulacao:
+    """Dados da proposta usados na simulação (campos de dados_sistema)"""
+    investimento: float
+    geracao_mensal: float
+    conta_antes: float
+    conta_depois: float = 0.0
+    consumo_atual: Optional[float] = None
+
+    @classmethod
+    def de_dados_sistema(cls, dados_sistema: Dict[str, Any]) -> "BaseSimulacao":
+        """
+        Monta a base a partir de dados_sistema (formato salvo no banco).
+
+        Levanta ValueError se faltar investimento, geração ou conta antes.
+        """
+        faltando = [
+            campo for campo in ("investimento", "geracao_mensal", "conta_antes")
+            if not dados_sistema.get(campo) or float(dados_sistema[campo]) <= 0
+        ]
+        if faltando:
+            raise ValueError(f"Dados insuficientes para simular: {', '.join(faltando)}")
+
+        consumo = dados_sistema.get("consumo_atual")
+        return cls(
+            investimento=float(dados_sistema["investimento"]),
+            geracao_mensal=float(dados_sistema["geracao_mensal"]),
+            conta_antes=float(dados_sistema["conta_antes"]),
+            conta_depois=min(float(dados_sistema.get("conta_depois") or 0.0), float(dados_sistema["conta_antes"])),
+            consumo_atual=float(consumo) if consumo and float(consumo) > 0 else None
+        )
+
+    @property
+    def economia_maxima(self) -> float:
+        """Economia mensal máxima: a conta menos o que continua sendo pago (disponibilidade)"""
+        return self.conta_antes - self.conta_depois
+
+    @property
+    def tarifa(self) -> float:
+        """R$/kWh do primeiro ano (pela conta e consumo; sem consumo, pela economia sobre a geração)"""
+        if self.consumo_atual:
+            return self.conta_antes / self.consumo_atual
+        return self.economia_maxima / self.geracao_mensal
+
+
+def _grade(dimensoes: Dict[str, Sequence[float]]) -> Dict[str, np.ndarray]:
+    """Produto cartesiano das dimensões, achatado (um vetor de tamanho N por parâmetro)"""
+    eixos = np.meshgrid(*(np.asarray(dimensoes[d], dtype=np.float64) for d in DIMENSOES), indexing="ij")
+    return {d: eixo.ravel() for d, eixo in zip(DIMENSOES, eixos)}
+
+
+def _lista(valores: np.ndarray, casas: int = 2) -> List[Optional[float]]:
+    """Vetor arredondado para JSON (NaN vira None)"""
+    return [None if math.isnan(v) else v for v in np.round(valores, casas).tolist()]
+
+
+def simular(
+    base: BaseSimulacao,
+    inflacao_tarifa: Sequence[float],
+    degradacao: Sequence[float],
+    escala: Sequence[float],
+    taxa_juros: Sequence[float],
+    prazo_anos: Sequence[int],
+    taxa_desconto: float = 0.0,
+    incluir_series: bool = False
+) -> Dict[str, Any]:
+    """
+    Fluxo de caixa de HORIZONTE_ANOS anos para todas as combinações de cenário,
+    calculado de uma vez com arrays (N cenários x anos), sem laço por cenário.
+
+    Por cenário:
+    - geração mensal = geracao_mensal * escala * (1 - degradacao)^(ano-1)
+    - economia mensal = min(geração * tarifa, economia_maxima) * (1 + inflacao_tarifa)^(ano-1)
+      (a parte da conta que continua sendo paga não vira economia)
+    - investimento = investimento * escala; à vista (prazo 0) sai no ano 0, senão
+      vira parcelas mensais fixas (Price) com taxa_juros ao ano durante prazo_anos
+    - payback = momento em que o saldo acumulado passa a ficar sempre >= 0
+      (interpolado dentro do ano); None se não acontece no horizonte
+
+    Retorna a grade (valores de cada dimensão, na ordem de DIMENSOES) e, por
+    cenário, payback_anos, economia_total, saldo_final e vpl (a taxa_desconto ao ano).
+    Com incluir_series, também o saldo acumulado ano a ano (ano 0 a HORIZONTE_ANOS).
+    """
+    dimensoes = {
+        "inflacao_tarifa": inflacao_tarifa,
+        "degradacao": degradacao,
+        "escala": escala,
+        "taxa_juros": taxa_juros,
+        "prazo_anos": prazo_anos
+    }
+    n = math.prod(len(v) for v in dimensoes.values())
+    if n > MAX_CENARIOS:
+        raise ValueError(f"Cenários demais: {n} (máximo {MAX_CENARIOS})")
+    if incluir_series and n > MAX_CENARIOS_SERIES:
+        raise ValueError(f"Séries só para até {MAX_CENARIOS_SERIES} cenários ({n} pedidos)")
+
+    g = _grade(dimensoes)
+    k = np.arange(HORIZONTE_ANOS, dtype=np.float64)  # anos decorridos (0 no primeiro ano)
+
+    # Economia anual (N x anos)
+    geracao = base.geracao_mensal * g["escala"][:, None] * (1.0 - g["degradacao"][:, None]) ** k
+    economia_mensal = np.minimum(geracao * base.tarifa, base.economia_maxima)
+    economia = 12.0 * economia_mensal * (1.0 + g["inflacao_tarifa"][:, None]) ** k
+
+    # Investimento: à vista no ano 0 ou parcelas mensais fixas (tabela Price)
+    investimento = base.investimento * g["escala"]
+    meses = g["prazo_anos"] * 12.0
+    financiado = meses > 0
+    taxa_mensal = (1.0 + g["taxa_juros"]) ** (1.0 / 12.0) - 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        parcela = np.where(
+            taxa_mensal > 0,
+            investimento * taxa_mensal / (1.0 - (1.0 + taxa_mensal) ** -meses),
+            investimento / meses
+        )
+    parcela = np.where(financiado, parcela, 0.0)
+    meses_pagos = np.clip(meses[:, None] - 12.0 * k, 0.0, 12.0)
+    pagamentos = parcela[:, None] * meses_pagos
+
+    # Saldo acumulado do ano 0 (desembolso à vista) ao último ano
+    inicial = np.where(financiado, 0.0, investimento)
+    fluxo = economia - pagamentos
+    saldo = np.empty((n, HORIZONTE_ANOS + 1))
+    saldo[:, 0] = 0.0 - inicial
+    np.cumsum(fluxo, axis=1, out=saldo[:, 1:])
+    saldo[:, 1:] -= inicial[:, None]
+
+    # Payback: último ano com saldo negativo + fração do ano seguinte até zerar
+    negativo = saldo < 0
+    algum_negativo = negativo.any(axis=1)
+    ultimo_negativo = HORIZONTE_ANOS - np.argmax(negativo[:, ::-1], axis=1)
+    j = np.minimum(ultimo_negativo, HORIZONTE_ANOS - 1)
+    linhas = np.arange(n)
+    antes = saldo[linhas, j]
+    depois = saldo[linhas, j + 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback = j + (-antes) / (depois - antes)
+    payback = np.where(algum_negativo, payback, 0.0)
+    # Saldo ainda negativo no último ano: não se paga no horizonte (sem nenhum
+    # ano negativo, argmax devolve 0 e ultimo_negativo não tem significado)
+    payback = np.where(algum_negativo & negativo[:, -1], np.nan, payback)
+
+    # VPL: fluxos descontados (desembolso à vista no ano 0)
+    desconto = (1.0 + taxa_desconto) ** -(k + 1.0)
+    vpl = fluxo @ desconto - inicial
+
+    resultado = {
+        "cenarios": n,
+        "horizonte_anos": HORIZONTE_ANOS,
+        "dimensoes": list(DIMENSOES),
+        "grade": {d: [float(v) for v in dimensoes[d]] for d in DIMENSOES},
+        "payback_anos": _lista(payback),
+        "economia_total": _lista(economia.sum(axis=1)),
+        "saldo_final": _lista(saldo[:, -1]),
+        "vpl": _lista(vpl)
+    }
+    if incluir_series:
+        resultado["saldo_acumulado"] = np.round(saldo, 2).tolist()
+    return resultado
@@ -0,0 +1,346 @@
+"""
+Snapshots estáticos do HTML final das propostas.
+
+Uso do re-render em lote (na raiz do projeto, depois de mudar proposta_template.html):
+    python -m app.web.snapshots                 # publica o que falta para a versão atual
+    python -m app.web.snapshots --forcar        # re-renderiza todas
+    python -m app.web.snapshots --workers 8 --lote 500
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import multiprocessing
+import os
+import stat
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.responses import FileResponse
+
+try:
+    import brotli
+except ImportError:  # sem brotli, só a variante gzip é gravada
+    brotli = None
+
+from app.web.template_service import PROJECT_ROOT
+
+
+@dataclass
+class Snapshot:
+    """HTML publicado de uma proposta: arquivo, ETag e variantes pré-comprimidas"""
+    caminho: str
+    etag: str
+    stat_result: os.stat_result
+    # encoding (br/gzip) -> (caminho, stat) das variantes que existem no disco
+    variantes: Dict[str, Tuple[str, os.stat_result]] = field(default_factory=dict)
+
+    def para(self, encoding: Optional[str]) -> Tuple[str, os.stat_result, Optional[str]]:
+        """Arquivo a enviar para o encoding negociado (cai no HTML puro se não houver variante)"""
+        if encoding in self.variantes:
+            caminho, stat_result = self.variantes[encoding]
+            return caminho, stat_result, encoding
+        return self.caminho, self.stat_result, None
+
+
+class SnapshotStore:
+    """
+    Diretório de snapshots no formato de um object store (chaves imutáveis).
+
+    - objetos/<sha1[:2]>/<sha1>.html (+ .br/.gz): endereçado pelo conteúdo, o
+      mesmo HTML nunca é gravado duas vezes e o sha1 é o próprio ETag (igual ao
+      do cache de render, então o navegador não baixa de novo ao trocar de caminho).
+    - propostas/<id>.<versao>: ponteiro com o sha1 do HTML. A versão é a de
+      HTMLGenerator.template_version (template, assets e gerador): se um deles
+      muda, o GET cai no render ao vivo até o re-render.
+    - Escrita atômica (temporário + os.replace): vários workers podem publicar juntos.
+    - Ponteiros lidos ficam em memória (LRU): um hit não toca o disco antes do envio.
+    """
+
+    def __init__(self, diretorio: str = None, max_memoria: int = 4096):
+        self.diretorio = diretorio or os.getenv("SNAPSHOT_DIR", os.path.join(PROJECT_ROOT, ".cache", "snapshots"))
+        self.max_memoria = max_memoria
+        self._memoria: "OrderedDict[Tuple[str, str], Snapshot]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.publicados = 0
+
+    @staticmethod
+    def _seguro(proposta_id: str) -> str:
+        # O id vem da URL: só caracteres seguros no nome do arquivo
+        return "".join(c for c in proposta_id if c.isalnum() or c == "-")
+
+    def caminho_ponteiro(self, proposta_id: str, versao: str) -> str:
+        return os.path.join(self.diretorio, "propostas", f"{self._seguro(proposta_id)}.{versao}")
+
+    def caminho_objeto(self, sha: str) -> str:
+        return os.path.join(self.diretorio, "objetos", sha[:2], f"{sha}.html")
+
+    def obter(self, proposta_id: str, versao: str) -> Optional[Snapshot]:
+        """Snapshot publicado para a proposta nesta versão do template (None = miss)"""
+        chave = (proposta_id, versao)
+        snapshot = self._memoria.get(chave)
+        if snapshot is not None:
+            self._memoria.move_to_end(chave)
+            self.hits += 1
+            return snapshot
+
+        try:
+            with open(self.caminho_ponteiro(proposta_id, versao), encoding="ascii") as f:
+                sha = f.read().strip()
+            snapshot = self._carregar(sha)
+        except (OSError, ValueError):
+            snapshot = None
+
+        if snapshot is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._lembrar(chave, snapshot)
+        return snapshot
+
+    def _carregar(self, sha: str) -> Optional[Snapshot]:
+        caminho = self.caminho_objeto(sha)
+        stat_result = os.stat(caminho)
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+
+        variantes = {}
+        for encoding, sufixo in (("br", ".br"), ("gzip", ".gz")):
+            try:
+                variantes[encoding] = (caminho + sufixo, os.stat(caminho + sufixo))
+            except OSError:
+                pass
+        return Snapshot(caminho=caminho, etag=f'"{sha}"', stat_result=stat_result, variantes=variantes)
+
+    def _lembrar(self, chave: Tuple[str, str], snapshot: Snapshot) -> None:
+        self._memoria[chave] = snapshot
+        self._memoria.move_to_end(chave)
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    @staticmethod
+    def _gravar(caminho: str, conteudo: bytes) -> None:
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        with open(temporario, "wb") as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+
+    def publicar(self, proposta_id: str, versao: str, body: bytes) -> Snapshot:
+        """Grava o HTML (se ainda não existe), as variantes comprimidas e o ponteiro"""
+        sha = hashlib.sha1(body).hexdigest()
+        caminho = self.caminho_objeto(sha)
+
+        if not os.path.exists(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            # Variantes antes do HTML: quem vê o objeto já encontra as variantes
+            self._gravar(caminho + ".gz", gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._gravar(caminho + ".br", brotli.compress(body, quality=11))
+            self._gravar(caminho, body)
+
+        ponteiro = self.caminho_ponteiro(proposta_id, versao)
+        os.makedirs(os.path.dirname(ponteiro), exist_ok=True)
+        self._gravar(ponteiro, sha.encode("ascii"))
+        self.publicados += 1
+
+        snapshot = self._carregar(sha)
+        self._lembrar((proposta_id, versao), snapshot)
+        return snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "em_memoria": len(self._memoria),
+            "hits": self.hits,
+            "misses": self.misses,
+            "publicados": self.publicados
+        }
+
+
+class SnapshotResponse(FileResponse):
+    """
+    Envia um arquivo de snapshot sem copiá-lo para o Python quando o servidor
+    oferece a extensão ASGI `http.response.pathsend` (o servidor usa sendfile)
+    ou `http.response.zerocopy` (recebe o descritor do arquivo).
+
+    Sem nenhuma delas (uvicorn), arquivos até MAX_LEITURA_DIRETA são lidos numa
+    única chamada: um HTML pequeno vem do page cache em microssegundos, menos que
+    a ida e volta ao threadpool de cada bloco do FileResponse (usado nos maiores).
+    """
+
+    MAX_LEITURA_DIRETA = 256 * 1024
+
+    async def __call__(self, scope, receive, send) -> None:
+        extensoes = scope.get("extensions") or {}
+        if self.stat_result is None or scope["method"].upper() == "HEAD":
+            await super().__call__(scope, receive, send)
+            return
+
+        if "http.response.pathsend" in extensoes:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+        elif "http.response.zerocopy" in extensoes:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "count": self.stat_result.st_size,
+                    "more_body": False
+                })
+        elif self.stat_result.st_size <= self.MAX_LEITURA_DIRETA:
+            with open(self.path, "rb") as f:
+                body = f.read()
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": body})
+        else:
+            await super().__call__(scope, receive, send)
+            return
+
+        if self.background is not None:
+            await self.background()
+
+
+class SnapshotPublisher:
+    """
+    Publica snapshots em background (flush de uma WriteBehindQueue).
+
+    Cada item é {"proposta_id"} (proposta recém-criada: lê a linha salva,
+    renderiza e publica) ou {"proposta_id", "html"} (HTML já renderizado no GET,
+    só publica). Renderizar da linha salva garante o mesmo HTML (e ETag) do
+    render ao vivo. O trabalho de CPU e disco roda numa thread, fora do event loop.
+    """
+
+    def __init__(self, store: SnapshotStore, html_generator, buscar_proposta=None):
+        self.store = store
+        self.html_generator = html_generator
+        self.buscar_proposta = buscar_proposta
+
+    def publicar_propostas(self, propostas: List[Dict[str, Any]], prontos: List[Dict[str, Any]] = ()) -> None:
+        """Renderiza e publica linhas de `propostas` (e publica HTMLs já prontos)"""
+        versao = self.html_generator.template_version
+        for item in prontos:
+            self.store.publicar(item["proposta_id"], versao, item["html"])
+        for proposta in propostas:
+            html = self.html_generator.render_stored(proposta).encode("utf-8")
+            self.store.publicar(str(proposta["id"]), versao, html)
+
+    async def __call__(self, itens: List[Dict[str, Any]]) -> None:
+        prontos = [item for item in itens if "html" in item]
+        propostas = []
+        for item in itens:
+            if "html" not in item:
+                proposta = await self.buscar_proposta(item["proposta_id"])
+                if proposta:
+                    propostas.append(proposta)
+        await asyncio.to_thread(self.publicar_propostas, propostas, prontos)
+
+
+# --- Re-render em lote (CLI) ---
+
+_worker: Optional[SnapshotPublisher] = None
+
+
+def _iniciar_worker(diretorio: str) -> None:
+    """Inicializa o processo do pool: templates compilados e assets do manifest"""
+    global _worker
+    from app.web.assets import AssetPipeline
+    from app.web.html_generator import HTMLGenerator
+    from app.web.template_service import TemplateService
+
+    assets = AssetPipeline()
+    assets.build()
+    templates = TemplateService(assets=assets)
+    templates.precompile()
+    _worker = SnapshotPublisher(SnapshotStore(diretorio), HTMLGenerator(templates))
+
+
+def _publicar_no_worker(propostas: List[Dict[str, Any]]) -> int:
+    _worker.publicar_propostas(propostas)
+    return len(propostas)
+
+
+async def republicar(workers: int, lote: int, forcar: bool) -> int:
+    """
+    Re-renderiza as propostas salvas (paginando por id) num pool de processos.
+
+    Sem `forcar`, pula as que já têm snapshot na versão atual do template.
+    Retorna quantas foram publicadas.
+    """
+    from app.db.database import Database
+    from app.web.assets import AssetPipeline
+    from app.web.html_generator import HTMLGenerator
+    from app.web.template_service import TemplateService
+
+    # Mesma versão que os workers (e a aplicação) usam: template + assets + gerador
+    assets = AssetPipeline()
+    assets.build()
+    store = SnapshotStore()
+    versao = HTMLGenerator(TemplateService(assets=assets)).template_version
+    db = Database()
+    await db.connect()
+
+    loop = asyncio.get_running_loop()
+    publicadas = 0
+    pendentes = set()
+    inicio = time.perf_counter()
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_iniciar_worker,
+        initargs=(store.diretorio,)
+    )
+    try:
+        cursor = None
+        while True:
+            pagina = await db.listar_propostas_completas(apos_id=cursor, limite=lote)
+            if not pagina:
+                break
+            cursor = pagina[-1]["id"]
+            if not forcar:
+                pagina = [p for p in pagina if not os.path.exists(store.caminho_ponteiro(str(p["id"]), versao))]
+
+            # Pedaços pequenos espalham a página pelos processos
+            tamanho = max(1, len(pagina) // (workers * 4))
+            for i in range(0, len(pagina), tamanho):
+                pendentes.add(loop.run_in_executor(pool, _publicar_no_worker, pagina[i:i + tamanho]))
+
+            # Limita o que fica em memória esperando o pool
+            while len(pendentes) > workers * 8:
+                feitos, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                publicadas += sum(f.result() for f in feitos)
+
+        if pendentes:
+            feitos, _ = await asyncio.wait(pendentes)
+            publicadas += sum(f.result() for f in feitos)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        await db.close()
+
+    print(f"{publicadas} snapshots publicados (versão {versao}) em {time.perf_counter() - inicio:.1f}s")
+    return publicadas
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.web.snapshots",
+        description="Re-renderiza os snapshots estáticos de todas as propostas salvas"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Processos de renderização")
+    parser.add_argument("--lote", type=int, default=500, help="Propostas lidas do banco por página")
+    parser.add_argument("--forcar", action="store_true", help="Re-renderiza também as que já têm snapshot")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    asyncio.run(republicar(args.workers, args.lote, args.forcar))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+import os
+import hashlib
+import locale
+
+import pytz
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Undefined
+
+from app.metrics import medir
+
+# Tenta definir o locale para PT-BR para formatação de moeda
+try:
+    locale.setlocale(locale.LC_ALL, 'pt_BR.UTF-8')
+except:
+    try:
+        locale.setlocale(locale.LC_ALL, 'pt_BR')
+    except:
+        pass # fallback para o padrão se não conseguir
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BRASIL_TZ = pytz.timezone('America/Sao_Paulo')
+
+
+def format_number(value):
+    """Filtro Jinja2 para formatar número no padrão BR (1.234,56) sem símbolo"""
+    if isinstance(value, Undefined):
+        return ""
+    try:
+        val_float = float(value)
+        formatted = "{:,.2f}".format(val_float)
+        formatted = formatted.replace(",", "X").replace(".", ",").replace("X", ".")
+        return formatted
+    except (ValueError, TypeError):
+        return value
+
+
+def format_currency(value):
+    """Filtro Jinja2 para formatar moeda no padrão BRL (R$ 1.234,56)"""
+    if isinstance(value, Undefined):
+        return ""
+    try:
+        val_float = float(value)
+        # Tenta usar o locale do sistema
+        try:
+            return locale.currency(val_float, grouping=True, symbol="R$ ")
+        except:
+            # Fallback manual se o locale falhar
+            return f"R$ {format_number(val_float)}"
+    except (ValueError, TypeError):
+         return value # Retorna o valor original se não for número
+
+
+def format_datetime(value):
+    """Filtro Jinja2 que converte UTC para horário de Brasília (dd/mm/aaaa hh:mm:ss)"""
+    if not value:
+        return "N/A"
+    if isinstance(value, str):
+        # dateutil só é carregado se aparecer data em texto
+        from dateutil import parser as date_parser
+        value = date_parser.parse(value)
+
+    if value.tzinfo is None:
+        value = pytz.UTC.localize(value)
+
+    return value.astimezone(BRASIL_TZ).strftime("%d/%m/%Y %H:%M:%S")
+
+
+class _AssetsOriginais:
+    """Usado quando não há AssetPipeline: aponta para os arquivos originais em /static"""
+
+    versao = "originais"
+
+    def get(self, nome):
+        return {"src": f"/static/{nome}"}
+
+    def url(self, nome):
+        return f"/static/{nome}"
+
+
+class TemplateService:
+    """
+    Ambiente Jinja2 único da aplicação (proposta e dashboard admin).
+
+    Criado uma vez no startup: os templates são compilados em `precompile()` e o
+    bytecode fica em cache no disco, então novos workers não recompilam. O
+    auto-reload fica desligado em produção (TEMPLATES_AUTO_RELOAD=true para desenvolvimento).
+    """
+
+    TEMPLATES = ('proposta_template.html', 'admin_dashboard.html', 'admin_overview.html')
+
+    def __init__(self, template_dir: str = TEMPLATE_DIR, cache_dir: str = None, auto_reload: bool = None, assets=None):
+        self.template_dir = template_dir
+
+        if cache_dir is None:
+            cache_dir = os.getenv("TEMPLATE_CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache", "jinja"))
+        if auto_reload is None:
+            auto_reload = os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() in ("1", "true", "yes")
+
+        bytecode_cache = None
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(cache_dir)
+        except OSError as e:
+            print(f"Aviso: Cache de bytecode dos templates desativado: {str(e)}")
+
+        self.env = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=bytecode_cache,
+            auto_reload=auto_reload
+        )
+        self.env.filters['format_currency'] = format_currency
+        self.env.filters['format_number'] = format_number
+        self.env.filters['format_datetime'] = format_datetime
+        # URLs/srcsets dos assets otimizados (ver app/web/assets.py)
+        self.assets = assets or _AssetsOriginais()
+        self.env.globals['assets'] = self.assets
+
+        self._templates = {}
+        self._versions = {}
+
+    def precompile(self) -> None:
+        """Carrega e compila todos os templates conhecidos (e calcula suas versões)"""
+        for nome in self.TEMPLATES:
+            self.get(nome)
+            self.version(nome)
+
+    def get(self, nome: str):
+        template = self._templates.get(nome)
+        if template is None or (self.env.auto_reload and not template.is_up_to_date):
+            template = self.env.get_template(nome)
+            self._templates[nome] = template
+            self._versions.pop(nome, None)
+        return template
+
+    def render(self, nome: str, contexto: dict) -> str:
+        template = self.get(nome)
+        with medir("template"):
+            return template.render(contexto)
+
+    def version(self, nome: str) -> str:
+        """Hash curto do conteúdo do template (usado em chaves de cache)"""
+        versao = self._versions.get(nome)
+        if versao is None:
+            with open(os.path.join(self.template_dir, nome), 'rb') as f:
+                versao = hashlib.sha1(f.read()).hexdigest()[:12]
+            self._versions[nome] = versao
+        return versao
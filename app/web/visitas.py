@@ -0,0 +1,109 @@
+import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+# Robôs que abrem o link sem ser o cliente: prévias de link de mensageiros e
+# redes sociais, monitores de uptime, buscadores e clientes HTTP de scripts.
+# "bot" isolado não casa com nomes de aparelho como "CUBOT".
+PADRAO_BOTS = re.compile(
+    r"whatsapp|telegrambot|facebookexternalhit|facebookcatalog|meta-externalagent|twitterbot"
+    r"|slackbot|slack-imgproxy|discordbot|linkedinbot|skypeuripreview|redditbot"
+    r"|embedly|iframely|vkshare|google-pagerenderer|googleother|bingpreview"
+    r"|uptimerobot|pingdom|statuscake|site24x7|betteruptime|better uptime|checkly|datadog"
+    r"|newrelicpinger|headlesschrome|phantomjs|lighthouse"
+    r"|curl/|wget/|python-requests|python-urllib|python-httpx|aiohttp|go-http-client"
+    r"|okhttp|axios/|node-fetch|java/|libwww|httpclient|n8n"
+    r"|(?<![a-z])bot\b|[a-z]bot/|crawler|spider|preview",
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=4096)
+def eh_bot(user_agent: Optional[str]) -> bool:
+    """
+    True se o User-Agent é de robô (ou está vazio: navegadores sempre mandam).
+
+    Os mesmos poucos User-Agents se repetem muito, então o resultado fica em cache.
+    """
+    if not user_agent or not user_agent.strip():
+        return True
+    return PADRAO_BOTS.search(user_agent) is not None
+
+
+class JanelaDeduplicacao:
+    """
+    Janela deslizante de visitas recentes por (proposta, IP, User-Agent).
+
+    Uma visita é repetida se a mesma chave apareceu há menos de `janela`
+    segundos; cada acesso renova o prazo (refreshes seguidos continuam
+    repetidos). As chaves ficam em ordem de último acesso, então expirar é
+    tirar do início. No máximo `max_chaves` chaves (as mais antigas saem
+    primeiro, contabilizadas em `despejadas`).
+    """
+
+    def __init__(self, janela: float = 1800, max_chaves: int = 100000):
+        self.janela = janela
+        self.max_chaves = max_chaves
+        self._vistos: "OrderedDict[int, float]" = OrderedDict()
+        self.despejadas = 0
+
+    def repetida(self, proposta_id: str, ip: Optional[str], user_agent: Optional[str]) -> bool:
+        agora = time.monotonic()
+        # Só o hash fica na memória (User-Agents são longos)
+        chave = hash((proposta_id, ip, user_agent))
+        ultimo = self._vistos.pop(chave, None)
+        self._vistos[chave] = agora
+        self._expirar(agora)
+        return ultimo is not None and agora - ultimo < self.janela
+
+    def _expirar(self, agora: float) -> None:
+        while self._vistos:
+            chave, visto = next(iter(self._vistos.items()))
+            if agora - visto < self.janela:
+                if len(self._vistos) <= self.max_chaves:
+                    return
+                self.despejadas += 1
+            self._vistos.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._vistos)
+
+
+class FiltroVisitas:
+    """
+    Decide se uma abertura da proposta vira linha em `visualizacoes`.
+
+    `classificar` retorna None (visita única, grava) ou o motivo da supressão:
+    "bot" (User-Agent de robô) ou "repetida" (mesma chave dentro da janela).
+    Com janela 0, só os robôs são filtrados; com filtrar_bots=False, só as repetidas.
+    """
+
+    def __init__(self, janela: float = 1800, max_chaves: int = 100000, filtrar_bots: bool = True):
+        self.janela = JanelaDeduplicacao(janela, max_chaves) if janela > 0 else None
+        self.filtrar_bots = filtrar_bots
+        self.unicas = 0
+        self.repetidas = 0
+        self.bots = 0
+
+    def classificar(self, proposta_id: str, ip: Optional[str], user_agent: Optional[str]) -> Optional[str]:
+        if self.filtrar_bots and eh_bot(user_agent):
+            self.bots += 1
+            return "bot"
+        if self.janela is not None and self.janela.repetida(proposta_id, ip, user_agent):
+            self.repetidas += 1
+            return "repetida"
+        self.unicas += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "unicas": self.unicas,
+            "repetidas": self.repetidas,
+            "bots": self.bots,
+            "janela_segundos": self.janela.janela if self.janela is not None else 0,
+            "chaves": len(self.janela) if self.janela is not None else 0,
+            "despejadas": self.janela.despejadas if self.janela is not None else 0,
+            "classificador": eh_bot.cache_info()._asdict()
+        }
@@ -0,0 +1,53 @@
+"""
+Benchmarks de extração, renderização e endpoints.
+
+Uso (na raiz do projeto):
+    python -m benchmarks                       # tudo, JSON em .cache/benchmarks/<commit>.json
+    python -m benchmarks --rapido              # menos repetições (ex: no CI)
+    python -m benchmarks --grupo render        # só extração/payback/render
+    python -m benchmarks --grupo startup       # cold start (processo novo até a primeira resposta)
+    python -m benchmarks --comparar .cache/benchmarks/abc1234.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from app.web.template_service import PROJECT_ROOT
+from benchmarks import bench_endpoints, bench_render, bench_startup
+from benchmarks.runner import imprimir, metadados, salvar
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks do sistema de propostas")
+    parser.add_argument("--grupo", choices=("render", "endpoints", "startup"), help="Executa só um grupo")
+    parser.add_argument("--rapido", action="store_true", help="Menos repetições")
+    parser.add_argument("--concorrencia", type=int, default=10, help="Requisições simultâneas nos endpoints")
+    parser.add_argument("--saida", help="Arquivo JSON de saída (padrão: .cache/benchmarks/<commit>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para comparar as medianas")
+    args = parser.parse_args()
+
+    meta = metadados(args.rapido)
+    resultados = []
+    if args.grupo in (None, "render"):
+        resultados += bench_render.executar(args.rapido)
+    if args.grupo in (None, "endpoints"):
+        resultados += asyncio.run(bench_endpoints.executar(args.rapido, args.concorrencia))
+    if args.grupo in (None, "startup"):
+        resultados += bench_startup.executar(args.rapido)
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+    imprimir(resultados, base)
+
+    saida = args.saida or os.path.join(PROJECT_ROOT, ".cache", "benchmarks", f"{meta['commit'] or 'local'}.json")
+    salvar(saida, meta, resultados)
+    print(f"Resultados salvos em {saida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+from app.db.database import Database
+from app.db.memory import MemoryBackend
+from app.db.tracking import WriteBehindQueue
+from app.web.snapshots import SnapshotStore
+from app.web.visitas import FiltroVisitas
+from benchmarks.payloads import carregar_exemplo, gerar_payload
+from benchmarks.runner import medir_async
+
+# Visualizações pré-carregadas na proposta usada pelo admin/stats
+VISUALIZACOES_SEMEADAS = 500
+
+# Navegador comum (o User-Agent padrão do httpx seria filtrado como robô)
+NAVEGADOR = "Mozilla/5.0 (Linux; Android 13) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36"
+
+# Prévia de link do WhatsApp (contada sem gravar visualização)
+PREVIA_WHATSAPP = "WhatsApp/2.23.20.0 A"
+
+# Corpo enviado pelo script da página via navigator.sendBeacon
+BEACON = '{"sid":"k3j9x0a1bq","t":42,"s":76,"r":["financeiro","prazos"]}'
+
+# Credencial das rotas administrativas (/admin e exportações)
+ADMIN_TOKEN = "bench-admin"
+ADMIN = {"authorization": f"Bearer {ADMIN_TOKEN}"}
+
+
+async def _semear_visualizacoes(db: Database, proposta_id: str) -> None:
+    agora = datetime.now(timezone.utc)
+    await db.registrar_visualizacoes([
+        {
+            "proposta_id": proposta_id,
+            "ip_address": f"10.0.{i // 256}.{i % 256}",
+            "user_agent": "Mozilla/5.0 (benchmark)",
+            "visualizado_em": (agora - timedelta(minutes=i)).isoformat()
+        }
+        for i in range(VISUALIZACOES_SEMEADAS)
+    ])
+
+
+def _unico(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Mesmo payload com outro cliente (a criação é idempotente pelo hash do conteúdo)"""
+    return {**payload, "cliente": {**payload["cliente"], "nome": f"Cliente {uuid.uuid4().hex[:12]}"}}
+
+
+def _cenarios(payload: Dict[str, Any], lote: Dict[str, Any], pid: str, pid_stats: str, pid_snapshot: str, etag: str):
+    """
+    (nome, endpoint coberto, método, url, kwargs) de cada cenário; kwargs pode
+    ser uma função chamada a cada requisição
+    """
+    return [
+        ("GET /", "read_root", "GET", "/", {}),
+        ("GET /health", "health_check", "GET", "/health", {}),
+        ("GET /ready", "readiness_check", "GET", "/ready", {}),
+        ("GET /metrics", "metrics", "GET", "/metrics", {}),
+        ("POST /api/proposta/web", "ver_proposta_web", "POST", "/api/proposta/web", {"json": payload}),
+        ("POST /api/proposta", "criar_proposta", "POST", "/api/proposta",
+         lambda: {"json": payload, "headers": {"Idempotency-Key": uuid.uuid4().hex}}),
+        ("POST /api/proposta repetida", "criar_proposta", "POST", "/api/proposta", {"json": payload}),
+        ("POST /api/propostas/batch", "criar_propostas_lote", "POST", "/api/propostas/batch",
+         lambda: {"json": {"propostas": [_unico(p) for p in lote["propostas"]]}}),
+        ("GET /proposta/{id}", "visualizar_proposta", "GET", f"/proposta/{pid}", {}),
+        ("GET /proposta/{id} br", "visualizar_proposta", "GET", f"/proposta/{pid}",
+         {"headers": {"accept-encoding": "br, gzip"}}),
+        ("GET /proposta/{id}.pdf", "baixar_proposta_pdf", "GET", f"/proposta/{pid}.pdf", {}),
+        ("GET /proposta/{id} 304", "visualizar_proposta", "GET", f"/proposta/{pid}",
+         {"headers": {"if-none-match": etag}}),
+        ("GET /proposta/{id} robô", "visualizar_proposta", "GET", f"/proposta/{pid}",
+         {"headers": {"user-agent": PREVIA_WHATSAPP}}),
+        ("GET /proposta/{id} snapshot", "visualizar_proposta", "GET", f"/proposta/{pid_snapshot}", {}),
+        ("GET /proposta/{id} snapshot br", "visualizar_proposta", "GET", f"/proposta/{pid_snapshot}",
+         {"headers": {"accept-encoding": "br, gzip"}}),
+        ("GET /admin", "visualizar_admin", "GET", "/admin", {"headers": ADMIN}),
+        ("GET /admin busca", "visualizar_admin", "GET", "/admin",
+         {"params": {"busca": "silva", "status": "visualizadas", "ordem": "total_visualizacoes"}, "headers": ADMIN}),
+        ("GET /admin/proposta/{id}", "visualizar_admin_proposta", "GET", f"/admin/proposta/{pid_stats}",
+         {"headers": ADMIN}),
+        ("GET /api/proposta/{id}/stats", "estatisticas_proposta", "GET", f"/api/proposta/{pid_stats}/stats", {}),
+        ("GET /api/export/propostas", "exportar_propostas", "GET", "/api/export/propostas", {"headers": ADMIN}),
+        ("GET /api/export/visualizacoes", "exportar_visualizacoes", "GET", "/api/export/visualizacoes",
+         {"params": {"formato": "ndjson"}, "headers": ADMIN}),
+        ("GET /api/export/visualizacoes gzip", "exportar_visualizacoes", "GET", "/api/export/visualizacoes",
+         {"headers": {**ADMIN, "accept-encoding": "gzip"}}),
+        ("POST /api/simulacao", "simular_cenarios", "POST", "/api/simulacao",
+         {"json": {"proposta_id": pid, "inflacao_tarifa": [0.04, 0.06, 0.08, 0.1], "taxa_juros": [0.0, 0.12, 0.2],
+                   "prazo_anos": [0, 5, 10], "escala": [0.8, 1.0, 1.2]}}),
+        ("POST /api/simulacao 20k", "simular_cenarios", "POST", "/api/simulacao",
+         {"json": {"proposta_id": pid, "inflacao_tarifa": [i / 200 for i in range(20)],
+                   "degradacao": [0.0, 0.0025, 0.005, 0.0075, 0.01], "escala": [0.5 + i / 10 for i in range(10)],
+                   "taxa_juros": [0.0, 0.08, 0.12, 0.16, 0.2], "prazo_anos": [0, 3, 5, 10]}}),
+        ("POST track-engagement", "track_engagement", "POST", f"/api/proposta/{pid}/track-engagement",
+         {"content": BEACON, "headers": {"content-type": "text/plain;charset=UTF-8"}}),
+        ("POST track-exit", "track_exit", "POST", f"/api/proposta/{pid}/track-exit",
+         {"content": BEACON, "headers": {"content-type": "text/plain;charset=UTF-8"}}),
+    ]
+
+
+def _avisar_rotas_sem_cenario(app, cobertas) -> None:
+    ignoradas = {"openapi", "swagger_ui_html", "swagger_ui_redirect", "redoc_html", "static"}
+    faltando = sorted(
+        rota.name for rota in app.routes
+        if rota.name not in cobertas and rota.name not in ignoradas
+    )
+    if faltando:
+        print(f"Aviso: rotas sem benchmark: {', '.join(faltando)}", file=sys.stderr)
+
+
+async def executar(rapido: bool = False, concorrencia: int = 10) -> List[Dict[str, Any]]:
+    """
+    Latência e vazão de cada rota de main.py, em processo (ASGI direto, sem rede)
+    e com o banco em memória.
+    """
+    import main
+
+    os.environ["ADMIN_TOKEN"] = ADMIN_TOKEN
+    db = Database(backend=MemoryBackend())
+    main.db = db
+    main.view_tracker = WriteBehindQueue(flush=db.registrar_visualizacoes, nome="visualizacoes")
+    main.suppressed_tracker = WriteBehindQueue(flush=db.registrar_visualizacoes_suprimidas, nome="suprimidas")
+    main.engagement_tracker = WriteBehindQueue(flush=db.registrar_engajamentos, nome="engajamento")
+    main.visit_filter = FiltroVisitas()
+    main.render_cache.clear()
+    # Snapshots num diretório temporário, publicados só para pid_snapshot (os
+    # demais GETs seguem no render ao vivo: sem fila, o miss não publica)
+    diretorio_snapshots = tempfile.TemporaryDirectory()
+    main.snapshot_store = SnapshotStore(diretorio_snapshots.name)
+    main.snapshot_queue = None
+
+    payload = carregar_exemplo()
+    lote = {"propostas": [gerar_payload(1, payload) for _ in range(20)]}
+    repeticoes = 50 if rapido else 500
+    resultados = []
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app, client=("127.0.0.1", 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers={"user-agent": NAVEGADOR}) as client:
+            pid = (await client.post("/api/proposta", json=payload)).json()["proposta_id"]
+            pid_stats = (await client.post("/api/proposta", json=_unico(payload))).json()["proposta_id"]
+            await _semear_visualizacoes(db, pid_stats)
+            pid_snapshot = (await client.post("/api/proposta", json=_unico(payload))).json()["proposta_id"]
+            etag = (await client.get(f"/proposta/{pid}")).headers["etag"]
+            main.snapshot_store.publicar(
+                pid_snapshot, main.html_generator.template_version,
+                main.html_generator.render_stored(await db.buscar_proposta(pid_snapshot)).encode("utf-8")
+            )
+
+            cenarios = _cenarios(payload, lote, pid, pid_stats, pid_snapshot, etag)
+            _avisar_rotas_sem_cenario(main.app, {c[1] for c in cenarios})
+
+            for nome, _, metodo, url, kwargs in cenarios:
+                async def chamar(metodo=metodo, url=url, kwargs=kwargs):
+                    response = await client.request(metodo, url, **(kwargs() if callable(kwargs) else kwargs))
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"{nome}: HTTP {response.status_code} {response.text[:200]}")
+
+                n = repeticoes // 10 if "batch" in url else repeticoes
+                for c in sorted({1, concorrencia}):
+                    resultados.append(await medir_async(
+                        nome, "endpoints", chamar, n, concorrencia=c
+                    ))
+
+    diretorio_snapshots.cleanup()
+    return resultados
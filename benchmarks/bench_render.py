@@ -0,0 +1,39 @@
+from typing import Any, Dict, List
+
+from app.web.html_generator import HTMLGenerator
+from benchmarks.payloads import TAMANHOS, carregar_exemplo, gerar_payload
+from benchmarks.runner import medir_sync
+
+
+def executar(rapido: bool = False) -> List[Dict[str, Any]]:
+    """Extração, cálculo do payback e renderização para cada tamanho de payload"""
+    generator = HTMLGenerator()
+    exemplo = carregar_exemplo()
+    resultados = []
+
+    for fator in TAMANHOS:
+        payload = gerar_payload(fator, exemplo)
+        dados = payload["dados_completos"]
+        _, dados_payback = generator._extract_data(dados)
+        parametros = {"fator": fator, "linhas": len(dados), "anos": len(dados_payback)}
+
+        repeticoes = max(20, 2000 // fator) if not rapido else max(5, 200 // fator)
+        resultados.append(medir_sync(
+            "_extract_data", "render",
+            lambda: generator._extract_data(dados),
+            repeticoes, parametros=parametros
+        ))
+        resultados.append(medir_sync(
+            "_calcular_payback_tempo", "render",
+            lambda: generator._calcular_payback_tempo(dados_payback),
+            repeticoes * 5, parametros=parametros
+        ))
+
+        repeticoes = max(10, 300 // fator) if not rapido else max(3, 30 // fator)
+        resultados.append(medir_sync(
+            "render_proposal", "render",
+            lambda: generator.render_proposal(payload),
+            repeticoes, parametros=parametros
+        ))
+
+    return resultados
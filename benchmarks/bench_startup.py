@@ -0,0 +1,60 @@
+"""
+Cold start: processo novo até a primeira resposta.
+
+Cada amostra roda `python -m benchmarks.bench_startup --filho` num processo
+separado (imports sem cache em memória), com o banco em memória: importa
+main.py, executa o lifespan (aquecimento) e faz a primeira requisição (/ready).
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from app.web.template_service import PROJECT_ROOT
+from benchmarks.runner import _resumo
+
+ETAPAS = ("importada", "pronta", "primeira_requisicao")
+
+
+async def _filho() -> Dict[str, float]:
+    import httpx
+    import main
+    from app.db.database import Database
+    from app.db.memory import MemoryBackend
+
+    main.db = Database(backend=MemoryBackend())
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/ready")
+            if response.status_code != 200:
+                raise RuntimeError(f"/ready: HTTP {response.status_code} {response.text[:200]}")
+    return main.inicializacao.marcos
+
+
+def executar(rapido: bool = False) -> List[Dict[str, Any]]:
+    """Tempos de cada marco do startup (Inicializacao) e do processo inteiro"""
+    repeticoes = 3 if rapido else 10
+    ambiente = {**os.environ, "SUPABASE_URL": os.getenv("SUPABASE_URL", "http://bench"),
+                "SUPABASE_KEY": os.getenv("SUPABASE_KEY", "bench")}
+    amostras: Dict[str, List[float]] = {etapa: [] for etapa in (*ETAPAS, "processo")}
+
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        saida = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_startup", "--filho"],
+            cwd=PROJECT_ROOT, env=ambiente, capture_output=True, text=True, check=True
+        ).stdout
+        amostras["processo"].append(time.perf_counter() - inicio)
+        marcos = json.loads(saida.strip().splitlines()[-1])
+        for etapa in ETAPAS:
+            amostras[etapa].append(marcos[etapa])
+
+    return [_resumo(etapa, "startup", {}, valores) for etapa, valores in amostras.items()]
+
+
+if __name__ == "__main__" and "--filho" in sys.argv:
+    print(json.dumps(asyncio.run(_filho())))
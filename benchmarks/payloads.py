@@ -0,0 +1,53 @@
+import copy
+import json
+import os
+from typing import Any, Dict
+
+from app.web.template_service import PROJECT_ROOT
+
+EXEMPLO = os.path.join(PROJECT_ROOT, "example_request.json")
+
+# Fatores de escala do payload: 1 = example_request.json como está
+TAMANHOS = (1, 3, 10, 30)
+
+
+def carregar_exemplo() -> Dict[str, Any]:
+    with open(EXEMPLO, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def gerar_payload(fator: int = 1, exemplo: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    Payload no formato do POST /api/proposta, escalado a partir do exemplo.
+
+    Com fator N a série de payback tem 10*N anos (continuando a progressão do
+    exemplo) e a planilha ganha 20*(N-1) linhas sem relação com a proposta,
+    como as que o n8n envia junto. O resultado é determinístico.
+    """
+    payload = copy.deepcopy(exemplo or carregar_exemplo())
+    if fator <= 1:
+        return payload
+
+    linhas = payload["dados_completos"]
+    payback = [l for l in linhas if l.get("Gráfico Payback")]
+    outras = [l for l in linhas if not l.get("Gráfico Payback")]
+
+    saldo = float(payback[-1]["col_2"])
+    economia = float(payback[-1]["col_3"])
+    for ano in range(len(payback) + 1, 10 * fator + 1):
+        economia *= 1.05
+        saldo += economia * 12
+        payback.append({
+            "row_number": str(ano),
+            "Gráfico Payback": str(ano),
+            "col_2": f"{saldo:.2f}",
+            "col_3": f"{economia:.2f}"
+        })
+
+    extras = [
+        {"row_number": str(1000 + i), "col_1": f"Observação {i}", "col_5": f"{i * 1.5:.2f}"}
+        for i in range(20 * (fator - 1))
+    ]
+
+    payload["dados_completos"] = payback + outras + extras
+    return payload
@@ -0,0 +1,141 @@
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.web.template_service import PROJECT_ROOT
+
+
+def _resumo(nome: str, grupo: str, parametros: Dict[str, Any], amostras: List[float]) -> Dict[str, Any]:
+    """Estatísticas (em ms) de uma lista de durações em segundos"""
+    ordenadas = sorted(amostras)
+    n = len(ordenadas)
+    media = statistics.fmean(ordenadas)
+    return {
+        "nome": nome,
+        "grupo": grupo,
+        "parametros": parametros,
+        "n": n,
+        "media_ms": media * 1000,
+        "mediana_ms": statistics.median(ordenadas) * 1000,
+        "p95_ms": ordenadas[min(n - 1, int(n * 0.95))] * 1000,
+        "min_ms": ordenadas[0] * 1000,
+        "max_ms": ordenadas[-1] * 1000,
+        "desvio_ms": (statistics.stdev(ordenadas) if n > 1 else 0.0) * 1000,
+        "ops_s": 1 / media if media else None
+    }
+
+
+def medir_sync(
+    nome: str,
+    grupo: str,
+    funcao: Callable[[], Any],
+    repeticoes: int,
+    aquecimento: int = 3,
+    parametros: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    for _ in range(aquecimento):
+        funcao()
+    gc.collect()
+
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        amostras.append(time.perf_counter() - inicio)
+    return _resumo(nome, grupo, parametros or {}, amostras)
+
+
+async def medir_async(
+    nome: str,
+    grupo: str,
+    funcao: Callable[[], Awaitable[Any]],
+    repeticoes: int,
+    aquecimento: int = 3,
+    concorrencia: int = 1,
+    parametros: Dict[str, Any] = None
+) -> Dict[str, Any]:
+    """
+    Latência de `repeticoes` chamadas; com concorrencia > 1, as chamadas são
+    feitas por N workers simultâneos e `vazao_s` mede requisições por segundo.
+    """
+    for _ in range(aquecimento):
+        await funcao()
+    gc.collect()
+
+    amostras: List[float] = []
+    restantes = repeticoes
+
+    async def worker():
+        nonlocal restantes
+        while restantes > 0:
+            restantes -= 1
+            inicio = time.perf_counter()
+            await funcao()
+            amostras.append(time.perf_counter() - inicio)
+
+    inicio_total = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concorrencia)))
+    total = time.perf_counter() - inicio_total
+
+    resultado = _resumo(nome, grupo, {**(parametros or {}), "concorrencia": concorrencia}, amostras)
+    resultado["vazao_s"] = len(amostras) / total if total else None
+    return resultado
+
+
+def _commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadados(rapido: bool) -> Dict[str, Any]:
+    return {
+        "commit": _commit_atual(),
+        "data": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "rapido": rapido
+    }
+
+
+def salvar(caminho: str, meta: Dict[str, Any], resultados: List[Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "resultados": resultados}, f, indent=2, ensure_ascii=False)
+
+
+def _chave(resultado: Dict[str, Any]) -> str:
+    parametros = ",".join(f"{k}={v}" for k, v in sorted(resultado["parametros"].items()))
+    return f"{resultado['grupo']}/{resultado['nome']}[{parametros}]"
+
+
+def imprimir(resultados: List[Dict[str, Any]], base: Optional[Dict[str, Any]] = None) -> None:
+    """Tabela no stderr; com `base` (JSON de outro commit), mostra a variação da mediana"""
+    anteriores = {_chave(r): r for r in (base or {}).get("resultados", [])}
+
+    for r in resultados:
+        linha = (
+            f"{_chave(r):<70} mediana {r['mediana_ms']:9.3f} ms"
+            f"  p95 {r['p95_ms']:9.3f} ms"
+        )
+        if r.get("vazao_s"):
+            linha += f"  {r['vazao_s']:9.1f} req/s"
+
+        anterior = anteriores.get(_chave(r))
+        if anterior and anterior["mediana_ms"]:
+            variacao = (r["mediana_ms"] - anterior["mediana_ms"]) / anterior["mediana_ms"] * 100
+            linha += f"  ({variacao:+.1f}%)"
+        print(linha, file=sys.stderr)
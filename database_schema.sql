@@ -6,13 +6,33 @@
 -- Execute este SQL no seu painel do Supabase
 -- SQL Editor > New Query > Cole e Execute
 
+-- ============================================
+-- NUMERAÇÃO das propostas
+-- Data + sequencial da sequência (sem colisão entre criações simultâneas).
+-- O sequencial tem ao menos 5 dígitos, então não coincide com os números
+-- antigos (DDMMAA-HHMM/AAAA).
+-- ============================================
+CREATE SEQUENCE IF NOT EXISTS propostas_numero_seq;
+
+CREATE OR REPLACE FUNCTION gerar_numero_proposta()
+RETURNS VARCHAR
+LANGUAGE SQL
+VOLATILE
+AS $$
+    SELECT to_char(agora, 'DDMMYY') || '-' || lpad(n::text, GREATEST(5, length(n::text)), '0')
+        || '/' || to_char(agora, 'YYYY')
+    FROM (
+        SELECT NOW() AT TIME ZONE 'America/Sao_Paulo' AS agora, nextval('propostas_numero_seq') AS n
+    ) t;
+$$;
+
 -- ============================================
 -- TABELA: propostas
 -- Armazena todas as propostas criadas
 -- ============================================
 CREATE TABLE IF NOT EXISTS propostas (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    numero_proposta VARCHAR(50) UNIQUE NOT NULL,
+    numero_proposta VARCHAR(50) UNIQUE NOT NULL DEFAULT gerar_numero_proposta(),
     cliente_nome VARCHAR(255) NOT NULL,
     cliente_cpf_cnpj VARCHAR(20),
     cliente_endereco TEXT,
@@ -21,14 +41,27 @@ CREATE TABLE IF NOT EXISTS propostas (
     dados_sistema JSONB NOT NULL,
     dados_payback JSONB NOT NULL,
     investimento DECIMAL(12,2),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    -- Contadores mantidos pelo trigger de visualizacoes (ver trg_visualizacoes_contadores)
+    total_visualizacoes INTEGER NOT NULL DEFAULT 0,
+    primeira_visualizacao TIMESTAMP WITH TIME ZONE,
+    ultima_visualizacao TIMESTAMP WITH TIME ZONE,
+    -- Aberturas filtradas antes de gravar (contadas, sem linha em visualizacoes)
+    visualizacoes_repetidas INTEGER NOT NULL DEFAULT 0,
+    visualizacoes_bots INTEGER NOT NULL DEFAULT 0,
+    -- SHA-256 do Idempotency-Key ou do payload: retentativas não duplicam a proposta
+    chave_idempotencia VARCHAR(64) UNIQUE
 );
 
 COMMENT ON TABLE propostas IS 'Armazena todas as propostas de energia solar criadas';
 COMMENT ON COLUMN propostas.id IS 'UUID único da proposta';
-COMMENT ON COLUMN propostas.numero_proposta IS 'Número formatado da proposta (ex: 211124/2024)';
+COMMENT ON COLUMN propostas.numero_proposta IS 'Número formatado da proposta (ex: 211124-00042/2024)';
 COMMENT ON COLUMN propostas.dados_sistema IS 'JSON com dados técnicos do sistema fotovoltaico';
 COMMENT ON COLUMN propostas.dados_payback IS 'JSON com projeção de payback anual';
+COMMENT ON COLUMN propostas.total_visualizacoes IS 'Total de visualizações (atualizado a cada lote gravado em visualizacoes)';
+COMMENT ON COLUMN propostas.visualizacoes_repetidas IS 'Aberturas repetidas (mesmo IP e navegador dentro da janela) não gravadas em visualizacoes';
+COMMENT ON COLUMN propostas.visualizacoes_bots IS 'Aberturas por robôs (prévias de link, monitores) não gravadas em visualizacoes';
+COMMENT ON COLUMN propostas.chave_idempotencia IS 'Hash da requisição de criação (Idempotency-Key ou payload)';
 
 -- ============================================
 -- TABELA: visualizacoes
@@ -40,8 +73,12 @@ CREATE TABLE IF NOT EXISTS visualizacoes (
     visualizado_em TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     ip_address VARCHAR(45),
     user_agent TEXT,
+    -- Preenchidos em background pela base local de geolocalização
+    -- (NULL = ainda não processada; '' = IP sem localização)
     pais VARCHAR(50),
-    cidade VARCHAR(100)
+    cidade VARCHAR(100),
+    -- Reserva do worker de geolocalização (ver reservar_visualizacoes_sem_geo)
+    geo_reservada_em TIMESTAMP WITH TIME ZONE
 );
 
 COMMENT ON TABLE visualizacoes IS 'Registra todas as visualizações das propostas (tracking)';
@@ -49,6 +86,76 @@ COMMENT ON COLUMN visualizacoes.proposta_id IS 'Referência à proposta visualiz
 COMMENT ON COLUMN visualizacoes.ip_address IS 'IP do visitante';
 COMMENT ON COLUMN visualizacoes.user_agent IS 'Navegador/dispositivo usado';
 
+-- ============================================
+-- MIGRAÇÃO: bancos criados antes dos contadores de visualização e da numeração por sequência
+-- (sem efeito num banco novo)
+-- ============================================
+ALTER TABLE propostas ADD COLUMN IF NOT EXISTS total_visualizacoes INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE propostas ADD COLUMN IF NOT EXISTS primeira_visualizacao TIMESTAMP WITH TIME ZONE;
+ALTER TABLE propostas ADD COLUMN IF NOT EXISTS ultima_visualizacao TIMESTAMP WITH TIME ZONE;
+ALTER TABLE propostas ADD COLUMN IF NOT EXISTS chave_idempotencia VARCHAR(64) UNIQUE;
+ALTER TABLE propostas ADD COLUMN IF NOT EXISTS visualizacoes_repetidas INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE propostas ADD COLUMN IF NOT EXISTS visualizacoes_bots INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE visualizacoes ADD COLUMN IF NOT EXISTS geo_reservada_em TIMESTAMP WITH TIME ZONE;
+ALTER TABLE propostas ALTER COLUMN numero_proposta SET DEFAULT gerar_numero_proposta();
+
+UPDATE propostas p SET
+    total_visualizacoes = v.total,
+    primeira_visualizacao = v.primeira,
+    ultima_visualizacao = v.ultima
+FROM (
+    SELECT proposta_id, COUNT(*) AS total, MIN(visualizado_em) AS primeira, MAX(visualizado_em) AS ultima
+    FROM visualizacoes
+    GROUP BY proposta_id
+) v
+WHERE p.id = v.proposta_id
+  AND p.total_visualizacoes = 0;
+
+-- ============================================
+-- TABELA: engajamentos
+-- Eventos enviados pela página (navigator.sendBeacon): tempo na página,
+-- rolagem máxima e seções alcançadas
+-- ============================================
+CREATE TABLE IF NOT EXISTS engajamentos (
+    id BIGSERIAL PRIMARY KEY,
+    proposta_id UUID NOT NULL REFERENCES propostas(id) ON DELETE CASCADE,
+    tipo VARCHAR(10) NOT NULL,
+    sessao VARCHAR(64),
+    tempo_pagina INTEGER,
+    scroll_max SMALLINT,
+    secoes TEXT[] NOT NULL DEFAULT '{}',
+    registrado_em TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+COMMENT ON TABLE engajamentos IS 'Eventos de engajamento (engagement) e saída (exit) das propostas';
+COMMENT ON COLUMN engajamentos.tempo_pagina IS 'Segundos desde a abertura da página';
+COMMENT ON COLUMN engajamentos.scroll_max IS 'Maior rolagem atingida (0 a 100%)';
+COMMENT ON COLUMN engajamentos.secoes IS 'Seções alcançadas desde o evento anterior da mesma visita (ex: financeiro, aceitar)';
+
+-- Resumo por proposta, atualizado incrementalmente a cada lote de eventos
+CREATE TABLE IF NOT EXISTS engajamento_resumo (
+    proposta_id UUID PRIMARY KEY REFERENCES propostas(id) ON DELETE CASCADE,
+    eventos INTEGER NOT NULL DEFAULT 0,
+    saidas INTEGER NOT NULL DEFAULT 0,
+    tempo_total BIGINT NOT NULL DEFAULT 0,
+    tempo_max INTEGER NOT NULL DEFAULT 0,
+    scroll_total BIGINT NOT NULL DEFAULT 0,
+    scroll_max SMALLINT NOT NULL DEFAULT 0,
+    ultimo_evento TIMESTAMP WITH TIME ZONE
+);
+
+COMMENT ON COLUMN engajamento_resumo.tempo_total IS 'Soma do tempo na página das saídas (média = tempo_total / saidas)';
+COMMENT ON COLUMN engajamento_resumo.scroll_total IS 'Soma da rolagem máxima das saídas (média = scroll_total / saidas)';
+
+CREATE TABLE IF NOT EXISTS engajamento_secoes (
+    proposta_id UUID NOT NULL REFERENCES propostas(id) ON DELETE CASCADE,
+    secao VARCHAR(50) NOT NULL,
+    alcances INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (proposta_id, secao)
+);
+
+COMMENT ON TABLE engajamento_secoes IS 'Quantas visitas chegaram a cada seção da proposta';
+
 -- ============================================
 -- ÍNDICES para performance
 -- ============================================
@@ -64,11 +171,48 @@ CREATE INDEX IF NOT EXISTS idx_visualizacoes_proposta
 CREATE INDEX IF NOT EXISTS idx_visualizacoes_data 
     ON visualizacoes(visualizado_em DESC);
 
+-- Visualizações aguardando geolocalização (o índice encolhe conforme são processadas)
+CREATE INDEX IF NOT EXISTS idx_visualizacoes_geo_pendentes 
+    ON visualizacoes(id) WHERE pais IS NULL AND ip_address IS NOT NULL;
+
+-- Estatísticas e histórico paginado (keyset) por proposta
+CREATE INDEX IF NOT EXISTS idx_visualizacoes_proposta_data 
+    ON visualizacoes(proposta_id, visualizado_em DESC, id DESC);
+
+-- Exportação de visualizações por período (keyset em ordem crescente)
+CREATE INDEX IF NOT EXISTS idx_visualizacoes_data_id 
+    ON visualizacoes(visualizado_em, id);
+
+-- Listagem do /admin: uma ordenação por índice, com id como desempate (paginação keyset)
+CREATE INDEX IF NOT EXISTS idx_propostas_created_id 
+    ON propostas(created_at DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_propostas_total_visualizacoes 
+    ON propostas(total_visualizacoes DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_propostas_ultima_visualizacao 
+    ON propostas(ultima_visualizacao DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_propostas_investimento 
+    ON propostas(investimento DESC NULLS LAST, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_propostas_cliente_nome 
+    ON propostas(cliente_nome DESC NULLS LAST, id DESC);
+
+-- Opcional, para a busca por nome no /admin com muitas propostas (Supabase já
+-- tem a extensão pg_trgm disponível):
+-- CREATE EXTENSION IF NOT EXISTS pg_trgm;
+-- CREATE INDEX IF NOT EXISTS idx_propostas_cliente_nome_trgm
+--     ON propostas USING gin (cliente_nome gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_engajamentos_proposta_data 
+    ON engajamentos(proposta_id, registrado_em DESC);
+
 -- ============================================
 -- VIEWS úteis para análise
 -- ============================================
 
--- View: Propostas com total de visualizações
+-- View: Propostas com total de visualizações (lê os contadores, sem JOIN)
 CREATE OR REPLACE VIEW vw_propostas_stats AS
 SELECT 
     p.id,
@@ -76,12 +220,10 @@ SELECT
     p.cliente_nome,
     p.investimento,
     p.created_at,
-    COUNT(v.id) as total_visualizacoes,
-    MAX(v.visualizado_em) as ultima_visualizacao,
-    MIN(v.visualizado_em) as primeira_visualizacao
+    p.total_visualizacoes,
+    p.ultima_visualizacao,
+    p.primeira_visualizacao
 FROM propostas p
-LEFT JOIN visualizacoes v ON p.id = v.proposta_id
-GROUP BY p.id, p.numero_proposta, p.cliente_nome, p.investimento, p.created_at
 ORDER BY p.created_at DESC;
 
 COMMENT ON VIEW vw_propostas_stats IS 'Resumo de propostas com estatísticas de visualização';
@@ -94,6 +236,9 @@ COMMENT ON VIEW vw_propostas_stats IS 'Resumo de propostas com estatísticas de
 -- Habilitar RLS (Row Level Security)
 ALTER TABLE propostas ENABLE ROW LEVEL SECURITY;
 ALTER TABLE visualizacoes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE engajamentos ENABLE ROW LEVEL SECURITY;
+ALTER TABLE engajamento_resumo ENABLE ROW LEVEL SECURITY;
+ALTER TABLE engajamento_secoes ENABLE ROW LEVEL SECURITY;
 
 -- Política: Permitir leitura pública de propostas
 CREATE POLICY "Propostas podem ser lidas publicamente" 
@@ -115,6 +260,24 @@ CREATE POLICY "Visualizações podem ser lidas"
     ON visualizacoes FOR SELECT 
     USING (true);
 
+-- Política: País/cidade preenchidos depois pelo worker de geolocalização
+CREATE POLICY "Localização das visualizações pode ser atualizada" 
+    ON visualizacoes FOR UPDATE 
+    USING (true);
+
+-- Política: Engajamento gravado e lido pela API
+CREATE POLICY "Engajamentos podem ser registrados" 
+    ON engajamentos FOR INSERT 
+    WITH CHECK (true);
+
+CREATE POLICY "Resumo de engajamento pode ser lido" 
+    ON engajamento_resumo FOR SELECT 
+    USING (true);
+
+CREATE POLICY "Seções de engajamento podem ser lidas" 
+    ON engajamento_secoes FOR SELECT 
+    USING (true);
+
 -- ============================================
 -- FUNÇÕES ÚTEIS
 -- ============================================
@@ -128,19 +291,232 @@ RETURNS TABLE (
     total_views BIGINT
 ) 
 LANGUAGE SQL
+STABLE
 AS $$
     SELECT 
         p.id,
         p.numero_proposta,
         p.cliente_nome,
-        COUNT(v.id) as total_views
+        p.total_visualizacoes::BIGINT as total_views
     FROM propostas p
-    LEFT JOIN visualizacoes v ON p.id = v.proposta_id
-    GROUP BY p.id, p.numero_proposta, p.cliente_nome
-    ORDER BY total_views DESC
+    ORDER BY p.total_visualizacoes DESC NULLS LAST, p.id DESC
     LIMIT limit_count;
 $$;
 
+-- Função: Estatísticas de visualização de uma proposta (contadores de propostas)
+CREATE OR REPLACE FUNCTION get_proposta_stats(p_proposta_id UUID)
+RETURNS TABLE (
+    total_visualizacoes BIGINT,
+    primeira_visualizacao TIMESTAMP WITH TIME ZONE,
+    ultima_visualizacao TIMESTAMP WITH TIME ZONE
+) 
+LANGUAGE SQL
+STABLE
+AS $$
+    SELECT 
+        COALESCE(MAX(total_visualizacoes), 0)::BIGINT,
+        MAX(primeira_visualizacao),
+        MAX(ultima_visualizacao)
+    FROM propostas
+    WHERE id = p_proposta_id;
+$$;
+
+-- Trigger: Atualiza os contadores de propostas a cada INSERT em visualizacoes.
+-- É por comando (não por linha): um lote da fila de tracking vira um UPDATE por
+-- proposta, somando ao total em vez de recontar o histórico.
+-- SECURITY DEFINER: a API grava com a chave anon, e o RLS de propostas não tem
+-- política de UPDATE; sem isso o lock e o UPDATE não veriam nenhuma linha e os
+-- contadores ficariam em 0, sem erro.
+CREATE OR REPLACE FUNCTION atualizar_contadores_visualizacoes()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    -- Trava as propostas em ordem fixa antes do UPDATE. FOR NO KEY UPDATE (o
+    -- mesmo lock do UPDATE, que não muda a chave) não conflita com o KEY SHARE
+    -- que a checagem da FK do INSERT já tomou: com FOR UPDATE, dois lotes da
+    -- mesma proposta esperariam um pelo outro (deadlock)
+    PERFORM 1 FROM propostas
+    WHERE id IN (SELECT proposta_id FROM novas)
+    ORDER BY id
+    FOR NO KEY UPDATE;
+
+    UPDATE propostas p SET
+        total_visualizacoes = p.total_visualizacoes + n.total,
+        primeira_visualizacao = LEAST(p.primeira_visualizacao, n.primeira),
+        ultima_visualizacao = GREATEST(p.ultima_visualizacao, n.ultima)
+    FROM (
+        SELECT proposta_id, COUNT(*) AS total, MIN(visualizado_em) AS primeira, MAX(visualizado_em) AS ultima
+        FROM novas
+        GROUP BY proposta_id
+    ) n
+    WHERE p.id = n.proposta_id;
+
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_visualizacoes_contadores ON visualizacoes;
+CREATE TRIGGER trg_visualizacoes_contadores
+    AFTER INSERT ON visualizacoes
+    REFERENCING NEW TABLE AS novas
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION atualizar_contadores_visualizacoes();
+
+-- Função: Visualizações de uma proposta por país e cidade (dashboard admin)
+CREATE OR REPLACE FUNCTION get_visualizacoes_por_local(p_proposta_id UUID)
+RETURNS TABLE (
+    pais VARCHAR,
+    cidade VARCHAR,
+    total BIGINT
+)
+LANGUAGE SQL
+STABLE
+AS $$
+    SELECT pais, cidade, COUNT(*)
+    FROM visualizacoes
+    WHERE proposta_id = p_proposta_id
+      AND pais IS NOT NULL AND pais <> ''
+    GROUP BY pais, cidade;
+$$;
+
+-- Função: Reserva um lote de visualizações pendentes para o worker de geolocalização
+-- Cada processo da API roda um worker: FOR UPDATE SKIP LOCKED faz dois workers
+-- pegarem lotes diferentes, e a reserva (geo_reservada_em) tira o lote dos demais
+-- até ser gravado. Reserva de um worker que caiu expira em p_validade segundos.
+CREATE OR REPLACE FUNCTION reservar_visualizacoes_sem_geo(p_limite INTEGER, p_validade INTEGER DEFAULT 300)
+RETURNS TABLE (id INTEGER, ip_address VARCHAR)
+LANGUAGE SQL
+AS $$
+    UPDATE visualizacoes v SET geo_reservada_em = NOW()
+    FROM (
+        SELECT p.id FROM visualizacoes p
+        WHERE p.pais IS NULL AND p.ip_address IS NOT NULL
+          AND (p.geo_reservada_em IS NULL OR p.geo_reservada_em < NOW() - make_interval(secs => p_validade))
+        ORDER BY p.id
+        LIMIT p_limite
+        FOR UPDATE SKIP LOCKED
+    ) AS reservadas
+    WHERE v.id = reservadas.id
+    RETURNING v.id, v.ip_address;
+$$;
+
+-- Função: Grava país e cidade de um lote de visualizações (worker de geolocalização)
+-- p_linhas: array JSON de {id, pais, cidade}. Retorna quantas foram atualizadas.
+CREATE OR REPLACE FUNCTION atualizar_geo_visualizacoes(p_linhas JSONB)
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+    WITH atualizadas AS (
+        UPDATE visualizacoes v SET
+            pais = l.pais,
+            cidade = l.cidade
+        FROM jsonb_to_recordset(p_linhas) AS l(id INT, pais TEXT, cidade TEXT)
+        WHERE v.id = l.id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM atualizadas;
+$$;
+
+-- Função: Soma as aberturas suprimidas pela API (repetidas e robôs) aos contadores
+-- p_contagens: array JSON de {proposta_id, repetidas, bots} (uma linha por proposta)
+-- Propostas inexistentes são ignoradas. Retorna quantas propostas foram atualizadas.
+-- SECURITY DEFINER pelo mesmo motivo do trigger de contadores (sem política de
+-- UPDATE em propostas, a chave anon atualizaria 0 linhas e retornaria 0).
+CREATE OR REPLACE FUNCTION registrar_visualizacoes_suprimidas(p_contagens JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    atualizadas INTEGER;
+BEGIN
+    -- Mesma ordem e mesmo lock (FOR NO KEY UPDATE) do trigger de visualizacoes,
+    -- que atualiza as mesmas linhas de propostas
+    PERFORM 1 FROM propostas
+    WHERE id IN (SELECT (c->>'proposta_id')::uuid FROM jsonb_array_elements(p_contagens) AS c)
+    ORDER BY id
+    FOR NO KEY UPDATE;
+
+    UPDATE propostas p SET
+        visualizacoes_repetidas = p.visualizacoes_repetidas + c.repetidas,
+        visualizacoes_bots = p.visualizacoes_bots + c.bots
+    FROM jsonb_to_recordset(p_contagens) AS c(proposta_id UUID, repetidas INT, bots INT)
+    WHERE p.id = c.proposta_id;
+
+    GET DIAGNOSTICS atualizadas = ROW_COUNT;
+    RETURN atualizadas;
+END;
+$$;
+
+-- Função: Grava um lote de eventos de engajamento e atualiza os resumos
+-- p_eventos: array JSON de {proposta_id, tipo, sessao, tempo_pagina, scroll_max, secoes, registrado_em}
+-- Eventos de propostas inexistentes são ignorados. Retorna quantos foram gravados.
+-- SECURITY DEFINER: engajamento_resumo e engajamento_secoes só têm política de
+-- SELECT; com a chave anon, o upsert dos resumos violaria o RLS e o lote falharia.
+CREATE OR REPLACE FUNCTION registrar_engajamentos(p_eventos JSONB)
+RETURNS INTEGER
+LANGUAGE SQL
+SECURITY DEFINER
+SET search_path = public
+AS $$
+    WITH novos AS (
+        INSERT INTO engajamentos (proposta_id, tipo, sessao, tempo_pagina, scroll_max, secoes, registrado_em)
+        SELECT
+            e.proposta_id,
+            e.tipo,
+            e.sessao,
+            e.tempo_pagina,
+            e.scroll_max,
+            COALESCE(ARRAY(SELECT jsonb_array_elements_text(e.secoes)), '{}'),
+            COALESCE(e.registrado_em, NOW())
+        FROM jsonb_to_recordset(p_eventos) AS e(
+            proposta_id UUID, tipo TEXT, sessao TEXT, tempo_pagina INT,
+            scroll_max INT, secoes JSONB, registrado_em TIMESTAMPTZ
+        )
+        WHERE EXISTS (SELECT 1 FROM propostas p WHERE p.id = e.proposta_id)
+        RETURNING proposta_id, tipo, tempo_pagina, scroll_max, secoes, registrado_em
+    ),
+    resumo AS (
+        INSERT INTO engajamento_resumo AS r (
+            proposta_id, eventos, saidas, tempo_total, tempo_max, scroll_total, scroll_max, ultimo_evento
+        )
+        SELECT
+            proposta_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE tipo = 'exit'),
+            COALESCE(SUM(tempo_pagina) FILTER (WHERE tipo = 'exit'), 0),
+            COALESCE(MAX(tempo_pagina), 0),
+            COALESCE(SUM(scroll_max) FILTER (WHERE tipo = 'exit'), 0),
+            COALESCE(MAX(scroll_max), 0),
+            MAX(registrado_em)
+        FROM novos
+        GROUP BY proposta_id
+        ON CONFLICT (proposta_id) DO UPDATE SET
+            eventos = r.eventos + EXCLUDED.eventos,
+            saidas = r.saidas + EXCLUDED.saidas,
+            tempo_total = r.tempo_total + EXCLUDED.tempo_total,
+            tempo_max = GREATEST(r.tempo_max, EXCLUDED.tempo_max),
+            scroll_total = r.scroll_total + EXCLUDED.scroll_total,
+            scroll_max = GREATEST(r.scroll_max, EXCLUDED.scroll_max),
+            ultimo_evento = GREATEST(r.ultimo_evento, EXCLUDED.ultimo_evento)
+        RETURNING 1
+    ),
+    secoes AS (
+        INSERT INTO engajamento_secoes AS s (proposta_id, secao, alcances)
+        SELECT n.proposta_id, secao, COUNT(*)
+        FROM novos n, unnest(n.secoes) AS secao
+        GROUP BY n.proposta_id, secao
+        ON CONFLICT (proposta_id, secao) DO UPDATE SET
+            alcances = s.alcances + EXCLUDED.alcances
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM novos;
+$$;
+
 -- ============================================
 -- DADOS DE EXEMPLO (opcional - remova em produção)
 -- ============================================
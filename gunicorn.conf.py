@@ -0,0 +1,61 @@
+"""
+Configuração do modo de produção (vários workers uvicorn sob o gunicorn).
+
+Uso:
+    gunicorn main:app -c gunicorn.conf.py
+
+- WEB_CONCURRENCY: número de workers (padrão: um por CPU)
+- PRELOAD_APP: importa a aplicação no processo master antes do fork, então
+  os assets são preparados uma vez só (padrão: true); os templates são
+  carregados no aquecimento de cada worker, do bytecode em cache no disco
+- GRACEFUL_TIMEOUT: segundos para terminar as requisições em andamento e gravar
+  a fila de tracking no SIGTERM/restart de um worker (padrão: 30)
+- MAX_REQUESTS / MAX_REQUESTS_JITTER: recicla o worker após N requisições,
+  limitando o crescimento de memória (padrão: 10000 / 1000; 0 desliga)
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"{os.getenv('APP_HOST', '0.0.0.0')}:{os.getenv('APP_PORT', 8182)}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+preload_app = os.getenv("PRELOAD_APP", "true").lower() in ("1", "true", "yes")
+
+# Shutdown gracioso: o worker para de aceitar conexões, termina as requisições em
+# andamento e roda o shutdown do lifespan (drain da fila de visualizações)
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("WORKER_TIMEOUT", 60))
+keepalive = int(os.getenv("KEEPALIVE", 5))
+
+max_requests = int(os.getenv("MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", 1000))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
+
+# Heartbeat dos workers em memória (em Docker, /tmp pode ser overlay lento)
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+# Métricas do Prometheus agregadas entre os workers (ver app/metrics.py).
+# Precisa estar definido antes de a aplicação importar o prometheus_client.
+PROMETHEUS_DIR = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "proposta-web-metrics")
+)
+os.makedirs(PROMETHEUS_DIR, exist_ok=True)
+# Começa do zero a cada start (arquivos de execuções anteriores somariam valores antigos)
+for arquivo in glob.glob(os.path.join(PROMETHEUS_DIR, "*.db")):
+    os.remove(arquivo)
+
+
+def child_exit(server, worker):
+    """Descarta as métricas de processo (gauges live) do worker que saiu"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
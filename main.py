@@ -1,11 +1,50 @@
-from fastapi import FastAPI, HTTPException, Request
+import time
+
+if __name__ == "__main__":
+    # `python main.py` vira `python -m uvicorn main:app` antes de montar qualquer
+    # coisa. O pool de PDFs usa "spawn", e cada processo dele reimporta o
+    # __main__ do pai: com este arquivo como __main__, banco, assets, filas e
+    # avisos seriam refeitos em cada um. O __main__ do uvicorn não é reimportado.
+    import os
+    import sys
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    port = os.getenv("APP_PORT", "8182")
+    host = os.getenv("APP_HOST", "0.0.0.0")
+
+    print(f"""
+    ╔══════════════════════════════════════════════════════╗
+    ║  Sistema de Propostas Web - LEVESOL                  ║
+    ║  Rodando em: http://{host}:{port}                      ║
+    ║  Documentação: http://{host}:{port}/docs               ║
+    ╚══════════════════════════════════════════════════════╝
+    """, flush=True)
+
+    os.execv(sys.executable, [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--app-dir", os.path.dirname(os.path.abspath(__file__)),
+        "--host", host, "--port", port, "--log-level", "info"
+    ])
+
+# Início da importação: referência dos tempos de cold start (/ready e /metrics)
+INICIO_IMPORTACAO = time.perf_counter()
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from datetime import datetime
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
 from dotenv import load_dotenv
+import asyncio
+import hashlib
+import importlib
+import json
 import os
 import traceback
+from typing import Optional
+from urllib.parse import urlencode
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -13,19 +52,228 @@ load_dotenv()
 # Imports locais
 from app.models.schemas import (
     PropostaInput, 
+    PropostaBatchInput,
     PropostaResponse,
     PropostaResponseComplete,
+    EngajamentoResponse,
     EstatisticasResponse,
+    SimulacaoInput,
+    SimulacaoResponse,
     VisualizacaoResponse
 )
+from app.db.base import COLUNAS_LISTA_PROPOSTAS, MAX_PAGE_SIZE, ORDENACOES_PROPOSTAS
 from app.db.database import Database
+from app.db.tracking import WriteBehindQueue
 from app.web.html_generator import HTMLGenerator
+from app.web.template_service import BRASIL_TZ, TemplateService
+from app.web.cache import RenderCache, etag_matches
+from app.metrics import Inicializacao, MetricsMiddleware, medir, metrics_response
+from app.web.compression import (
+    COMPRESSAO_NEGOCIADA, CompressionBudget, CompressionMiddleware, Compressor, escolher_encoding, etag_variante
+)
+from app.web.assets import AssetPipeline, AssetStaticFiles
+from app.web.auth import exigir_admin
+from app.web.pdf import PDFService
+from app.web.engagement import MAX_BEACON_BYTES, interpretar_beacon
+from app.web.export import COLUNAS_VISUALIZACOES, FORMATOS, BuscarPagina, exportar
+from app.web.geo import GeoWorker, criar_localizador
+from app.web.snapshots import SnapshotPublisher, SnapshotResponse, SnapshotStore
+from app.web.visitas import FiltroVisitas
+
+# Inicializar componentes
+try:
+    db = Database()
+except:
+    print("Aviso: Banco de dados não inicializado (Database class not found)")
+    db = None
+
+# Fila write-behind das visualizações (tira o INSERT do caminho da requisição)
+view_tracker = WriteBehindQueue(
+    flush=db.registrar_visualizacoes,
+    batch_size=int(os.getenv("TRACKING_BATCH_SIZE", 100)),
+    interval=float(os.getenv("TRACKING_FLUSH_INTERVAL", 1.0)),
+    max_size=int(os.getenv("TRACKING_MAX_PENDING", 10000)),
+    max_tentativas=int(os.getenv("TRACKING_MAX_ATTEMPTS", 5)),
+    nome="visualizacoes"
+) if db else None
+
+# Aberturas que não viram linha em visualizacoes (robôs e reaberturas dentro da
+# janela): só somadas aos contadores da proposta, em lote
+visit_filter = FiltroVisitas(
+    janela=float(os.getenv("VIEW_DEDUP_WINDOW", 1800)),
+    max_chaves=int(os.getenv("VIEW_DEDUP_MAX_KEYS", 100000)),
+    filtrar_bots=os.getenv("VIEW_FILTER_BOTS", "true").lower() in ("1", "true", "yes")
+)
+suppressed_tracker = WriteBehindQueue(
+    flush=db.registrar_visualizacoes_suprimidas,
+    batch_size=int(os.getenv("TRACKING_BATCH_SIZE", 100)),
+    interval=float(os.getenv("TRACKING_FLUSH_INTERVAL", 1.0)),
+    max_size=int(os.getenv("TRACKING_MAX_PENDING", 10000)),
+    max_tentativas=int(os.getenv("TRACKING_MAX_ATTEMPTS", 5)),
+    nome="suprimidas"
+) if db else None
+
+# Fila dos beacons de engajamento da página (insert + resumo por proposta em lote)
+engagement_tracker = WriteBehindQueue(
+    flush=db.registrar_engajamentos,
+    batch_size=int(os.getenv("TRACKING_BATCH_SIZE", 100)),
+    interval=float(os.getenv("TRACKING_FLUSH_INTERVAL", 1.0)),
+    max_size=int(os.getenv("TRACKING_MAX_PENDING", 10000)),
+    max_tentativas=int(os.getenv("TRACKING_MAX_ATTEMPTS", 5)),
+    nome="engajamento"
+) if db else None
+
+# Assets otimizados (WebP/AVIF, srcset, hash no nome); pula se já estiverem gerados
+asset_pipeline = AssetPipeline()
+asset_pipeline.build()
+
+# Templates compilados uma única vez, no aquecimento do lifespan
+templates = TemplateService(assets=asset_pipeline)
+html_generator = HTMLGenerator(templates)
+render_cache = RenderCache(
+    max_entries=int(os.getenv("RENDER_CACHE_SIZE", 512)),
+    ttl=float(os.getenv("RENDER_CACHE_TTL", 3600))
+)
+# Compressão gzip/brotli negociada (HTML e JSON)
+compressor = Compressor(
+    minimo=int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    budget=CompressionBudget(fracao=float(os.getenv("COMPRESSION_CPU_BUDGET", 0.5)))
+)
+
+# PDFs das propostas (pool de processos + cache em disco)
+pdf_service = PDFService(
+    logo_path=os.path.join(asset_pipeline.out_dir, os.path.basename(asset_pipeline.url('levesol_logo.png')))
+)
+
+# Snapshots estáticos do HTML (SNAPSHOTS=true): publicados em background na
+# criação e servidos direto do disco no GET, sem banco nem render
+snapshot_store = SnapshotStore() if os.getenv("SNAPSHOTS", "false").lower() in ("1", "true", "yes") else None
+snapshot_queue = WriteBehindQueue(
+    flush=SnapshotPublisher(snapshot_store, html_generator, buscar_proposta=db.buscar_proposta),
+    batch_size=int(os.getenv("SNAPSHOT_BATCH_SIZE", 50)),
+    interval=float(os.getenv("SNAPSHOT_FLUSH_INTERVAL", 0.5)),
+    max_size=int(os.getenv("SNAPSHOT_MAX_PENDING", 10000)),
+    nome="snapshots"
+) if db and snapshot_store is not None else None
+
+# País/cidade das visualizações pela base local de IPs (GEOIP_DB), preenchidos
+# em background: a gravação da visualização não espera a geolocalização
+geo_localizador = criar_localizador() if db else None
+geo_worker = GeoWorker(
+    db,
+    geo_localizador,
+    lote=int(os.getenv("GEOIP_BATCH_SIZE", 500)),
+    intervalo=float(os.getenv("GEOIP_INTERVAL", 5.0))
+) if geo_localizador is not None else None
+
+# Configurações
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8182")
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 500))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 10000))
+ADMIN_HISTORICO_LIMITE = int(os.getenv("ADMIN_HISTORICO_LIMITE", 100))
+ADMIN_LISTA_LIMITE = int(os.getenv("ADMIN_LISTA_LIMITE", 50))
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", 1000))
+READY_DB_TIMEOUT = float(os.getenv("READY_DB_TIMEOUT", 2.0))
+MAX_IDEMPOTENCY_KEY = 255
+
+
+# Marcos do cold start deste processo e estado do aquecimento (lidos pelo /ready)
+inicializacao = Inicializacao(inicio=INICIO_IMPORTACAO)
+aquecimento = {"concluido": False, "templates": "pendente", "banco": "pendente"}
+
+# Módulos pesados usados por poucas rotas: importados na primeira chamada ou,
+# em background, logo depois de o processo ficar pronto
+IMPORTS_TARDIOS = ("app.web.simulacao",)
+
+
+async def _verificar_banco() -> str:
+    """"ok" ou o motivo de o banco não estar disponível"""
+    if not db:
+        return "não configurado"
+    try:
+        await asyncio.wait_for(db.ping(), timeout=READY_DB_TIMEOUT)
+        return "ok"
+    except asyncio.TimeoutError:
+        return f"erro: sem resposta em {READY_DB_TIMEOUT:g}s"
+    except Exception as e:
+        return f"erro: {str(e)}"
+
+
+async def _aquecer() -> None:
+    """
+    Aquecimento antes de o processo receber tráfego: compila os templates numa
+    thread enquanto abre o pool do banco e faz a primeira consulta (conexão e
+    TLS saem do caminho da primeira requisição). Uma falha não derruba o
+    startup: fica registrada em `aquecimento` e o /ready responde 503.
+    """
+    async def aquecer_templates() -> str:
+        try:
+            await asyncio.to_thread(templates.precompile)
+            return "ok"
+        except Exception as e:
+            return f"erro: {str(e)}"
+
+    async def aquecer_banco() -> str:
+        if db:
+            try:
+                await db.connect()
+            except Exception as e:
+                return f"erro: {str(e)}"
+        return await _verificar_banco()
+
+    aquecimento["templates"], aquecimento["banco"] = await asyncio.gather(aquecer_templates(), aquecer_banco())
+    for nome in ("templates", "banco"):
+        if aquecimento[nome] != "ok":
+            print(f"Aviso: {nome} indisponível no startup ({aquecimento[nome]})")
+    aquecimento["concluido"] = True
+
+
+def _importar_tardios() -> None:
+    for modulo in IMPORTS_TARDIOS:
+        try:
+            importlib.import_module(modulo)
+        except Exception as e:
+            print(f"Aviso: Falha ao pré-carregar {modulo}: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida da aplicação: aquece templates e banco e inicia as filas de
+    tracking e de snapshots e o worker de geolocalização; no shutdown, grava as
+    visualizações, o engajamento e os snapshots pendentes antes de liberar o
+    pool de conexões do banco
+    """
+    await _aquecer()
+    tarefas = (view_tracker, suppressed_tracker, engagement_tracker, snapshot_queue, geo_worker)
+    for tarefa in tarefas:
+        if tarefa is not None:
+            tarefa.start()
+
+    inicializacao.marcar("pronta")
+    tempos = inicializacao.stats()
+    print(f"Pronto para receber requisições em {tempos['pronta_ms']:.0f} ms "
+          f"(importação {tempos['importada_ms']:.0f} ms)")
+    pre_carga = asyncio.create_task(asyncio.to_thread(_importar_tardios))
+
+    yield
+    await pre_carga
+    for tarefa in tarefas:
+        if tarefa is not None:
+            await tarefa.stop()
+    if geo_localizador is not None:
+        geo_localizador.close()
+    pdf_service.close()
+    if db:
+        await db.close()
+
 
 # Inicializar FastAPI
 app = FastAPI(
     title="Sistema de Propostas Web - LEVESOL",
     description="API para geração e tracking de propostas de energia solar",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -36,21 +284,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, compressor=compressor)
+# Histogramas por rota/etapa (/metrics) e header Server-Timing
+app.add_middleware(MetricsMiddleware, inicializacao=inicializacao)
 
-# CORREÇÃO: Servir arquivos estáticos (logo)
-app.mount("/static", StaticFiles(directory="app/assets"), name="static")
-
-# Inicializar componentes
-try:
-    db = Database()
-except:
-    print("Aviso: Banco de dados não inicializado (Database class not found)")
-    db = None
-
-html_generator = HTMLGenerator()
-
-# Configurações
-BASE_URL = os.getenv("BASE_URL", "http://localhost:8182")
+# Servir arquivos estáticos otimizados (hash no nome => cache imutável)
+app.mount("/static", AssetStaticFiles(directory=asset_pipeline.out_dir), name="static")
 
 
 @app.get("/")
@@ -61,10 +300,18 @@ def read_root():
         "version": "2.0.0",
         "endpoints": {
             "health": "GET /health",
+            "ready": "GET /ready",
+            "metrics": "GET /metrics",
             "criar_proposta": "POST /api/proposta",
+            "criar_propostas_lote": "POST /api/propostas/batch (NDJSON)",
             "preview_proposta": "POST /api/proposta/web (Teste sem salvar)",
             "visualizar_proposta": "GET /proposta/{proposta_id}",
+            "admin": "GET /admin (todas as propostas)",
+            "baixar_pdf": "GET /proposta/{proposta_id}.pdf",
             "estatisticas": "GET /api/proposta/{proposta_id}/stats",
+            "simulacao": "POST /api/simulacao",
+            "exportacao": "GET /api/export/propostas | visualizacoes (CSV ou NDJSON)",
+            "engajamento": "POST /api/proposta/{proposta_id}/track-engagement | track-exit (sendBeacon)",
             "docs": "/docs"
         }
     }
@@ -72,14 +319,60 @@ def read_root():
 
 @app.get("/health")
 def health_check():
-    """Health check para monitoramento"""
+    """
+    Liveness: o processo está de pé e respondendo (não consulta dependências;
+    para saber se pode receber tráfego, use /ready)
+    """
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "service": "proposta-web-api"
+        "service": "proposta-web-api",
+        "startup": inicializacao.stats(),
+        "tracking": view_tracker.stats() if view_tracker is not None else None,
+        "visitas": {
+            **visit_filter.stats(),
+            "fila": suppressed_tracker.stats() if suppressed_tracker is not None else None
+        },
+        "engajamento": engagement_tracker.stats() if engagement_tracker is not None else None,
+        "compression": compressor.stats(),
+        "pdf": pdf_service.stats(),
+        "geo": geo_worker.stats() if geo_worker is not None else None,
+        "snapshots": {**snapshot_store.stats(), "fila": snapshot_queue.stats()} if snapshot_queue is not None else None
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness: 200 só depois do aquecimento, com os templates compilados e o
+    banco respondendo (consultado a cada chamada, com timeout READY_DB_TIMEOUT);
+    senão 503. Geolocalização e snapshots são opcionais e só informados.
+    Para o balanceador/orquestrador; o health check do container usa /health.
+    """
+    banco = await _verificar_banco() if aquecimento["concluido"] else aquecimento["banco"]
+    pronto = aquecimento["concluido"] and aquecimento["templates"] == "ok" and banco == "ok"
+    return JSONResponse(
+        status_code=200 if pronto else 503,
+        content={
+            "status": "ready" if pronto else "not_ready",
+            "dependencias": {
+                "banco": banco,
+                "templates": aquecimento["templates"],
+                "geo": "ok" if geo_worker is not None else "desativado",
+                "snapshots": "ok" if snapshot_queue is not None else "desativado"
+            },
+            "startup": inicializacao.stats()
+        }
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    """Métricas no formato do Prometheus (latências por etapa, banco, cache e tracking)"""
+    body, content_type = metrics_response()
+    return Response(content=body, headers={"Content-Type": content_type})
+
+
 @app.post("/api/proposta/web", response_class=HTMLResponse)
 async def ver_proposta_web(dados: PropostaInput):
     """
@@ -108,18 +401,79 @@ async def ver_proposta_web(dados: PropostaInput):
         raise HTTPException(status_code=500, detail=f"Erro ao gerar página web: {str(e)}")
 
 
+def _chave_idempotencia(request: Request, dados: PropostaInput) -> str:
+    """
+    Chave de idempotência da criação: o header Idempotency-Key, se enviado, ou o
+    hash canônico do payload. Guardada como SHA-256 (tamanho fixo, sem escapes).
+    """
+    chave = request.headers.get("idempotency-key")
+    if chave is None:
+        return dados.hash_canonico()
+    if not chave or len(chave) > MAX_IDEMPOTENCY_KEY:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key deve ter de 1 a {MAX_IDEMPOTENCY_KEY} caracteres"
+        )
+    return hashlib.sha256(f"idempotency-key:{chave}".encode("utf-8")).hexdigest()
+
+
+def _publicar_snapshot(proposta_id: str, html: bytes = None) -> None:
+    """Agenda a publicação do snapshot (sem esperar; fila cheia = fica no render ao vivo)"""
+    if snapshot_queue is None:
+        return
+    item = {"proposta_id": proposta_id}
+    if html is not None:
+        item["html"] = html
+    snapshot_queue.put(item)
+
+
+def _resposta_criacao(salva, response: Response) -> PropostaResponseComplete:
+    """Resposta de criar_proposta; repetições ganham o header Idempotent-Replayed"""
+    proposta_id = salva["id"]
+    if salva["criada"]:
+        message = "Proposta criada com sucesso! Envie o link ao cliente e acompanhe pelo link admin."
+    else:
+        response.headers["Idempotent-Replayed"] = "true"
+        message = "Proposta já criada por uma requisição anterior idêntica; nada foi gravado de novo."
+
+    return PropostaResponseComplete(
+        status="success",
+        numero_proposta=salva["numero_proposta"],
+        proposta_id=proposta_id,
+        proposta_url=f"{BASE_URL}/proposta/{proposta_id}",
+        admin_url=f"{BASE_URL}/admin/proposta/{proposta_id}",
+        message=message
+    )
+
+
+def _extrair_planilha(dados_completos, origem: str = "Planilha"):
+    """Extrai a planilha (dados_sistema, dados_payback), registrando os diagnósticos de parse"""
+    extracao = html_generator.extrair(dados_completos)
+    for diag in extracao.diagnosticos:
+        print(f"Aviso: {origem}, linha {diag.linha}, campo {diag.campo}={diag.valor!r}: {diag.erro}")
+    return extracao.to_dicts()
+
+
 @app.post("/api/proposta", response_model=PropostaResponseComplete)
-async def criar_proposta(dados: PropostaInput):
+async def criar_proposta(dados: PropostaInput, request: Request, response: Response):
     """
     Cria uma nova proposta, salva no banco e retorna o link para visualização.
+
+    Idempotente: retentativas com o mesmo header `Idempotency-Key` (ou, sem ele,
+    com o mesmo payload) devolvem a proposta já criada, sem extrair nem gravar de
+    novo. O número da proposta vem de uma sequência do banco.
     """
     if not db:
         raise HTTPException(status_code=503, detail="Banco de dados não disponível")
 
+    chave = _chave_idempotencia(request, dados)
+
     try:
-        # Gerar número da proposta único (adiciona hora:minuto)
-        numero_proposta = f"{datetime.now().strftime('%d%m%y-%H%M')}/{datetime.now().year}"
-        
+        # Retentativa (n8n): responde com a proposta existente antes de qualquer trabalho
+        existente = (await db.buscar_por_chaves([chave])).get(chave)
+        if existente:
+            return _resposta_criacao({**existente, "criada": False}, response)
+
         # Preparar dados do cliente
         cliente_dict = {
             "nome": dados.cliente.nome,
@@ -130,28 +484,19 @@ async def criar_proposta(dados: PropostaInput):
         }
         
         # Extrair dados limpos para salvar no banco
-        dados_sistema, dados_payback = html_generator._extract_data(dados.dados_completos)
+        dados_sistema, dados_payback = _extrair_planilha(dados.dados_completos)
         
-        # Salvar no banco de dados
-        proposta_id = db.salvar_proposta(
-            numero_proposta=numero_proposta,
+        # Salvar no banco (ON CONFLICT na chave: duas retentativas simultâneas gravam uma vez só)
+        salva = await db.salvar_proposta(
             cliente=cliente_dict,
             dados_sistema=dados_sistema,
-            dados_payback=dados_payback
+            dados_payback=dados_payback,
+            chave_idempotencia=chave
         )
+        if salva["criada"]:
+            _publicar_snapshot(salva["id"])
         
-        # Gerar URLs da proposta
-        proposta_url = f"{BASE_URL}/proposta/{proposta_id}"
-        admin_url = f"{BASE_URL}/admin/proposta/{proposta_id}"
-        
-        return PropostaResponseComplete(
-            status="success",
-            numero_proposta=numero_proposta,
-            proposta_id=proposta_id,
-            proposta_url=proposta_url,
-            admin_url=admin_url,
-            message="Proposta criada com sucesso! Envie o link ao cliente e acompanhe pelo link admin."
-        )
+        return _resposta_criacao(salva, response)
         
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Dados inválidos: {str(e)}")
@@ -164,104 +509,350 @@ async def criar_proposta(dados: PropostaInput):
         )
 
 
+def _preparar_lote(itens, inicio):
+    """
+    Extrai os dados de um pedaço do lote (roda numa thread).
+
+    Retorna (prontos, erros): prontos é uma lista de (indice, kwargs de
+    salvar_proposta) e erros uma lista de linhas de resultado com erro.
+    """
+    prontos = []
+    erros = []
+
+    for offset, item in enumerate(itens):
+        indice = inicio + offset
+        try:
+            dados_sistema, dados_payback = _extrair_planilha(item.dados_completos, f"Lote, item {indice}, planilha")
+            prontos.append((indice, {
+                "cliente": item.cliente.model_dump(),
+                "dados_sistema": dados_sistema,
+                "dados_payback": dados_payback,
+                # Reenviar o lote não duplica as propostas que já entraram
+                "chave_idempotencia": item.hash_canonico()
+            }))
+        except Exception as e:
+            erros.append({"index": indice, "status": "error", "error": f"Dados inválidos: {str(e)}"})
+
+    return prontos, erros
+
+
+async def _gravar_lote(prontos, erros):
+    """Grava um pedaço do lote com um único INSERT e monta as linhas de resultado"""
+    resultados = list(erros)
+
+    if prontos:
+        try:
+            salvas = await db.salvar_propostas([kwargs for _, kwargs in prontos])
+            for (indice, _), salva in zip(prontos, salvas):
+                proposta_id = salva["id"]
+                resultados.append({
+                    "index": indice,
+                    "status": "success",
+                    "numero_proposta": salva["numero_proposta"],
+                    "proposta_id": proposta_id,
+                    "proposta_url": f"{BASE_URL}/proposta/{proposta_id}",
+                    "admin_url": f"{BASE_URL}/admin/proposta/{proposta_id}",
+                    "duplicada": not salva["criada"]
+                })
+                if salva["criada"]:
+                    _publicar_snapshot(proposta_id)
+        except Exception as e:
+            print(f"Erro ao gravar lote de propostas: {str(e)}")
+            for indice, _ in prontos:
+                resultados.append({"index": indice, "status": "error", "error": str(e)})
+
+    resultados.sort(key=lambda r: r["index"])
+    return resultados
+
+
+@app.post("/api/propostas/batch")
+async def criar_propostas_lote(dados: PropostaBatchInput):
+    """
+    Cria várias propostas de uma vez (importação de campanhas pelo n8n).
+
+    As propostas são gravadas em INSERTs de `chunk_size` linhas. A resposta é
+    NDJSON (uma linha JSON por proposta, com `index` da entrada) enviada à medida
+    que cada pedaço é gravado. A extração do próximo pedaço roda em paralelo com
+    a gravação do anterior. Itens já gravados antes (mesmo conteúdo) voltam com
+    `duplicada: true`, sem nova linha no banco.
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Banco de dados não disponível")
+
+    if len(dados.propostas) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Lote muito grande: máximo de {BATCH_MAX_ITEMS} propostas por requisição"
+        )
+
+    chunk_size = dados.chunk_size or BATCH_CHUNK_SIZE
+    propostas = dados.propostas
+
+    async def gerar():
+        gravando = None
+        for inicio in range(0, len(propostas), chunk_size):
+            prontos, erros = await asyncio.to_thread(
+                _preparar_lote, propostas[inicio:inicio + chunk_size], inicio
+            )
+
+            if gravando is not None:
+                for linha in await gravando:
+                    yield json.dumps(linha, ensure_ascii=False) + "\n"
+            gravando = asyncio.create_task(_gravar_lote(prontos, erros))
+
+        if gravando is not None:
+            for linha in await gravando:
+                yield json.dumps(linha, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(gerar(), media_type="application/x-ndjson")
+
+
+# Registrada antes de /proposta/{proposta_id}, que também casaria com "<id>.pdf"
+@app.get("/proposta/{proposta_id}.pdf", response_class=FileResponse)
+async def baixar_proposta_pdf(proposta_id: str):
+    """
+    PDF da proposta, gerado a partir do mesmo contexto da página.
+
+    A geração roda num pool de processos e o arquivo fica em cache no disco
+    (por proposta e versão do template); pedidos simultâneos geram uma vez só.
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Banco de dados não disponível")
+
+    async def carregar_contexto():
+        proposta = await db.buscar_proposta(proposta_id)
+        if not proposta:
+            return None
+        return html_generator.stored_context(proposta)
+
+    try:
+        caminho = await pdf_service.obter(proposta_id, html_generator.template_version, carregar_contexto)
+
+        if caminho is None:
+            raise HTTPException(
+                status_code=404,
+                detail="Proposta não encontrada. Verifique se o ID está correto."
+            )
+
+        return FileResponse(
+            caminho,
+            media_type="application/pdf",
+            filename=f"proposta-levesol-{proposta_id[:8]}.pdf",
+            content_disposition_type="inline",
+            headers={"Cache-Control": "private, max-age=3600"}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Erro ao gerar PDF da proposta: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao gerar PDF: {str(e)}"
+        )
+
+
+def _registrar_visualizacao(proposta_id: str, request: Request) -> None:
+    """
+    Enfileira a visualização para gravação em lote (não espera o banco).
+
+    Robôs e reaberturas dentro da janela não viram linha no histórico: só
+    entram nos contadores visualizacoes_bots/visualizacoes_repetidas.
+    """
+    client_ip = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent")
+
+    motivo = visit_filter.classificar(proposta_id, client_ip, user_agent)
+    if motivo is not None:
+        suppressed_tracker.put({"proposta_id": proposta_id, "motivo": motivo})
+        return
+
+    if not view_tracker.put({
+        "proposta_id": proposta_id,
+        "ip_address": client_ip,
+        "user_agent": user_agent or "Unknown",
+        "visualizado_em": datetime.now(timezone.utc).isoformat()
+    }):
+        print("Aviso: Fila de tracking cheia, visualização descartada")
+
+
 @app.get("/proposta/{proposta_id}", response_class=HTMLResponse)
 async def visualizar_proposta(proposta_id: str, request: Request):
     """
     Busca a proposta no banco e renderiza o HTML via Template.
     Registra visualização automaticamente.
+
+    O HTML renderizado fica em cache (a proposta não muda depois de criada) e a
+    resposta leva um ETag forte; se o navegador já tem a versão atual, retorna 304.
+    Com snapshots ligados, o HTML publicado no disco (e suas variantes
+    pré-comprimidas) é enviado direto do arquivo; sem snapshot, renderiza ao vivo
+    e agenda a publicação.
     """
     if not db:
         raise HTTPException(status_code=503, detail="Banco de dados não disponível")
 
-    try:
+    async def renderizar():
         # Buscar proposta no banco
-        proposta = db.buscar_proposta(proposta_id)
-        
+        proposta = await db.buscar_proposta(proposta_id)
         if not proposta:
+            return None
+
+        # Renderiza direto dos dados normalizados salvos na criação
+        body = html_generator.render_stored(proposta).encode("utf-8")
+        _publicar_snapshot(proposta_id, body)
+        return body
+
+    try:
+        if snapshot_store is not None:
+            snapshot = snapshot_store.obter(proposta_id, html_generator.template_version)
+            if snapshot is not None:
+                _registrar_visualizacao(proposta_id, request)
+                caminho, stat_result, encoding = snapshot.para(escolher_encoding(request.headers.get("accept-encoding")))
+                etag = etag_variante(snapshot.etag, encoding)
+                headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+                if etag_matches(request.headers.get("if-none-match"), etag):
+                    return Response(status_code=304, headers=headers)
+                # Variante já escolhida (mesmo identity): o middleware não recomprime sob este ETag
+                headers[COMPRESSAO_NEGOCIADA] = "1"
+                if encoding:
+                    headers["Content-Encoding"] = encoding
+                return SnapshotResponse(caminho, stat_result=stat_result, media_type="text/html", headers=headers)
+
+        cache_key = (proposta_id, html_generator.template_version)
+        entry = await render_cache.get_or_render(cache_key, renderizar)
+        
+        if entry is None:
             raise HTTPException(
                 status_code=404,
                 detail="Proposta não encontrada. Verifique se o ID está correto."
             )
         
-        # REGISTRAR VISUALIZAÇÃO (Tracking)
-        client_ip = request.client.host
-        user_agent = request.headers.get("user-agent", "Unknown")
+        # REGISTRAR VISUALIZAÇÃO (Tracking) - também em cache hit e 304
+        _registrar_visualizacao(proposta_id, request)
         
+        # Variante comprimida guardada junto da entrada do cache (comprime uma vez só)
+        body, encoding = compressor.para_cache(entry, request.headers.get("accept-encoding"))
+
+        # no-cache: o navegador sempre revalida, garantindo o tracking de cada abertura
+        etag = etag_variante(entry.etag, encoding)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        headers[COMPRESSAO_NEGOCIADA] = "1"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return HTMLResponse(content=body, headers=headers)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Erro ao visualizar proposta: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erro ao carregar proposta: {str(e)}"
+        )
+
+
+def _data_inicio_dia(valor: str) -> Optional[datetime]:
+    """Converte AAAA-MM-DD (dia em Brasília) no início do dia; vazio = sem filtro"""
+    if not valor:
+        return None
+    try:
+        return BRASIL_TZ.localize(datetime.combine(date.fromisoformat(valor), datetime.min.time()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Data inválida: {valor} (use AAAA-MM-DD)")
+
+
+def _periodo(de: str, ate: str):
+    """Intervalo [de, ate + 1 dia) a partir dos filtros de data (ate inclusive)"""
+    inicio = _data_inicio_dia(de)
+    fim = _data_inicio_dia(ate)
+    if fim:
+        fim += timedelta(days=1)
+    return inicio, fim
+
+
+@app.get("/admin", response_class=HTMLResponse, dependencies=[Depends(exigir_admin)])
+async def visualizar_admin(
+    ordem: str = Query("created_at", description="Coluna de ordenação"),
+    dir: str = Query("desc", pattern="^(asc|desc)$"),
+    busca: str = Query("", max_length=100, description="Nome do cliente ou número da proposta"),
+    status: str = Query("", pattern="^(visualizadas|nao_visualizadas)?$"),
+    de: str = Query("", description="Criadas a partir de (AAAA-MM-DD)"),
+    ate: str = Query("", description="Criadas até (AAAA-MM-DD, inclusive)"),
+    limit: int = Query(ADMIN_LISTA_LIMITE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="Cursor da próxima página")
+):
+    """
+    Visão geral de todas as propostas, com visualizações, última visualização e investimento.
+
+    Lê os contadores mantidos em `propostas` a cada lote de visualizações (sem
+    JOIN com o histórico); cada ordenação tem índice próprio e a paginação é por cursor.
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Banco de dados não disponível")
+
+    if ordem not in ORDENACOES_PROPOSTAS:
+        raise HTTPException(status_code=400, detail=f"Ordenação inválida: {ordem}")
+
+    busca = busca.strip()
+    criada_de, criada_ate = _periodo(de, ate)
+
+    try:
         try:
-            db.registrar_visualizacao(
-                proposta_id=proposta_id,
-                ip_address=client_ip,
-                user_agent=user_agent
+            propostas, proximo_cursor = await db.listar_propostas(
+                ordem=ordem,
+                crescente=dir == "asc",
+                busca=busca or None,
+                visualizadas={"visualizadas": True, "nao_visualizadas": False}.get(status),
+                criada_de=criada_de,
+                criada_ate=criada_ate,
+                limite=limit,
+                cursor=cursor
             )
-        except Exception as e:
-            print(f"Aviso: Falha ao registrar visualização: {str(e)}")
-        
-        # RECONSTRUÇÃO DOS DADOS
-        cliente_dict = {
-            "nome": proposta["cliente_nome"],
-            "cpf_cnpj": proposta["cliente_cpf_cnpj"],
-            "endereco": proposta["cliente_endereco"],
-            "cidade": proposta["cliente_cidade"],
-            "telefone": proposta["cliente_telefone"]
-        }
-        
-        # Reconstruir 'dados_completos' baseados no que foi salvo no banco
-        dados_completos_reconstruidos = []
-        
-        # 1. Adicionar dados de payback simulando linhas da planilha
-        for item in proposta["dados_payback"]:
-            dados_completos_reconstruidos.append({
-                "Gráfico Payback": str(item["ano"]),
-                "col_2": str(item["amortizacao"]),
-                "col_3": str(item["economia_mensal"])
-            })
-        
-        # 2. Adicionar dados do sistema simulando linhas da planilha
-        dados_sistema = proposta["dados_sistema"]
-        mapeamento_inverso = {
-            "consumo_atual": "Consumo Total Permitido (mês) kwh:",
-            "num_modulos": "Quantidade de módulos",
-            "potencia_kwp": "Potência do sistema",
-            "potencia_inversor": "Potência do inversor",
-            "area_total": "Área total instalada",
-            "geracao_mensal": "Energia Média Gerada (mês)",
-            "geracao_anual": "Energia Média Gerada (ano)",
-            "conta_antes": "Valor da conta antes",
-            "conta_depois": "Valor da conta depois",
-            "investimento": "Preço do Sistema",
-            "tipo_fornecimento": "Padrão do Cliente"
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        filtros = {"busca": busca, "status": status, "de": de, "ate": ate}
+        filtros_ativos = {k: v for k, v in filtros.items() if v}
+
+        def url(**params):
+            return "/admin?" + urlencode({**filtros_ativos, **params})
+
+        # Clicar na coluna já ordenada inverte a direção; as outras começam decrescentes
+        urls_ordem = {
+            coluna: url(ordem=coluna, dir="asc" if coluna == ordem and dir == "desc" else "desc")
+            for coluna in ORDENACOES_PROPOSTAS
         }
-        
-        for key, label in mapeamento_inverso.items():
-            if key in dados_sistema:
-                dados_completos_reconstruidos.append({
-                    "DADOS DA CONTA DE ENERGIA": label,
-                    "col_7": str(dados_sistema[key])
-                })
-        
-        # Montar payload final
-        payload = {
-            "cliente": cliente_dict,
-            "dados_completos": dados_completos_reconstruidos
+
+        contexto = {
+            "propostas": propostas,
+            "ordem": ordem,
+            "dir": dir,
+            "filtros": filtros,
+            "urls_ordem": urls_ordem,
+            "primeira_url": url(ordem=ordem, dir=dir, limit=limit) if cursor else None,
+            "proxima_url": url(ordem=ordem, dir=dir, limit=limit, cursor=proximo_cursor) if proximo_cursor else None,
+            "base_url": BASE_URL
         }
-        
-        # Gerar HTML
-        html_content = html_generator.render_proposal(payload)
-        
-        return HTMLResponse(content=html_content)
-        
+
+        return HTMLResponse(content=templates.render('admin_overview.html', contexto))
+
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao visualizar proposta: {str(e)}")
+        print(f"Erro ao carregar visão geral admin: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(
             status_code=500,
-            detail=f"Erro ao carregar proposta: {str(e)}"
+            detail=f"Erro ao carregar propostas: {str(e)}"
         )
 
 
-@app.get("/admin/proposta/{proposta_id}", response_class=HTMLResponse)
+@app.get("/admin/proposta/{proposta_id}", response_class=HTMLResponse, dependencies=[Depends(exigir_admin)])
 async def visualizar_admin_proposta(proposta_id: str):
     """
     Dashboard admin para acompanhar visualizações da proposta
@@ -271,12 +862,18 @@ async def visualizar_admin_proposta(proposta_id: str):
         
     try:
         # Buscar proposta
-        proposta = db.buscar_proposta(proposta_id)
+        proposta = await db.buscar_proposta(proposta_id)
         if not proposta:
             raise HTTPException(status_code=404, detail="Proposta não encontrada")
         
-        # Buscar visualizações
-        visualizacoes = db.listar_visualizacoes(proposta_id)
+        # Total calculado no banco + apenas as visualizações mais recentes
+        stats, visualizacoes, engajamento, locais = await asyncio.gather(
+            db.estatisticas_visualizacoes(proposta_id),
+            db.listar_visualizacoes_pagina(proposta_id, limite=ADMIN_HISTORICO_LIMITE),
+            db.resumo_engajamento(proposta_id),
+            db.visualizacoes_por_local(proposta_id)
+        )
+        visualizacoes, _ = visualizacoes
         
         # Preparar contexto
         contexto = {
@@ -285,39 +882,17 @@ async def visualizar_admin_proposta(proposta_id: str):
             "cliente_nome": proposta["cliente_nome"],
             "investimento": proposta["dados_sistema"].get("investimento", 0),
             "created_at": proposta.get("created_at"),
-            "total_visualizacoes": len(visualizacoes),
+            "total_visualizacoes": stats["total_visualizacoes"],
+            "visualizacoes_repetidas": proposta.get("visualizacoes_repetidas") or 0,
+            "visualizacoes_bots": proposta.get("visualizacoes_bots") or 0,
             "visualizacoes": visualizacoes,
+            "engajamento": engajamento,
+            "locais": locais,
             "proposta_url": f"{BASE_URL}/proposta/{proposta_id}"
         }
         
-        # Renderizar template admin
-        from jinja2 import Environment, FileSystemLoader
-        template_dir = os.path.join(os.path.dirname(__file__), 'app/web/templates')
-        env = Environment(loader=FileSystemLoader(template_dir))
-        
-        # Adicionar filtro de formatação com timezone Brasil
-        def format_datetime(value):
-            if not value:
-                return "N/A"
-            if isinstance(value, str):
-                from dateutil import parser
-                value = parser.parse(value)
-            
-            # Converter UTC para horário de Brasília (UTC-3)
-            import pytz
-            utc_tz = pytz.UTC
-            brasil_tz = pytz.timezone('America/Sao_Paulo')
-            
-            if value.tzinfo is None:
-                value = utc_tz.localize(value)
-            
-            value_brasil = value.astimezone(brasil_tz)
-            return value_brasil.strftime("%d/%m/%Y %H:%M:%S")
-        
-        env.filters['format_datetime'] = format_datetime
-        
-        template = env.get_template('admin_dashboard.html')
-        html_content = template.render(contexto)
+        # Renderizar template admin (ambiente compartilhado, já compilado)
+        html_content = templates.render('admin_dashboard.html', contexto)
         
         return HTMLResponse(content=html_content)
         
@@ -333,17 +908,35 @@ async def visualizar_admin_proposta(proposta_id: str):
 
 
 @app.get("/api/proposta/{proposta_id}/stats", response_model=EstatisticasResponse)
-async def estatisticas_proposta(proposta_id: str):
-    """Retorna estatísticas de visualizações da proposta"""
+async def estatisticas_proposta(
+    proposta_id: str,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE, description="Tamanho da página do histórico"),
+    cursor: Optional[str] = Query(None, description="proximo_cursor da página anterior")
+):
+    """
+    Retorna estatísticas de visualizações da proposta.
+
+    Os totais são calculados no banco; o histórico é paginado por cursor
+    (use `proximo_cursor` para buscar a próxima página). `total_visualizacoes`
+    conta as aberturas únicas; `visualizacoes_brutas` inclui também as
+    repetidas e as de robôs, que não entram no histórico.
+    """
     if not db:
         raise HTTPException(status_code=503, detail="Banco de dados não disponível")
         
     try:
-        proposta = db.buscar_proposta(proposta_id)
+        proposta = await db.buscar_proposta(proposta_id)
         if not proposta:
             raise HTTPException(status_code=404, detail="Proposta não encontrada")
         
-        visualizacoes = db.listar_visualizacoes(proposta_id)
+        try:
+            stats, (visualizacoes, proximo_cursor), engajamento = await asyncio.gather(
+                db.estatisticas_visualizacoes(proposta_id),
+                db.listar_visualizacoes_pagina(proposta_id, limite=limit, cursor=cursor),
+                db.resumo_engajamento(proposta_id)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         visualizacoes_response = [
             VisualizacaoResponse(
@@ -351,17 +944,26 @@ async def estatisticas_proposta(proposta_id: str):
                 proposta_id=v["proposta_id"],
                 visualizado_em=v["visualizado_em"],
                 ip_address=v.get("ip_address"),
-                user_agent=v.get("user_agent")
+                user_agent=v.get("user_agent"),
+                pais=v.get("pais") or None,
+                cidade=v.get("cidade") or None
             )
             for v in visualizacoes
         ]
         
+        repetidas = proposta.get("visualizacoes_repetidas") or 0
+        bots = proposta.get("visualizacoes_bots") or 0
         return EstatisticasResponse(
             proposta_id=proposta_id,
-            total_visualizacoes=len(visualizacoes),
-            primeira_visualizacao=visualizacoes[-1]["visualizado_em"] if visualizacoes else None,
-            ultima_visualizacao=visualizacoes[0]["visualizado_em"] if visualizacoes else None,
-            historico=visualizacoes_response
+            total_visualizacoes=stats["total_visualizacoes"],
+            visualizacoes_brutas=stats["total_visualizacoes"] + repetidas + bots,
+            visualizacoes_repetidas=repetidas,
+            visualizacoes_bots=bots,
+            primeira_visualizacao=stats["primeira_visualizacao"],
+            ultima_visualizacao=stats["ultima_visualizacao"],
+            historico=visualizacoes_response,
+            proximo_cursor=proximo_cursor,
+            engajamento=EngajamentoResponse(**engajamento)
         )
         
     except HTTPException:
@@ -374,30 +976,183 @@ async def estatisticas_proposta(proposta_id: str):
         )
 
 
-@app.post("/api/proposta/{proposta_id}/track-engagement")
+async def _exportar(
+    nome: str,
+    buscar: BuscarPagina,
+    colunas,
+    formato: str,
+    request: Request
+) -> StreamingResponse:
+    """
+    Resposta de exportação em fluxo: a primeira página é buscada aqui (erro de
+    banco ainda vira 500); as seguintes, conforme o corpo é enviado.
+    """
+    try:
+        primeira = await buscar(None)
+    except Exception as e:
+        print(f"Erro ao exportar {nome}: {str(e)}")
+        # O detalhe do erro de banco fica só no log
+        raise HTTPException(status_code=500, detail=f"Erro ao exportar {nome}")
+
+    # O CompressionMiddleware só comprime corpos inteiros; aqui a compressão é por página
+    encoding = escolher_encoding(request.headers.get("accept-encoding"))
+    arquivo = f"{nome}-{datetime.now(BRASIL_TZ):%Y%m%d}.{formato}"
+    headers = {"Content-Disposition": f'attachment; filename="{arquivo}"', "Cache-Control": "no-store"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+
+    return StreamingResponse(
+        exportar(primeira, buscar, colunas, formato, encoding),
+        media_type=FORMATOS[formato],
+        headers=headers
+    )
+
+
+@app.get("/api/export/propostas", dependencies=[Depends(exigir_admin)])
+async def exportar_propostas(
+    request: Request,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    de: str = Query("", description="Criadas a partir de (AAAA-MM-DD)"),
+    ate: str = Query("", description="Criadas até (AAAA-MM-DD, inclusive)")
+):
+    """
+    Exporta as propostas (colunas da listagem do /admin, com os contadores de
+    visualização) em CSV ou NDJSON, em ordem de criação.
+
+    O corpo é gerado em fluxo, uma página keyset (created_at, id) por vez: a
+    memória usada não depende do tamanho da tabela.
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Banco de dados não disponível")
+
+    criada_de, criada_ate = _periodo(de, ate)
+
+    async def buscar(cursor):
+        # A listagem limita a página em MAX_PAGE_SIZE
+        return await db.listar_propostas(
+            ordem="created_at",
+            crescente=True,
+            criada_de=criada_de,
+            criada_ate=criada_ate,
+            limite=MAX_PAGE_SIZE,
+            cursor=cursor
+        )
+
+    return await _exportar("propostas", buscar, COLUNAS_LISTA_PROPOSTAS, formato, request)
+
+
+@app.get("/api/export/visualizacoes", dependencies=[Depends(exigir_admin)])
+async def exportar_visualizacoes(
+    request: Request,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    de: str = Query("", description="Visualizações a partir de (AAAA-MM-DD)"),
+    ate: str = Query("", description="Visualizações até (AAAA-MM-DD, inclusive)")
+):
+    """
+    Exporta as visualizações de todas as propostas em CSV ou NDJSON, em ordem
+    cronológica, em fluxo (páginas keyset (visualizado_em, id) de EXPORT_PAGE_SIZE).
+    """
+    if not db:
+        raise HTTPException(status_code=503, detail="Banco de dados não disponível")
+
+    inicio, fim = _periodo(de, ate)
+
+    async def buscar(cursor):
+        return await db.listar_visualizacoes_periodo(de=inicio, ate=fim, limite=EXPORT_PAGE_SIZE, cursor=cursor)
+
+    return await _exportar("visualizacoes", buscar, COLUNAS_VISUALIZACOES, formato, request)
+
+
+@app.post("/api/simulacao", response_model=SimulacaoResponse)
+async def simular_cenarios(dados: SimulacaoInput):
+    """
+    Simula o payback de 25 anos para todas as combinações de cenário (reajuste
+    da tarifa, degradação, tamanho do sistema, juros e prazo do financiamento).
+
+    Parte do `dados_sistema` da proposta (`proposta_id`) ou do enviado no corpo.
+    O cálculo é vetorizado (todos os cenários de uma vez) e roda numa thread.
+    """
+    if dados.proposta_id:
+        if not db:
+            raise HTTPException(status_code=503, detail="Banco de dados não disponível")
+        proposta = await db.buscar_proposta(dados.proposta_id)
+        if not proposta:
+            raise HTTPException(status_code=404, detail="Proposta não encontrada")
+        dados_sistema = proposta.get("dados_sistema") or {}
+    elif dados.dados_sistema is not None:
+        dados_sistema = dados.dados_sistema
+    else:
+        raise HTTPException(status_code=400, detail="Informe proposta_id ou dados_sistema")
+
+    # numpy fica fora da importação da aplicação (ver IMPORTS_TARDIOS)
+    from app.web.simulacao import BaseSimulacao, simular
+
+    try:
+        base = BaseSimulacao.de_dados_sistema(dados_sistema)
+        with medir("simulacao"):
+            resultado = await asyncio.to_thread(
+                simular,
+                base,
+                dados.inflacao_tarifa,
+                dados.degradacao,
+                dados.escala,
+                dados.taxa_juros,
+                dados.prazo_anos,
+                taxa_desconto=dados.taxa_desconto,
+                incluir_series=dados.incluir_series
+            )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Listas grandes: serializa direto, sem revalidar pelo response_model (que fica para a documentação)
+    return JSONResponse(content=resultado)
+
+
+async def _receber_beacon(proposta_id: str, tipo: str, request: Request) -> Response:
+    """
+    Enfileira um beacon de engajamento e responde na hora (204).
+
+    Nada aqui espera o banco: o evento vai para a fila write-behind, que grava em
+    lote e atualiza os resumos por proposta. Propostas inexistentes são
+    descartadas na gravação, sem consulta extra por beacon.
+    """
+    if engagement_tracker is None:
+        raise HTTPException(status_code=503, detail="Banco de dados não disponível")
+
+    tamanho = request.headers.get("content-length")
+    if tamanho and tamanho.isdigit() and int(tamanho) > MAX_BEACON_BYTES:
+        raise HTTPException(status_code=413, detail="Beacon muito grande")
+
+    corpo = await request.body()
+    if len(corpo) > MAX_BEACON_BYTES:
+        raise HTTPException(status_code=413, detail="Beacon muito grande")
+
+    try:
+        evento = interpretar_beacon(proposta_id, tipo, corpo)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not engagement_tracker.put(evento):
+        print("Aviso: Fila de engajamento cheia, evento descartado")
+
+    return Response(status_code=204)
+
+
+@app.post("/api/proposta/{proposta_id}/track-engagement", status_code=204)
 async def track_engagement(proposta_id: str, request: Request):
-    """Tracking adicional de engajamento (ex: tempo na página)"""
-    return {"status": "tracked"}
+    """
+    Engajamento enviado pela página ao ficar oculta: tempo na página (s),
+    rolagem máxima (%) e seções alcançadas (ex: financeiro, aceitar)
+    """
+    return await _receber_beacon(proposta_id, "engagement", request)
 
 
-@app.post("/api/proposta/{proposta_id}/track-exit")
+@app.post("/api/proposta/{proposta_id}/track-exit", status_code=204)
 async def track_exit(proposta_id: str, request: Request):
-    """Tracking de saída"""
-    return {"status": "tracked"}
+    """Saída da página (pagehide): mesmo formato do track-engagement, fecha a visita"""
+    return await _receber_beacon(proposta_id, "exit", request)
 
 
-if __name__ == "__main__":
-    import uvicorn
-    
-    port = int(os.getenv("APP_PORT", 8182))
-    host = os.getenv("APP_HOST", "0.0.0.0")
-    
-    print(f"""
-    ╔══════════════════════════════════════════════════════╗
-    ║  Sistema de Propostas Web - LEVESOL                  ║
-    ║  Rodando em: http://{host}:{port}                      ║
-    ║  Documentação: http://{host}:{port}/docs               ║
-    ╚══════════════════════════════════════════════════════╝
-    """)
-    
-    uvicorn.run(app, host=host, port=port, log_level="info")
+inicializacao.marcar("importada")
+
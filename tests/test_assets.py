@@ -0,0 +1,67 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from app.web import compression
+from app.web.assets import AssetStaticFiles
+from app.web.compression import encodings_aceitos
+
+CSS = b"body { color: #123456; }\n" * 50
+
+
+@pytest.fixture
+def diretorio(tmp_path):
+    (tmp_path / "estilo.css").write_bytes(CSS)
+    (tmp_path / "estilo.css.gz").write_bytes(gzip.compress(CSS))
+    (tmp_path / "estilo.css.br").write_bytes(b"br-fake")
+    return tmp_path
+
+
+def _get(diretorio, accept_encoding):
+    app = Starlette(routes=[Mount("/static", AssetStaticFiles(directory=str(diretorio)))])
+
+    async def _chamar():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://teste") as client:
+            return await client.get("/static/estilo.css", headers={"accept-encoding": accept_encoding})
+    return asyncio.run(_chamar())
+
+
+@pytest.mark.parametrize("accept_encoding, esperado", [
+    ("br, gzip", ["br", "gzip"]),
+    ("br;q=0, gzip", ["gzip"]),
+    ("gzip;q=0.5, br;q=0.8", ["br", "gzip"]),
+    ("br;q=0.2, gzip;q=0.9", ["gzip", "br"]),
+    ("identity", []),
+    ("*;q=0", []),
+])
+def test_encodings_aceitos(monkeypatch, accept_encoding, esperado):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert encodings_aceitos(accept_encoding) == esperado
+
+
+def test_asset_respeita_q_zero(monkeypatch, diretorio):
+    monkeypatch.setattr(compression, "brotli", object())
+    response = _get(diretorio, "br;q=0, gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == CSS
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_asset_sem_encoding_aceito_vai_sem_compressao(monkeypatch, diretorio):
+    monkeypatch.setattr(compression, "brotli", object())
+    response = _get(diretorio, "br;q=0, gzip;q=0")
+    assert "content-encoding" not in response.headers
+    assert response.content == CSS
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_asset_sem_variante_preferida_usa_a_proxima(monkeypatch, diretorio):
+    monkeypatch.setattr(compression, "brotli", object())
+    (diretorio / "estilo.css.br").unlink()
+    response = _get(diretorio, "br, gzip")
+    assert response.headers["content-encoding"] == "gzip"
@@ -0,0 +1,38 @@
+import base64
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.web.auth import exigir_admin
+
+
+def _request(authorization=None) -> Request:
+    headers = [(b"authorization", authorization.encode())] if authorization else []
+    return Request({"type": "http", "method": "GET", "path": "/admin", "headers": headers})
+
+
+def _basic(usuario: str, senha: str) -> str:
+    return "Basic " + base64.b64encode(f"{usuario}:{senha}".encode()).decode()
+
+
+def test_sem_admin_token_fica_fechado(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    with pytest.raises(HTTPException) as erro:
+        exigir_admin(_request("Bearer qualquer"))
+    assert erro.value.status_code == 503
+
+
+@pytest.mark.parametrize("authorization", [None, "Bearer errado", _basic("admin", "errado"), "Basic !!!", "Token s3cr3t"])
+def test_credencial_invalida(monkeypatch, authorization):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cr3t")
+    with pytest.raises(HTTPException) as erro:
+        exigir_admin(_request(authorization))
+    assert erro.value.status_code == 401
+    assert erro.value.headers["WWW-Authenticate"].startswith("Basic")
+
+
+@pytest.mark.parametrize("authorization", ["Bearer s3cr3t", _basic("qualquer", "s3cr3t")])
+def test_credencial_valida(monkeypatch, authorization):
+    monkeypatch.setenv("ADMIN_TOKEN", "s3cr3t")
+    assert exigir_admin(_request(authorization)) is None
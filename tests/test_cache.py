@@ -0,0 +1,24 @@
+import asyncio
+
+from app.web.cache import RenderCache
+
+
+def test_espera_coalescida_nao_conta_como_hit():
+    async def teste():
+        cache = RenderCache(nome="teste")
+        renders = 0
+
+        async def renderizar():
+            nonlocal renders
+            renders += 1
+            await asyncio.sleep(0.01)
+            return b"<p>proposta</p>"
+
+        entradas = await asyncio.gather(*(cache.get_or_render("p1", renderizar) for _ in range(3)))
+        assert renders == 1
+        assert entradas[0] is entradas[1] is entradas[2]
+        await cache.get_or_render("p1", renderizar)
+
+        stats = cache.stats()
+        assert (stats["misses"], stats["coalescidos"], stats["hits"]) == (1, 2, 1)
+    asyncio.run(teste())
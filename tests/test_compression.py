@@ -0,0 +1,44 @@
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse
+from starlette.routing import Route
+
+from app.web.compression import COMPRESSAO_NEGOCIADA, CompressionMiddleware, Compressor
+
+HTML = "<p>proposta</p>" * 200
+
+
+def _get(headers_rota, accept_encoding="gzip"):
+    async def rota(request):
+        return HTMLResponse(HTML, headers={"ETag": '"abc"', **headers_rota})
+
+    app = CompressionMiddleware(Starlette(routes=[Route("/", rota)]), Compressor(minimo=10))
+
+    async def _chamar():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://teste") as client:
+            return await client.get("/", headers={"accept-encoding": accept_encoding})
+    return asyncio.run(_chamar())
+
+
+def test_comprimir_troca_o_etag_pelo_da_variante():
+    resposta = _get({})
+    assert resposta.headers["content-encoding"] == "gzip"
+    assert resposta.headers["etag"] == '"abc-gzip"'
+    assert resposta.text == HTML
+
+
+def test_representacao_negociada_pela_rota_passa_sem_alteracao():
+    resposta = _get({COMPRESSAO_NEGOCIADA: "1"})
+    assert "content-encoding" not in resposta.headers
+    assert resposta.headers["etag"] == '"abc"'
+    assert COMPRESSAO_NEGOCIADA not in resposta.headers
+    assert resposta.content == HTML.encode()
+
+
+def test_marcador_removido_sem_accept_encoding():
+    resposta = _get({COMPRESSAO_NEGOCIADA: "1"}, accept_encoding="identity")
+    assert COMPRESSAO_NEGOCIADA not in resposta.headers
+    assert resposta.headers["etag"] == '"abc"'
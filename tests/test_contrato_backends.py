@@ -0,0 +1,175 @@
+"""
+Contrato do StorageBackend: os mesmos testes em todos os backends, via Database.
+
+O backend em memória roda sempre; os reais só com um banco de teste descartável
+(os testes gravam linhas): TEST_DATABASE_URL (postgres) e TEST_SUPABASE_URL /
+TEST_SUPABASE_KEY (postgrest), com o database_schema.sql aplicado.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.db.database import Database
+from app.db.memory import MemoryBackend
+
+
+def _criar_backend(nome: str, monkeypatch):
+    if nome == "postgres":
+        from app.db.postgres import PostgresBackend
+        return PostgresBackend(dsn=os.environ["TEST_DATABASE_URL"])
+    if nome == "postgrest":
+        from app.db.postgrest import PostgRESTBackend
+        monkeypatch.setenv("SUPABASE_URL", os.environ["TEST_SUPABASE_URL"])
+        monkeypatch.setenv("SUPABASE_KEY", os.environ["TEST_SUPABASE_KEY"])
+        return PostgRESTBackend()
+    return MemoryBackend()
+
+
+@pytest.fixture(params=[
+    "memory",
+    pytest.param("postgres", marks=pytest.mark.skipif(
+        not os.getenv("TEST_DATABASE_URL"), reason="defina TEST_DATABASE_URL")),
+    pytest.param("postgrest", marks=pytest.mark.skipif(
+        not (os.getenv("TEST_SUPABASE_URL") and os.getenv("TEST_SUPABASE_KEY")),
+        reason="defina TEST_SUPABASE_URL e TEST_SUPABASE_KEY")),
+])
+def executar(request, monkeypatch):
+    """Roda a corrotina de teste com um Database novo (o pool é do loop do asyncio.run)"""
+    def _executar(teste):
+        async def _com_banco():
+            db = Database(backend=_criar_backend(request.param, monkeypatch))
+            await db.connect()
+            try:
+                await teste(db)
+            finally:
+                await db.close()
+        asyncio.run(_com_banco())
+    return _executar
+
+
+async def _salvar(db: Database, chave: str = None):
+    return await db.salvar_proposta(
+        cliente={"nome": "Cliente Contrato", "cpf_cnpj": "000.000.000-00", "endereco": "Rua A, 1",
+                 "cidade": "Goiânia", "telefone": "(62) 90000-0000"},
+        dados_sistema={"investimento": 25000.0, "potencia_kwp": 5.5},
+        dados_payback=[{"ano": 1, "saldo": -20000.0}],
+        chave_idempotencia=chave or uuid.uuid4().hex
+    )
+
+
+def test_salvar_e_buscar(executar):
+    async def teste(db):
+        salva = await _salvar(db)
+        assert salva["criada"] is True
+        proposta = await db.buscar_proposta(salva["id"])
+        assert str(proposta["id"]) == salva["id"]
+        assert proposta["numero_proposta"] == salva["numero_proposta"]
+        assert proposta["cliente_nome"] == "Cliente Contrato"
+        assert proposta["dados_sistema"]["potencia_kwp"] == 5.5
+        assert proposta["dados_payback"] == [{"ano": 1, "saldo": -20000.0}]
+    executar(teste)
+
+
+def test_chave_de_idempotencia_repetida_devolve_a_mesma_proposta(executar):
+    async def teste(db):
+        chave = uuid.uuid4().hex
+        primeira = await _salvar(db, chave)
+        segunda = await _salvar(db, chave)
+        assert segunda["criada"] is False
+        assert segunda["id"] == primeira["id"]
+        assert (await db.buscar_por_chaves([chave]))[chave]["id"] == primeira["id"]
+    executar(teste)
+
+
+@pytest.mark.parametrize("proposta_id", ["nao-e-uuid", "", "1' OR '1'='1", str(uuid.uuid4())])
+def test_id_invalido_ou_inexistente_nao_encontra(executar, proposta_id):
+    async def teste(db):
+        assert await db.buscar_proposta(proposta_id) is None
+    executar(teste)
+
+
+def test_id_em_maiusculas_encontra(executar):
+    async def teste(db):
+        salva = await _salvar(db)
+        assert (await db.buscar_proposta(salva["id"].upper()))["numero_proposta"] == salva["numero_proposta"]
+    executar(teste)
+
+
+def test_visualizacoes_paginadas(executar):
+    async def teste(db):
+        proposta_id = (await _salvar(db))["id"]
+        inicio = datetime.now(timezone.utc) - timedelta(hours=1)
+        await db.registrar_visualizacoes([
+            {"proposta_id": proposta_id, "ip_address": "203.0.113.7", "user_agent": "contrato",
+             "visualizado_em": (inicio + timedelta(minutes=i)).isoformat()}
+            for i in range(5)
+        ])
+        assert await db.contar_visualizacoes(proposta_id) == 5
+
+        vistas, cursor = [], None
+        while True:
+            pagina, cursor = await db.listar_visualizacoes_pagina(proposta_id, limite=2, cursor=cursor)
+            vistas.extend(pagina)
+            if not cursor:
+                break
+        datas = [v["visualizado_em"] for v in vistas]
+        assert len(datas) == 5
+        assert datas == sorted(datas, reverse=True)
+    executar(teste)
+
+
+def test_reserva_de_visualizacoes_sem_geo_nao_repete_linhas(executar):
+    async def teste(db):
+        proposta_id = (await _salvar(db))["id"]
+        await db.registrar_visualizacoes([
+            {"proposta_id": proposta_id, "ip_address": f"203.0.113.{i}", "user_agent": "contrato"} for i in range(4)
+        ])
+        # Dois workers: o segundo não recebe o que o primeiro reservou
+        primeiro = {v["id"] for v in await db.reservar_visualizacoes_sem_geo(2)}
+        segundo = {v["id"] for v in await db.reservar_visualizacoes_sem_geo(1000)}
+        assert len(primeiro) == 2
+        assert not primeiro & segundo
+
+        await db.atualizar_geo_visualizacoes([{"id": i, "pais": "", "cidade": ""} for i in primeiro | segundo])
+        # Reserva expirada (validade=0) volta a ser entregue; as gravadas, não
+        assert not {v["id"] for v in await db.reservar_visualizacoes_sem_geo(1000, validade=0)} & primeiro
+    executar(teste)
+
+
+def test_visualizacoes_suprimidas_somam_aos_contadores(executar):
+    async def teste(db):
+        proposta_id = (await _salvar(db))["id"]
+        await db.registrar_visualizacoes_suprimidas([
+            {"proposta_id": proposta_id, "motivo": "repetida"},
+            {"proposta_id": proposta_id, "motivo": "repetida"},
+            {"proposta_id": proposta_id, "motivo": "bot"},
+        ])
+        proposta = await db.buscar_proposta(proposta_id)
+        assert proposta["visualizacoes_repetidas"] == 2
+        assert proposta["visualizacoes_bots"] == 1
+    executar(teste)
+
+
+def test_engajamento_atualiza_o_resumo(executar):
+    # Nos backends reais, passa pelo RPC registrar_engajamentos e pelos resumos
+    # (engajamento_resumo / engajamento_secoes) com as permissões da chave usada
+    async def teste(db):
+        proposta_id = (await _salvar(db))["id"]
+        agora = datetime.now(timezone.utc)
+        evento = {"proposta_id": proposta_id, "sessao": "contrato", "registrado_em": agora.isoformat()}
+        await db.registrar_engajamentos([
+            {**evento, "tipo": "engagement", "tempo_pagina": 10, "scroll_max": 40, "secoes": ["financeiro"]},
+            {**evento, "tipo": "exit", "tempo_pagina": 30, "scroll_max": 90, "secoes": ["financeiro", "prazos"]},
+            {**evento, "proposta_id": str(uuid.uuid4()), "tipo": "exit", "tempo_pagina": 5, "scroll_max": 5,
+             "secoes": []},
+        ])
+        resumo = await db.resumo_engajamento(proposta_id)
+        assert resumo["eventos"] == 2
+        assert resumo["saidas"] == 1
+        assert resumo["tempo_medio"] == 30
+        assert resumo["scroll_max"] == 90
+        assert resumo["secoes"] == {"financeiro": 2, "prazos": 1}
+    executar(teste)
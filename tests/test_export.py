@@ -0,0 +1,34 @@
+import asyncio
+import csv
+import io
+import json
+
+from app.web.export import exportar
+
+COLUNAS = ("id", "user_agent")
+
+
+def _exportar(formato, linhas):
+    async def buscar(cursor):
+        raise AssertionError("página única")
+
+    async def _juntar():
+        return b"".join([parte async for parte in exportar((linhas, None), buscar, COLUNAS, formato)])
+    return asyncio.run(_juntar()).decode("utf-8")
+
+
+def test_csv_neutraliza_formulas():
+    linhas = [{"id": i, "user_agent": valor} for i, valor in enumerate(
+        ['=HYPERLINK("http://x")', "+1", "-2", "@SOMA(A1)", "\tcmd", "Mozilla/5.0"]
+    )] + [{"id": -3, "user_agent": None}]
+    registros = list(csv.reader(io.StringIO(_exportar("csv", linhas))))
+    assert [r[1] for r in registros[1:]] == [
+        '\'=HYPERLINK("http://x")', "'+1", "'-2", "'@SOMA(A1)", "'\tcmd", "Mozilla/5.0", ""
+    ]
+    # Números não são texto do cliente: saem como estão
+    assert registros[-1][0] == "-3"
+
+
+def test_ndjson_mantem_os_valores():
+    texto = _exportar("ndjson", [{"id": 1, "user_agent": "=1+1"}])
+    assert json.loads(texto) == {"id": 1, "user_agent": "=1+1"}
@@ -0,0 +1,56 @@
+"""
+RLS do database_schema.sql: a API usa a chave anon, então toda função que
+escreve numa tabela com RLS sem política para aquele comando precisa ser
+SECURITY DEFINER (senão o UPDATE vê 0 linhas e o INSERT viola o RLS).
+"""
+import os
+import re
+
+import pytest
+
+from app.web.template_service import PROJECT_ROOT
+
+with open(os.path.join(PROJECT_ROOT, "database_schema.sql"), encoding="utf-8") as f:
+    SCHEMA = f.read()
+
+COM_RLS = set(re.findall(r"ALTER TABLE (\w+) ENABLE ROW LEVEL SECURITY", SCHEMA))
+POLITICAS = set(re.findall(r'CREATE POLICY "[^"]+"\s+ON (\w+) FOR (\w+)', SCHEMA))
+FUNCOES = {
+    nome: (cabecalho, corpo)
+    for nome, cabecalho, corpo in re.findall(
+        r"CREATE OR REPLACE FUNCTION (\w+)\((.*?)AS \$\$(.*?)\$\$;", SCHEMA, re.DOTALL
+    )
+}
+
+
+def _escritas(corpo: str):
+    """(tabela, comando) de cada INSERT/UPDATE do corpo (upsert conta como os dois)"""
+    escritas = set()
+    for trecho in re.split(r"(?=INSERT INTO )", corpo):
+        insert = re.match(r"INSERT INTO (\w+)", trecho)
+        if insert:
+            escritas.add((insert.group(1), "INSERT"))
+            if re.search(r"ON CONFLICT[^;]*?DO UPDATE", trecho):
+                escritas.add((insert.group(1), "UPDATE"))
+    for tabela in re.findall(r"(?<!FOR )(?<!KEY )(?<!DO )\bUPDATE (\w+)", corpo):
+        escritas.add((tabela, "UPDATE"))
+    return escritas
+
+
+def _permitido(tabela: str, comando: str) -> bool:
+    return tabela not in COM_RLS or (tabela, comando) in POLITICAS or (tabela, "ALL") in POLITICAS
+
+
+def test_schema_tem_as_funcoes_de_escrita():
+    for nome in ("atualizar_contadores_visualizacoes", "registrar_visualizacoes_suprimidas", "registrar_engajamentos"):
+        assert nome in FUNCOES
+        assert _escritas(FUNCOES[nome][1])
+
+
+@pytest.mark.parametrize("nome", sorted(FUNCOES))
+def test_funcao_que_escreve_sem_politica_e_security_definer(nome):
+    cabecalho, corpo = FUNCOES[nome]
+    bloqueadas = sorted(e for e in _escritas(corpo) if not _permitido(*e))
+    if bloqueadas:
+        assert "SECURITY DEFINER" in cabecalho, f"{nome} escreve em {bloqueadas} sem política de RLS"
+        assert "SET search_path" in cabecalho, f"{nome} é SECURITY DEFINER sem search_path fixo"
@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+from app.web.simulacao import HORIZONTE_ANOS, BaseSimulacao, simular
+
+BASE = BaseSimulacao(investimento=20000.0, geracao_mensal=600.0, conta_antes=800.0, conta_depois=100.0)
+
+
+def test_a_vista_paga_dentro_do_horizonte():
+    r = simular(BASE, [0.05], [0.005], [1.0], [0.0], [0])
+    payback = r["payback_anos"][0]
+    assert 2.0 < payback < 3.5
+    assert r["saldo_final"][0] > 0
+
+
+def test_financiado_com_saldo_nunca_negativo_tem_payback_zero():
+    # Economia mensal (~R$ 700) maior que a parcela: o saldo nunca fica negativo
+    r = simular(BASE, [0.05], [0.005], [1.0], [0.0, 0.12], [0, 10])
+    por_cenario = dict(zip(
+        [(j, p) for j in r["grade"]["taxa_juros"] for p in r["grade"]["prazo_anos"]],
+        zip(r["payback_anos"], r["saldo_final"])
+    ))
+    for juros in (0.0, 0.12):
+        payback, saldo_final = por_cenario[(juros, 10.0)]
+        assert payback == 0.0
+        assert saldo_final > 0
+    assert por_cenario[(0.0, 0.0)][0] == por_cenario[(0.12, 0.0)][0] > 0
+
+
+def test_sem_retorno_no_horizonte_e_none():
+    cara = BaseSimulacao(investimento=10_000_000.0, geracao_mensal=600.0, conta_antes=800.0)
+    r = simular(cara, [0.0], [0.0], [1.0], [0.0], [0])
+    assert r["payback_anos"] == [None]
+    assert r["saldo_final"][0] < 0
+
+
+def test_series_batem_com_saldo_final():
+    r = simular(BASE, [0.05, 0.08], [0.005], [1.0], [0.12], [0, 5], incluir_series=True)
+    assert len(r["saldo_acumulado"]) == r["cenarios"] == 4
+    for serie, final in zip(r["saldo_acumulado"], r["saldo_final"]):
+        assert len(serie) == HORIZONTE_ANOS + 1
+        assert math.isclose(serie[-1], final, abs_tol=0.01)
+
+
+def test_cenarios_demais():
+    with pytest.raises(ValueError):
+        simular(BASE, [0.01] * 100, [0.0] * 100, [1.0] * 10, [0.0], [0])
+
+
+def test_juros_negativos_sao_recusados():
+    from pydantic import ValidationError
+
+    from app.models.schemas import SimulacaoInput
+
+    with pytest.raises(ValidationError):
+        SimulacaoInput(dados_sistema={}, taxa_juros=[-0.1])
+    assert SimulacaoInput(dados_sistema={}, taxa_juros=[0.0, 0.12], inflacao_tarifa=[-0.02]).taxa_juros == [0.0, 0.12]
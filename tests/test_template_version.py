@@ -0,0 +1,29 @@
+from app.web import html_generator as modulo
+from app.web.html_generator import HTMLGenerator
+from app.web.template_service import TemplateService
+
+
+class _Assets:
+    def __init__(self, versao):
+        self.versao = versao
+
+    def get(self, nome):
+        return {"src": f"/static/{nome}"}
+
+    def url(self, nome):
+        return f"/static/{nome}"
+
+
+def test_versao_muda_com_os_assets():
+    a = HTMLGenerator(TemplateService(assets=_Assets("aaaa"))).template_version
+    b = HTMLGenerator(TemplateService(assets=_Assets("bbbb"))).template_version
+    assert a != b
+    assert a == HTMLGenerator(TemplateService(assets=_Assets("aaaa"))).template_version
+
+
+def test_versao_muda_com_o_gerador(monkeypatch):
+    gerador = HTMLGenerator(TemplateService(assets=_Assets("aaaa")))
+    antes = gerador.template_version
+    monkeypatch.setattr(modulo, "VERSAO_GERADOR", modulo.VERSAO_GERADOR + 1)
+    gerador._versoes.clear()
+    assert gerador.template_version != antes
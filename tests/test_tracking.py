@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from app.db.tracking import WriteBehindQueue
+
+
+class _Flush:
+    """Falha nos lotes que contêm um evento "ruim" (ou nas primeiras `falhas` chamadas)"""
+
+    def __init__(self, falhas: int = 0):
+        self.falhas = falhas
+        self.chamadas = 0
+        self.gravados = []
+
+    async def __call__(self, lote):
+        self.chamadas += 1
+        if self.chamadas <= self.falhas or any(e.get("ruim") for e in lote):
+            raise RuntimeError("violates row-level security policy")
+        self.gravados.extend(lote)
+
+
+def test_lote_ruim_e_abandonado_e_a_fila_segue():
+    async def teste():
+        flush = _Flush()
+        fila = WriteBehindQueue(flush=flush, batch_size=2, interval=0.001, max_tentativas=3, nome="teste")
+        fila.put({"ruim": True})
+        fila.put({"id": 1})
+        fila.put({"id": 2})
+        fila.put({"id": 3})
+
+        # Tentativas 1 e 2: o lote ruim espera o backoff e segura os demais
+        assert not await fila._gravar_pendentes(forcar=True)
+        assert not await fila._gravar_pendentes()
+        assert flush.chamadas == 1
+        assert not await fila._gravar_pendentes(forcar=True)
+        # Tentativa 3: abandonado; os lotes seguintes são gravados
+        assert await fila._gravar_pendentes(forcar=True)
+
+        assert flush.gravados == [{"id": 2}, {"id": 3}]
+        assert fila.stats()["abandonados"] == 2
+        assert fila.stats()["falhas"] == 3
+        assert len(fila) == 0
+    asyncio.run(teste())
+
+
+def test_backoff_exponencial_limitado():
+    async def teste():
+        fila = WriteBehindQueue(flush=_Flush(falhas=10), interval=1.0, backoff_max=3.0, max_tentativas=10)
+        fila.put({"id": 1})
+        esperas = []
+        for _ in range(4):
+            antes = time.monotonic()
+            await fila._gravar_pendentes(forcar=True)
+            esperas.append(round(fila._proxima_tentativa - antes))
+        assert esperas == [1, 2, 3, 3]
+    asyncio.run(teste())
+
+
+def test_falha_temporaria_e_gravada_na_nova_tentativa():
+    async def teste():
+        flush = _Flush(falhas=1)
+        fila = WriteBehindQueue(flush=flush, batch_size=10, interval=0.01, max_tentativas=3)
+        fila.start()
+        for i in range(5):
+            fila.put({"id": i})
+        await asyncio.sleep(0.1)
+        await fila.stop()
+        assert [e["id"] for e in flush.gravados] == [0, 1, 2, 3, 4]
+        assert fila.stats()["abandonados"] == 0
+    asyncio.run(teste())
+
+
+def test_stop_grava_o_lote_em_backoff():
+    async def teste():
+        flush = _Flush(falhas=1)
+        fila = WriteBehindQueue(flush=flush, interval=0.01, backoff_max=60.0, max_tentativas=5)
+        fila.start()
+        fila.put({"id": 1})
+        await asyncio.sleep(0.05)
+        await fila.stop()
+        assert flush.gravados == [{"id": 1}]
+    asyncio.run(teste())